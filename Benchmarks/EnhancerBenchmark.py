@@ -0,0 +1,224 @@
+"""
+Micro-benchmarks for the AudioEnhancer stages.
+
+Run from the repository root, e.g.:
+    python -m Benchmarks.EnhancerBenchmark -o bench/enhancer.json
+    python -m Benchmarks.EnhancerBenchmark --sample-rates 44100 --durations 600 --stages chain_stationary
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import scipy
+
+from DataProcessing.AudioEnhancer import bandpass_filter, reduce_noise_audio, compress_audio, boost_volume, \
+    normalize_audio, compress_and_gain, enhance_signal, NOISE_CLIP_SECONDS
+from DataProcessing.NoiseProfile import NoiseReductionMode, noise_spectral_stats, stationary_gate
+from Utility.Logger import Logger, LogLevel
+
+# Same chain settings as main.ENHANCE_SETTINGS
+LOWCUT = 100
+HIGHCUT = 6000
+COMPRESS_THRESHOLD_DB = -30
+COMPRESS_RATIO = 4
+GAIN_DB = 8
+
+SIGNAL_KINDS = ("tones", "noise", "bursts")
+DEFAULT_SAMPLE_RATES = (16000, 22050, 44100)
+DEFAULT_DURATIONS = (10, 60)
+
+
+# === Synthetic signals ===
+def generate_signal(kind: str, sr: int, seconds: float, seed: int = 0) -> np.ndarray:
+    """
+    Deterministic speech-like test signal (mono float32, peak below 1).
+
+    Args:
+        kind (str): "tones" (gliding harmonic voice over a noise floor), "noise"
+                    (pink-ish background only) or "bursts" (syllable-like voiced
+                    bursts separated by pauses, over a noise floor).
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr * seconds), dtype=np.float32) / np.float32(sr)
+
+    white = rng.standard_normal(t.size).astype(np.float32)
+    # Cheap pink-ish tilt: moving-average low-pass mixed with the white noise
+    tilted = np.convolve(white, np.full(8, 1 / 8, dtype=np.float32), mode="same")
+    floor = 0.02 * (0.5 * white + tilted)
+    if kind == "noise":
+        return (4 * floor).astype(np.float32)
+
+    # Fundamental gliding between 110 and 220 Hz, with 8 decaying harmonics
+    f0 = 165 + 55 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 9)).astype(np.float32)
+    voice *= 0.3 / np.max(np.abs(voice))
+
+    if kind == "tones":
+        return (voice + floor).astype(np.float32)
+
+    if kind == "bursts":
+        # ~4 syllables per second, 60% of them voiced, with smooth 20 ms edges
+        syllable = int(0.25 * sr)
+        gates = (rng.random(t.size // syllable + 1) < 0.6).astype(np.float32)
+        envelope = np.repeat(gates, syllable)[:t.size]
+        ramp = max(1, int(0.02 * sr))
+        envelope = np.convolve(envelope, np.full(ramp, 1 / ramp, dtype=np.float32), mode="same")
+        return (voice * envelope + floor).astype(np.float32)
+
+    raise ValueError(f"Unknown signal kind: {kind}")
+
+
+# === Stages ===
+def _stationary_stats(signal, sr):
+    return noise_spectral_stats(bandpass_filter(signal[: int(NOISE_CLIP_SECONDS * sr)], LOWCUT, HIGHCUT, sr), sr)
+
+
+def _stages(sr: int, noise_stats) -> dict:
+    """
+    Stage name -> callable(signal). Every callable gets its own copy of the signal,
+    so in-place stages can be timed like the others.
+    """
+    chain = dict(lowcut=LOWCUT, highcut=HIGHCUT, compress_threshold_db=COMPRESS_THRESHOLD_DB,
+                 compress_ratio=COMPRESS_RATIO, gain_db=GAIN_DB)
+    return {
+        "bandpass_filter": lambda x: bandpass_filter(x, LOWCUT, HIGHCUT, sr),
+        "reduce_noise_audio": lambda x: reduce_noise_audio(x, sr, noise_duration=NOISE_CLIP_SECONDS),
+        "stationary_gate": lambda x: stationary_gate(x, sr, noise_stats),
+        "compress_audio": lambda x: compress_audio(x, COMPRESS_THRESHOLD_DB, COMPRESS_RATIO, out=x),
+        "boost_volume": lambda x: boost_volume(x, GAIN_DB, out=x),
+        "normalize_audio": lambda x: normalize_audio(x, out=x),
+        "compress_and_gain": lambda x: compress_and_gain(x, COMPRESS_THRESHOLD_DB, COMPRESS_RATIO, GAIN_DB,
+                                                         normalize=True),
+        "chain_nonstationary": lambda x: enhance_signal(x, sr, **chain),
+        "chain_stationary": lambda x: enhance_signal(x, sr, noise_mode=NoiseReductionMode.STATIONARY,
+                                                     noise_reference=noise_stats, **chain),
+    }
+
+
+def measure(stage, signal: np.ndarray, repeats: int) -> dict:
+    """
+    Times `repeats` runs of a stage, then measures its peak traced memory in one
+    separate run (tracemalloc slows allocations down, so it never overlaps timing).
+    """
+    stage(signal.copy())  # warm-up: filter design caches, FFT plans, lazy imports
+
+    timings = []
+    for _ in range(repeats):
+        data = signal.copy()
+        start = time.perf_counter()
+        stage(data)
+        timings.append(time.perf_counter() - start)
+
+    data = signal.copy()
+    tracemalloc.start()
+    try:
+        stage(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"Seconds": timings, "PeakMemoryBytes": peak}
+
+
+def run_benchmarks(sample_rates, durations, kinds, stage_names, repeats: int, seed: int) -> list[dict]:
+    results = []
+    for sr in sample_rates:
+        for seconds in durations:
+            for kind in kinds:
+                signal = generate_signal(kind, sr, seconds, seed)
+                stages = _stages(sr, _stationary_stats(signal, sr))
+                for name in stage_names or stages:
+                    measured = measure(stages[name], signal, repeats)
+                    best = min(measured["Seconds"])
+                    median = statistics.median(measured["Seconds"])
+                    results.append({
+                        "Stage": name,
+                        "Signal": kind,
+                        "SampleRate": sr,
+                        "DurationSeconds": seconds,
+                        "Samples": signal.size,
+                        "Seconds": measured["Seconds"],
+                        "BestSeconds": best,
+                        "MedianSeconds": median,
+                        "RealtimeFactor": seconds / median if median > 0 else None,
+                        "SamplesPerSecond": signal.size / median if median > 0 else None,
+                        "PeakMemoryBytes": measured["PeakMemoryBytes"],
+                    })
+                    Logger.info(f"{name:<20} {kind:<6} {sr:>6} Hz {seconds:>5}s  "
+                                f"median {median * 1000:9.2f} ms  x{seconds / median:9.1f} realtime  "
+                                f"peak {measured['PeakMemoryBytes'] / 2 ** 20:8.1f} MiB")
+    return results
+
+
+def environment_info() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "Timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "Commit": commit,
+        "Python": platform.python_version(),
+        "Numpy": np.__version__,
+        "Scipy": scipy.__version__,
+        "Platform": platform.platform(),
+        "Processor": platform.processor() or platform.machine(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks for the AudioEnhancer stages on synthetic audio",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--sample-rates", type=int, nargs="+", default=list(DEFAULT_SAMPLE_RATES))
+    parser.add_argument("--durations", type=float, nargs="+", default=list(DEFAULT_DURATIONS),
+                        help="Signal lengths in seconds")
+    parser.add_argument("--signals", nargs="+", choices=SIGNAL_KINDS, default=list(SIGNAL_KINDS))
+    parser.add_argument("--stages", nargs="+", default=None,
+                        help="Subset of stages to run (default: all)")
+    parser.add_argument("-r", "--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", type=Path, default=None,
+                        help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    # Without --output stdout carries the JSON report, so keep the progress log quiet
+    Logger.setup(level=LogLevel.INFO if args.output else LogLevel.WARNING, show_path_dev=False)
+
+    valid_stages = _stages(DEFAULT_SAMPLE_RATES[0], None)
+    unknown = [s for s in args.stages or [] if s not in valid_stages]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)} (available: {', '.join(valid_stages)})")
+    too_low = [sr for sr in args.sample_rates if HIGHCUT >= sr / 2]
+    if too_low:
+        parser.error(f"Sample rates must be above {2 * HIGHCUT} Hz for the band-pass filter: {too_low}")
+
+    report = {
+        "Environment": environment_info(),
+        "Settings": {"Repeats": args.repeats, "Seed": args.seed, "Lowcut": LOWCUT, "Highcut": HIGHCUT,
+                     "CompressThresholdDb": COMPRESS_THRESHOLD_DB, "CompressRatio": COMPRESS_RATIO,
+                     "GainDb": GAIN_DB},
+        "Results": run_benchmarks(args.sample_rates, args.durations, args.signals, args.stages,
+                                  args.repeats, args.seed),
+    }
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        Logger.info(f"Benchmark report written to '{args.output}'")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Multi-process check of the distributed upload workers sharing a LeaseQueue.
+
+Starts several UploadWorker processes on one box, all on the same fake tree and
+queue directory, with a fake upload (a sleep, then the HTML write) injected in
+place of the browser and made-up proxies that are never contacted. A few chunks
+always fail and must end up failed once they used `--max-attempts` attempts.
+One worker is killed mid-run; its leases must expire and be reclaimed by the
+others. At the end every other job must have its HTML and done marker and have
+been uploaded once, no lease or clock file may be left behind, and the
+surviving workers must report success. Exits non-zero otherwise.
+
+Run from the repository root, e.g.:
+    python -m Checks.LeaseQueueWorkers
+    python -m Checks.LeaseQueueWorkers --workers 6 --jobs 200 --kill-after 2 -o bench/lease.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from functools import partial
+from pathlib import Path
+
+from Utility.Logger import Logger, LogLevel
+from WebScraper.JobLedger import DEFAULT_MAX_ATTEMPTS
+from WebScraper.LeaseQueue import LeaseQueue
+from WebScraper.ProxyUtil import ProxyPool, ProxyScores
+from WebScraper.ResultStore import ResultStore
+from WebScraper.VideoTranscriptJobDescriptor import VideoTranscriptJobDescriptor, GenerateJobsFromVideo
+from WebScraper.VzardAIUploader import UploadWorker
+from WebScraper.WebScrapingUtility import JobStatus
+
+PROJECTS = 4
+FAILING_JOBS = 2
+SLOTS_PER_WORKER = 2
+# Documentation addresses (RFC 5737): the fake upload never connects to them
+FAKE_PROXIES = [{"ip": f"192.0.2.{i}", "port": 8080} for i in range(1, 9)]
+# Failing chunks must reach the attempt cap, not empty the proxy pool first
+PROXY_MAX_FAILURES = 10 ** 6
+
+
+def make_tree(tree: Path, jobs: int):
+    """
+    Fake `tree/videos/<project>/chunk_N.mp4` layout. Every chunk has its own content,
+    so no job is served from the result store.
+    """
+    for i in range(jobs):
+        video = tree / "videos" / f"project_{i % PROJECTS}" / f"chunk_{i:04d}.mp4"
+        video.parent.mkdir(parents=True, exist_ok=True)
+        video.write_bytes(video.name.encode())
+
+
+def is_failing(job: VideoTranscriptJobDescriptor) -> bool:
+    return int(job.VideoPath.stem.split("_")[1]) < FAILING_JOBS
+
+
+def _log_event(log_file: Path, event: str, worker_id: str, key: str):
+    # One small O_APPEND write per line, so lines of concurrent workers never interleave
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(f"{event} {worker_id} {key}\n")
+
+
+def fake_upload(log_file: Path, worker_id: str, upload_s: float, rng: random.Random,
+                job: VideoTranscriptJobDescriptor, proxy: dict, headless_mode=False,
+                driver_pool=None, metrics: dict | None = None) -> JobStatus:
+    """
+    Stands in for try_upload: same arguments after the bound ones, same JobStatus results.
+    """
+    key = LeaseQueue.GetKey(job)
+    _log_event(log_file, "started", worker_id, key)
+    if job.Cancel.wait(rng.uniform(0.5, 1.5) * upload_s):
+        return JobStatus.Cancelled
+    if is_failing(job):
+        return JobStatus.GenericError
+
+    html_file = job.GetHTMLOutputFilePath()
+    html_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = html_file.with_suffix(f".{os.getpid()}.tmp")
+    tmp_file.write_text(f"<html>{job.VideoPath.name}</html>", encoding="utf-8")
+    os.replace(tmp_file, html_file)
+    if metrics is not None:
+        metrics["Duration"] = time.perf_counter() - metrics["Started"]
+    _log_event(log_file, "uploaded", worker_id, key)
+    return JobStatus.Success
+
+
+def run_worker(worker_id: str, tree: Path, work_dir: Path, upload_s: float,
+               lease_ttl_s: float, heartbeat_s: float, max_attempts: int):
+    Logger.setup(level=LogLevel.WARNING, show_path_dev=False)
+    state_dir = work_dir / worker_id
+    state_dir.mkdir(parents=True, exist_ok=True)
+    proxy_pool = ProxyPool(FAKE_PROXIES, state_dir / "proxies.json", PROXY_MAX_FAILURES,
+                           scores=ProxyScores(state_dir / "proxy_stats.json"))
+    done = UploadWorker([tree / "videos"], tree / "html", work_dir / "queue", headless_Mode=True,
+                        workers=SLOTS_PER_WORKER, max_hedges=1, worker_id=worker_id,
+                        lease_ttl_s=lease_ttl_s, heartbeat_s=heartbeat_s, max_attempts=max_attempts,
+                        proxy_pool=proxy_pool, result_store=ResultStore(state_dir / "store"),
+                        upload_fn=partial(fake_upload, work_dir / "events.log", worker_id, upload_s,
+                                          random.Random(worker_id)))
+    sys.exit(0 if done else 1)
+
+
+def run_check(workers: int, jobs: int, upload_s: float, kill_after_s: float, lease_ttl_s: float,
+              heartbeat_s: float, max_attempts: int, timeout_s: float, work_dir: Path) -> dict:
+    tree = work_dir / "tree"
+    queue_dir = work_dir / "queue"
+    log_file = work_dir / "events.log"
+    make_tree(tree, jobs)
+    log_file.touch()
+
+    started = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=run_worker, name=f"worker-{i}",
+                                args=(f"worker-{i}", tree, work_dir, upload_s, lease_ttl_s, heartbeat_s,
+                                      max_attempts))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    time.sleep(kill_after_s)
+    victim = processes[0]
+    victim.kill()
+    victim.join()
+    Logger.info(f"Killed {victim.name} after {kill_after_s} s")
+
+    # Jobs never given up on (no attempt cap) would keep the workers going forever
+    unfinished = []
+    for process in processes[1:]:
+        process.join(max(0.0, timeout_s - (time.perf_counter() - started)))
+        if process.is_alive():
+            process.kill()
+            process.join()
+            unfinished.append(process.name)
+    elapsed = time.perf_counter() - started
+
+    # A queue opened after the run must clear the clock the killed worker left behind
+    time.sleep(lease_ttl_s)
+    with LeaseQueue(queue_dir, "checker", lease_ttl_s, heartbeat_s):
+        pass
+    leftover_clocks = sorted(p.name for p in (queue_dir / "clocks").glob("*.clock"))
+
+    events = [line.split() for line in log_file.read_text(encoding="utf-8").splitlines()]
+    starts = Counter(key for event, _, key in events if event == "started")
+    uploads = Counter(key for event, _, key in events if event == "uploaded")
+    # The killed worker may have uploaded a job without marking it done; that one is redone
+    victim_uploads = {key for event, worker, key in events if event == "uploaded" and worker == victim.name}
+    queue = LeaseQueue(queue_dir, "checker", lease_ttl_s, heartbeat_s)
+    descriptors = GenerateJobsFromVideo(tree / "videos", tree / "html")
+
+    problems = []
+    if len(descriptors) != jobs:
+        problems.append(f"{len(descriptors)} jobs found in the tree, expected {jobs}")
+    problems += [f"{name}: still running after {timeout_s} s" for name in unfinished]
+    problems += [f"{process.name}: exited with code {process.exitcode}"
+                 for process in processes[1:] if process.exitcode != 0 and process.name not in unfinished]
+    for job in descriptors:
+        key = queue.GetKey(job)
+        if is_failing(job):
+            if not queue.IsFailed(job):
+                problems.append(f"{key}: always fails but is not marked failed")
+            elif queue.Attempts(job) < max_attempts:
+                problems.append(f"{key}: marked failed after {queue.Attempts(job)} of {max_attempts} attempts")
+            if queue.IsDone(job):
+                problems.append(f"{key}: always fails but is marked done")
+            continue
+        if not queue.IsDone(job):
+            problems.append(f"{key}: lost, no done marker")
+        if queue.IsFailed(job):
+            problems.append(f"{key}: marked failed")
+        if not job.GetHTMLOutputFilePath().is_file():
+            problems.append(f"{key}: no HTML output")
+        if uploads[key] > 1 and key not in victim_uploads:
+            problems.append(f"{key}: uploaded {uploads[key]} times")
+        if (queue_dir / "leases" / f"{key}.lease").exists():
+            problems.append(f"{key}: lease left behind")
+    problems += [f"clock file left behind: {name}" for name in leftover_clocks]
+
+    return {
+        "Settings": {"Workers": workers, "Jobs": jobs, "FailingJobs": FAILING_JOBS, "UploadSeconds": upload_s,
+                     "KillAfterSeconds": kill_after_s, "LeaseTTLSeconds": lease_ttl_s,
+                     "HeartbeatSeconds": heartbeat_s, "MaxAttempts": max_attempts},
+        "ElapsedSeconds": round(elapsed, 3),
+        "KilledWorker": victim.name,
+        "UploadedBy": dict(Counter(worker for event, worker, _ in events if event == "uploaded")),
+        # Uploads the killed worker had started but not completed are done again by another worker
+        "RepeatedUploads": sum(n - 1 for key, n in starts.items() if n > 1 and uploads[key]),
+        "FailedJobs": queue.FailedJobs(descriptors),
+        "Problems": problems,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs upload workers with a fake upload in several processes, kills one, "
+                    "and checks every job is done once or failed at the attempt cap",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("-w", "--workers", type=int, default=4)
+    parser.add_argument("-n", "--jobs", type=int, default=80)
+    parser.add_argument("--upload-seconds", type=float, default=0.05, help="Mean duration of a fake upload")
+    parser.add_argument("--kill-after", type=float, default=0.5, help="Seconds before worker-0 is killed")
+    parser.add_argument("--lease-ttl", type=float, default=2.0)
+    parser.add_argument("--heartbeat", type=float, default=0.5)
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="Attempts after which a job is marked failed")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds before unfinished workers are killed")
+    parser.add_argument("--work-dir", type=Path, default=None,
+                        help="Where to create the fake tree and queue (default: a temporary directory)")
+    parser.add_argument("-o", "--output", type=Path, default=None,
+                        help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+    if args.workers < 2:
+        parser.error("At least 2 workers are needed: one of them is killed")
+    if args.jobs <= FAILING_JOBS:
+        parser.error(f"More than {FAILING_JOBS} jobs are needed: the first {FAILING_JOBS} always fail")
+
+    Logger.setup(level=LogLevel.INFO if args.output else LogLevel.WARNING, show_path_dev=False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = args.work_dir or Path(tmp)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        report = run_check(args.workers, args.jobs, args.upload_seconds, args.kill_after,
+                           args.lease_ttl, args.heartbeat, args.max_attempts, args.timeout, work_dir)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        Logger.info(f"Lease queue report written to '{args.output}'")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if report["Problems"]:
+        Logger.error(f"{len(report['Problems'])} checks failed:")
+        for problem in report["Problems"]:
+            Logger.error(f"  - {problem}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
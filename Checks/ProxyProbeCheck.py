@@ -0,0 +1,118 @@
+"""
+Check of the asyncio proxy prober against local stand-in proxies.
+
+Starts http.server based proxies on the loopback interface: one answering at once,
+one answering after a short delay, one answering only after the probe deadline,
+one answering 403, and a port nobody listens on. Probes them for an http and an
+https URL and checks that only the answering proxies are live, fastest first,
+that https probes go through CONNECT, and that the deadline bounds the run.
+
+Run from the repository root:
+    python -m Checks.ProxyProbeCheck
+"""
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Utility.Logger import Logger, LogLevel
+from WebScraper.ProxyUtil import probe_proxies
+
+HTTP_URL = "http://probe.invalid/ip"
+HTTPS_URL = "https://probe.invalid/ip"
+DELAYED_SECONDS = 0.3
+DEADLINE_SECONDS = 1.5
+SLOW_SECONDS = DEADLINE_SECONDS + 3
+DEADLINE_SLACK_SECONDS = 1
+
+
+class _StandInProxy(BaseHTTPRequestHandler):
+    """
+    Answers GET and CONNECT after `delay` seconds with `status`, recording what it received.
+    """
+    delay = 0.0
+    status = 200
+    received: list[str]
+
+    def _answer(self):
+        self.received.append(f"{self.command} {self.path}")
+        time.sleep(self.delay)
+        try:
+            self.send_response(self.status)
+            self.end_headers()
+        except OSError:
+            pass  # the prober gave up on us
+
+    do_GET = _answer
+    do_CONNECT = _answer
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_proxy(name: str, delay: float = 0.0, status: int = 200) -> tuple[dict, list[str], ThreadingHTTPServer]:
+    received = []
+    handler = type(f"{name}Proxy", (_StandInProxy,), {"delay": delay, "status": status, "received": received})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return {"ip": "127.0.0.1", "port": server.server_address[1], "name": name}, received, server
+
+
+def _refused_proxy() -> dict:
+    # A port that was just free: connections to it are refused
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return {"ip": "127.0.0.1", "port": port, "name": "refused"}
+
+
+def run_check() -> list[str]:
+    fast, fast_received, fast_server = _start_proxy("fast")
+    delayed, delayed_received, delayed_server = _start_proxy("delayed", delay=DELAYED_SECONDS)
+    slow, _, slow_server = _start_proxy("slow", delay=SLOW_SECONDS)
+    forbidden, _, forbidden_server = _start_proxy("forbidden", status=403)
+    proxies = [slow, delayed, _refused_proxy(), fast, forbidden]
+
+    problems = []
+    try:
+        for url in (HTTP_URL, HTTPS_URL):
+            started = time.perf_counter()
+            live = probe_proxies(proxies, url, timeout=SLOW_SECONDS + 5, deadline=DEADLINE_SECONDS)
+            elapsed = time.perf_counter() - started
+
+            names = [proxy["name"] for proxy in live]
+            if names != ["fast", "delayed"]:
+                problems.append(f"{url}: live proxies {names}, expected ['fast', 'delayed'] in that order")
+            if any("latency" not in proxy for proxy in live):
+                problems.append(f"{url}: live proxies without a probe latency")
+            elif len(live) == 2 and not live[0]["latency"] <= live[1]["latency"]:
+                problems.append(f"{url}: latencies not sorted: {[p['latency'] for p in live]}")
+            if elapsed > DEADLINE_SECONDS + DEADLINE_SLACK_SECONDS:
+                problems.append(f"{url}: probing took {elapsed:.2f}s despite a {DEADLINE_SECONDS}s deadline")
+
+        expected = [f"GET {HTTP_URL}", "CONNECT probe.invalid:443"]
+        for name, received in (("fast", fast_received), ("delayed", delayed_received)):
+            if received != expected:
+                problems.append(f"{name} proxy received {received}, expected {expected}")
+    finally:
+        for server in (fast_server, delayed_server, slow_server, forbidden_server):
+            server.shutdown()
+            server.server_close()
+    return problems
+
+
+def main():
+    Logger.setup(level=LogLevel.INFO, show_path_dev=False)
+    problems = run_check()
+    if problems:
+        Logger.error(f"{len(problems)} checks failed:")
+        for problem in problems:
+            Logger.error(f"  - {problem}")
+        sys.exit(1)
+    Logger.info("Proxy probe check passed.")
+
+
+if __name__ == "__main__":
+    main()
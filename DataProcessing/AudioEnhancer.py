@@ -1,20 +1,44 @@
 import os
+import sys
+from collections import deque
+from contextlib import ExitStack
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import Path
 
+import ffmpeg
 import noisereduce as nr
 import numpy as np
 import soundfile as sf
-from scipy.signal import butter, lfilter
+from scipy.signal import butter, sosfilt
 
 from DataProcessing import AUDIO_EXTENSIONS
-from DataProcessing.ffmpegUtil import get_audio_settings, AudioFormat
+from DataProcessing.NoiseProfile import NoiseProfile, NoiseReductionMode, NOISE_PROFILE_FILE_NAME, \
+    profile_key, estimate_noise_clip, noise_spectral_stats, stationary_gate
+from DataProcessing.ffmpegUtil import get_audio_settings, AudioFormat, get_audio_sample_rate, \
+    decode_audio, decode_audio_blocks, ffmpeg_slot
 from Utility.Logger import Logger
 
+DEFAULT_BLOCK_SECONDS = 30      # block size of the streaming engine; bounds peak memory
+NOISE_CLIP_SECONDS = 2          # noise estimate taken from the start of each chunk
+NOISE_CONTEXT_SECONDS = 1       # overlap fed to the denoiser to hide block edges
+SOUNDFILE_READ_EXTENSIONS = (".wav", ".flac", ".ogg")  # other media are decoded through an ffmpeg pipe
 
 # === Utility Functions ===
+def _is_soundfile_readable(file_path) -> bool:
+    return Path(file_path).suffix.lower() in SOUNDFILE_READ_EXTENSIONS
+
+
+def get_sample_rate(file_path) -> int:
+    if _is_soundfile_readable(file_path):
+        return sf.info(str(file_path)).samplerate
+    return get_audio_sample_rate(file_path)
+
+
 def load_audio_chunk(file_path):
     """
-    Load an audio chunk using soundfile.
+    Load an audio chunk using soundfile (any other media through the ffmpeg decode pipe).
 
     Args:
         file_path (str or Path): Path to the audio file.
@@ -23,6 +47,8 @@ def load_audio_chunk(file_path):
         tuple: (audio_data as numpy array, sample_rate)
     """
     try:
+        if not _is_soundfile_readable(file_path):
+            return decode_audio(file_path)
         audio_data, sr = sf.read(str(file_path), dtype="float32")
         if audio_data.ndim > 1:
             audio_data = np.mean(audio_data, axis=1)
@@ -37,34 +63,122 @@ def save_audio(audio_data, sr, file_path, codec=None, bitrate=None):
     Save a numpy array as an audio file (WAV/MP3/FLAC/OGG).
 
     Args:
-        audio_data (np.ndarray): Audio data to save.
+        audio_data (np.ndarray): Audio data to save, shaped (frames,) or (frames, channels).
         sr (int): Sample rate.
         file_path (str or Path): Output path.
         codec (str, optional): Codec (from get_audio_settings).
         bitrate (str, optional): Bitrate (only for formats like MP3).
     """
-    file_path = str(file_path)
     try:
-        if file_path.endswith((".wav", ".flac", ".ogg")):
-            sf.write(file_path, audio_data, sr)
-        elif file_path.endswith(".mp3"):
-            import subprocess
-            temp_wav = file_path.replace(".mp3", "_temp.wav")
-            sf.write(temp_wav, audio_data, sr)
-            cmd = ["ffmpeg", "-y", "-i", temp_wav, "-codec:a", codec or "libmp3lame"]
-            if bitrate:
-                cmd.extend(["-b:a", bitrate])
-            cmd.append(file_path)
-            subprocess.run(cmd, check=True)
-            os.remove(temp_wav)
-        else:
-            raise ValueError(f"Unsupported file format: {file_path}")
+        channels = 1 if np.ndim(audio_data) == 1 else np.shape(audio_data)[1]
+        with AudioSink(file_path, sr, codec=codec, bitrate=bitrate, channels=channels) as sink:
+            sink.write(audio_data)
     except Exception as e:
         Logger.error(f"Error saving audio to '{file_path}': {e}")
         raise
 
 
+def iter_audio_blocks(file_path, block_seconds=None):
+    """
+    Reads an audio file as consecutive mono float32 blocks of `block_seconds`.
+    Formats soundfile cannot read (MP3, M4A, video containers...) are decoded by
+    ffmpeg straight into memory, without an intermediate WAV.
+
+    Yields:
+        np.ndarray: Mono block (channels are averaged, as in load_audio_chunk).
+    """
+    if not _is_soundfile_readable(file_path):
+        yield from decode_audio_blocks(file_path, block_seconds=block_seconds or DEFAULT_BLOCK_SECONDS)
+        return
+    with sf.SoundFile(str(file_path)) as f:
+        block_frames = int((block_seconds or DEFAULT_BLOCK_SECONDS) * f.samplerate)
+        for block in f.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+            yield block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+
+
+class AudioSink:
+    """
+    Incremental audio writer: blocks are appended as they are produced, so the
+    complete signal is never held in memory nor written to disk twice.
+    WAV/FLAC are written directly by soundfile; MP3/OGG are encoded on the fly by a
+    single ffmpeg process that reads raw float32 PCM from its stdin, which holds
+    an ffmpeg slot until the sink is closed.
+    """
+
+    SOUNDFILE_EXTENSIONS = (".wav", ".flac")
+    ENCODER_CODECS = {".mp3": "libmp3lame", ".ogg": "libvorbis"}
+
+    def __init__(self, file_path, sr, codec=None, bitrate=None, channels=1):
+        self.FilePath = str(file_path)
+        self.Codec = codec
+        self.Bitrate = bitrate
+        self._file = None
+        self._process = None
+        self._slot = ExitStack()
+
+        suffix = Path(self.FilePath).suffix.lower()
+        if suffix in self.SOUNDFILE_EXTENSIONS:
+            self._file = sf.SoundFile(self.FilePath, "w", samplerate=sr, channels=channels)
+        elif suffix in self.ENCODER_CODECS:
+            output_args = {"acodec": codec or self.ENCODER_CODECS[suffix]}
+            if bitrate:
+                output_args["audio_bitrate"] = bitrate
+            self._slot.enter_context(ffmpeg_slot())
+            try:
+                self._process = (
+                    ffmpeg.input("pipe:", format="f32le", ac=channels, ar=sr)
+                          .output(self.FilePath, **output_args)
+                          .global_args("-loglevel", "error")
+                          .overwrite_output()
+                          .run_async(pipe_stdin=True, pipe_stderr=True)
+                )
+            except BaseException:
+                self._slot.close()
+                raise
+        else:
+            raise ValueError(f"Unsupported file format: {self.FilePath}")
+
+    def write(self, block):
+        if self._file is not None:
+            self._file.write(block)
+            return
+        pcm = np.ascontiguousarray(block, dtype="<f4")
+        try:
+            self._process.stdin.write(memoryview(pcm).cast("B"))
+        except BrokenPipeError:
+            # The encoder exited early; close() raises with its error message
+            self.close()
+            raise
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._process is not None:
+            process, self._process = self._process, None
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            try:
+                stderr = process.stderr.read()
+                returncode = process.wait()
+            finally:
+                self._slot.close()
+            if returncode != 0:
+                raise RuntimeError(f"ffmpeg failed to encode '{self.FilePath}': "
+                                   f"{stderr.decode(errors='ignore').strip()}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 # === Audio Processing Functions ===
+# All functions keep float32 input in float32 and accept `out=` buffers
+# (pass the input itself to work in place).
 def butter_bandpass(lowcut, highcut, fs, order=6):
     nyq = 0.5 * fs
     low = lowcut / nyq
@@ -73,47 +187,530 @@ def butter_bandpass(lowcut, highcut, fs, order=6):
     return b, a
 
 
-def bandpass_filter(data, lowcut, highcut, fs, order=6):
-    b, a = butter_bandpass(lowcut, highcut, fs, order=order)
-    return lfilter(b, a, data)
+@lru_cache(maxsize=32)
+def butter_bandpass_sos(lowcut, highcut, fs, order=6):
+    """
+    Second-order sections of the band-pass filter, computed once per
+    (lowcut, highcut, fs, order) and stored as float32 so sosfilt does not upcast.
+    """
+    nyq = 0.5 * fs
+    return butter(order, [lowcut / nyq, highcut / nyq], btype="band", output="sos").astype(np.float32)
+
+
+def bandpass_initial_state(lowcut, highcut, fs, order=6):
+    """
+    Zero (at rest) filter state for bandpass_filter's `zi`.
+    """
+    return np.zeros((butter_bandpass_sos(lowcut, highcut, fs, order).shape[0], 2), dtype=np.float32)
+
+
+def bandpass_filter(data, lowcut, highcut, fs, order=6, zi=None):
+    """
+    Band-pass filter. When `zi` is given, returns (filtered, final_state) so the
+    filter can continue seamlessly on the next block.
+    """
+    sos = butter_bandpass_sos(lowcut, highcut, fs, order)
+    data = np.asarray(data, dtype=np.float32)
+    if zi is None:
+        return sosfilt(sos, data)
+    return sosfilt(sos, data, zi=zi)
 
 
 def reduce_noise_audio(signal, sr, noise_duration=2):
     noise_clip = signal[: int(noise_duration * sr)]
-    return nr.reduce_noise(y=signal, y_noise=noise_clip, sr=sr)
+    return nr.reduce_noise(y=signal, y_noise=noise_clip, sr=sr).astype(np.float32, copy=False)
 
 
-def compress_audio(signal, threshold_db=-30, ratio=4):
-    threshold = 10 ** (threshold_db / 20.0)
-    compressed = np.copy(signal)
-    above_thresh = np.abs(signal) > threshold
-    compressed[above_thresh] = np.sign(signal[above_thresh]) * (
-        threshold + (np.abs(signal[above_thresh]) - threshold) / ratio
-    )
-    return compressed
+def denoise(signal, sr, mode=NoiseReductionMode.NONSTATIONARY, noise_reference=None):
+    """
+    Applies the selected noise reduction.
+
+    Args:
+        noise_reference: Noise statistics from prepare_noise_reference (STATIONARY mode only).
+    """
+    if mode == NoiseReductionMode.STATIONARY:
+        return stationary_gate(signal, sr, noise_reference)
+    return reduce_noise_audio(signal, sr, noise_duration=NOISE_CLIP_SECONDS)
 
 
-def boost_volume(signal, gain_db=6):
+def compress_and_gain(signal, threshold_db=-30, ratio=4, gain_db=0, normalize=False, scratch=None):
+    """
+    Fused, in-place compressor + gain (+ peak normalization) in a single kernel.
+    `scratch` is an optional work buffer of the same shape as `signal`.
+
+    Returns:
+        tuple: (signal, peak) where peak is the absolute peak after compression and gain
+               (before normalization).
+    """
+    threshold = 10 ** (threshold_db / 20.0)
+    factor = 10 ** (gain_db / 20.0)
+    excess = scratch if scratch is not None else np.empty_like(signal)
+
+    np.abs(signal, out=excess)
+    input_peak = float(excess.max()) if excess.size else 0.0
+    np.subtract(excess, threshold, out=excess)
+    np.maximum(excess, 0, out=excess)
+    np.copysign(excess, signal, out=excess)
+    excess *= (1 - 1 / ratio)
+    signal -= excess  # above the threshold: sign(x) * (threshold + (|x| - threshold) / ratio)
+
+    # The compressor curve is monotonic, so the output peak follows from the input peak
+    peak = input_peak if input_peak <= threshold else threshold + (input_peak - threshold) / ratio
+    peak *= factor
+    scale = factor / peak if normalize and peak > 0 else factor
+    signal *= signal.dtype.type(scale)
+    return signal, peak
+
+
+def compress_audio(signal, threshold_db=-30, ratio=4, out=None):
+    if out is None:
+        out = np.array(signal, dtype=np.float32)
+    elif out is not signal:
+        np.copyto(out, signal)
+    return compress_and_gain(out, threshold_db, ratio)[0]
+
+
+def boost_volume(signal, gain_db=6, out=None):
     factor = 10 ** (gain_db / 20)
-    return signal * factor
+    return np.multiply(signal, np.float32(factor), out=out)
+
+
+def normalize_audio(signal, out=None):
+    return np.divide(signal, np.float32(np.max(np.abs(signal))), out=out)
+
 
+# === Streaming Enhancement ===
+class StreamState:
+    """
+    Band-pass filter memory carried from one block to the next, and across
+    contiguous chunks.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.SampleRate = None
+        self.FilterState = None
+
+
+def enhance_chunk_streaming(chunk_file: Path,
+                            enhanced_chunk_file: Path,
+                            state: StreamState,
+                            lowcut=80, highcut=8000,
+                            compress_threshold_db=-20, compress_ratio=2,
+                            gain_db=6,
+                            block_seconds=DEFAULT_BLOCK_SECONDS,
+                            sink: AudioSink | None = None,
+                            noise_mode: NoiseReductionMode = NoiseReductionMode.NONSTATIONARY,
+                            noise_reference=None) -> int:
+    """
+    Enhances a chunk block by block with bounded memory.
+
+    The first pass filters, denoises, compresses and boosts each block into a
+    temporary float WAV while tracking the peak; the second pass normalizes it into
+    `enhanced_chunk_file` and, if given, appends it to `sink`.
+    The denoiser sees NOISE_CONTEXT_SECONDS of audio on both sides of every block
+    (overlap-save), so block edges do not show in the output.
 
-def normalize_audio(signal):
-    return signal / np.max(np.abs(signal))
+    Returns:
+        int: Sample rate of the chunk.
+    """
+    sr = get_sample_rate(chunk_file)
+    if state.SampleRate != sr or state.FilterState is None:
+        state.reset()
+        state.SampleRate = sr
+        state.FilterState = bandpass_initial_state(lowcut, highcut, sr)
+    context_frames = int(NOISE_CONTEXT_SECONDS * sr)
+
+    peak = 0.0
+    scratch = np.empty(int((block_seconds + NOISE_CONTEXT_SECONDS) * sr), dtype=np.float32)
+    carry = np.zeros(0, dtype=np.float32)  # filtered samples kept for the next block
+    written = 0                            # leading samples of `carry` already written (left context)
+    partial_file = enhanced_chunk_file.with_name(f"{enhanced_chunk_file.stem}.partial.wav")
+
+    def _write_denoised(buffer, start, end):
+        nonlocal peak
+        if end <= start:
+            return
+        denoised = denoise(buffer, sr, noise_mode, noise_reference)
+        enhanced = np.asarray(denoised[start:end], dtype=np.float32)
+        _, segment_peak = compress_and_gain(enhanced, compress_threshold_db, compress_ratio, gain_db,
+                                            scratch=scratch[:len(enhanced)])
+        peak = max(peak, segment_peak)
+        partial.write(enhanced)
+
+    with sf.SoundFile(str(partial_file), "w", samplerate=sr, channels=1, subtype="FLOAT") as partial:
+        for block in iter_audio_blocks(chunk_file, block_seconds):
+            filtered, state.FilterState = bandpass_filter(block, lowcut, highcut, sr, zi=state.FilterState)
+
+            buffer = np.concatenate([carry, filtered])
+            # Hold back the tail until the next block provides its right-hand context
+            held = min(context_frames, len(buffer) - written)
+            _write_denoised(buffer, written, len(buffer) - held)
+            carry = buffer[-(held + context_frames):]
+            written = len(carry) - held
+
+        # End of chunk: the held-back tail has no right-hand context left to wait for
+        _write_denoised(carry, written, len(carry))
+
+    scale = 1.0 / peak if peak > 0 else 1.0
+    with sf.SoundFile(str(enhanced_chunk_file), "w", samplerate=sr, channels=1) as out:
+        for block in iter_audio_blocks(partial_file, block_seconds):
+            block *= scale
+            out.write(block)
+            if sink:
+                sink.write(block)
+    os.remove(partial_file)
+    return sr
+
+
+def _enhance_chunks_streaming(chunks: list[Path],
+                              enhanced_chunk_dir: Path,
+                              sink: AudioSink | None,
+                              settings: dict,
+                              overwrite: bool,
+                              block_seconds) -> bool:
+    """
+    Enhances the chunks one after another in blocks, appending each to `sink`.
+    """
+    state = StreamState()
+    for idx, chunk_file in enumerate(chunks, start=1):
+        Logger.info(f"Processing chunk {idx}/{len(chunks)}: '{chunk_file.name}'")
+
+        try:
+            enhanced_chunk_file = enhanced_chunk_dir / f"{chunk_file.stem}_enhanced.wav"
+
+            if enhanced_chunk_file.exists() and not overwrite:
+                Logger.info(f"Enhanced chunk exists: '{enhanced_chunk_file.name}'. Skipping.")
+                # The filter memory no longer matches what precedes the next chunk
+                state.reset()
+                if sink:
+                    for block in iter_audio_blocks(enhanced_chunk_file, block_seconds):
+                        sink.write(block)
+                continue
+
+            enhance_chunk_streaming(chunk_file, enhanced_chunk_file, state,
+                                    block_seconds=block_seconds, sink=sink, **settings)
+
+        except Exception as e:
+            Logger.error(f"Error processing chunk '{chunk_file.name}': {e}")
+            return False
+    return True
+
+
+def enhance_signal(signal, sr,
+                   lowcut=80, highcut=8000,
+                   compress_threshold_db=-20, compress_ratio=2,
+                   gain_db=6,
+                   noise_mode: NoiseReductionMode = NoiseReductionMode.NONSTATIONARY,
+                   noise_reference=None,
+                   out=None):
+    """
+    Runs the full enhancement chain on a complete in-memory signal.
+    The band-pass filter and the denoiser produce new arrays; the compressor, gain
+    and normalization then run in place, on `out` if given (`out=signal` stores the
+    result in the input's buffer).
+    """
+    enhanced = bandpass_filter(signal, lowcut, highcut, sr)
+    enhanced = denoise(enhanced, sr, noise_mode, noise_reference)
+    if out is not None:
+        np.copyto(out, enhanced)
+        enhanced = out
+    # Gain is applied before normalization as before; it only matters for the reported peak
+    return compress_and_gain(enhanced, compress_threshold_db, compress_ratio, gain_db, normalize=True)[0]
+
+
+# === Parallel Enhancement ===
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Attaches to a block created by the parent, which owns it and unlinks it.
+    Pool workers share the parent's resource tracker, so on Python < 3.13 the
+    implicit re-registration is harmless.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _load_into_shared_memory(file_path: Path, block_seconds) -> tuple[shared_memory.SharedMemory, int, int]:
+    """
+    Decodes a chunk block by block straight into a new shared memory buffer.
+
+    Returns:
+        tuple: (shared memory block, number of frames, sample rate)
+    """
+    if _is_soundfile_readable(file_path):
+        info = sf.info(str(file_path))
+        total_frames, sr, decoded = info.frames, info.samplerate, None
+    else:
+        # The length of compressed media is only known once decoded
+        decoded, sr = decode_audio(file_path)
+        total_frames = len(decoded)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, total_frames) * np.dtype(np.float32).itemsize)
+    signal = np.ndarray((total_frames,), dtype=np.float32, buffer=shm.buf)
+    frames = 0
+    try:
+        for block in [decoded] if decoded is not None else iter_audio_blocks(file_path, block_seconds):
+            block = block[: total_frames - frames]
+            signal[frames:frames + len(block)] = block
+            frames += len(block)
+    except Exception:
+        del signal
+        shm.close()
+        shm.unlink()
+        raise
+    del signal
+    return shm, frames, sr
+
+
+def _enhance_shared_chunk(shm_name: str, frames: int, sr: int, settings: dict):
+    """
+    Pool worker: enhances the chunk held in shared memory and stores the result there.
+    """
+    shm = _attach_shared_memory(shm_name)
+    signal = np.ndarray((frames,), dtype=np.float32, buffer=shm.buf)
+    try:
+        enhance_signal(signal, sr, out=signal, **settings)
+    finally:
+        del signal
+        shm.close()
+
+
+def _enhance_chunks_parallel(chunks: list[Path],
+                             enhanced_chunk_dir: Path,
+                             sink: AudioSink | None,
+                             settings: dict,
+                             overwrite: bool,
+                             workers: int,
+                             block_seconds) -> bool:
+    """
+    Enhances independent chunks on a process pool. Audio moves between processes
+    through shared memory; results are written (and appended to `sink`) strictly in
+    chunk order, and at most workers + 1 chunks are held in memory at a time.
+    """
+    in_flight = deque()  # (chunk_file, enhanced_chunk_file, future or None, shm or None, frames, sr)
+    succeeded = True
+
+    def _release(shm):
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    def _complete_oldest():
+        chunk_file, enhanced_chunk_file, future, shm, frames, sr = in_flight.popleft()
+        try:
+            if future is None:
+                Logger.info(f"Enhanced chunk exists: '{enhanced_chunk_file.name}'. Skipping.")
+                if sink:
+                    for block in iter_audio_blocks(enhanced_chunk_file, block_seconds):
+                        sink.write(block)
+                return
+
+            try:
+                future.result()
+            except Exception as e:
+                raise RuntimeError(f"'{chunk_file.name}': {e}") from e
+            signal = np.ndarray((frames,), dtype=np.float32, buffer=shm.buf)
+            try:
+                save_audio(signal, sr, enhanced_chunk_file)
+                if sink:
+                    sink.write(signal)
+            finally:
+                del signal
+            Logger.info(f"Enhanced chunk saved: '{enhanced_chunk_file.name}'")
+        finally:
+            _release(shm)
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=Logger.SetupWorker,
+                             initargs=(Logger.GetLevel(),)) as executor:
+        try:
+            for idx, chunk_file in enumerate(chunks, start=1):
+                enhanced_chunk_file = enhanced_chunk_dir / f"{chunk_file.stem}_enhanced.wav"
+                if enhanced_chunk_file.exists() and not overwrite:
+                    in_flight.append((chunk_file, enhanced_chunk_file, None, None, 0, 0))
+                else:
+                    Logger.info(f"Submitting chunk {idx}/{len(chunks)}: '{chunk_file.name}'")
+                    try:
+                        shm, frames, sr = _load_into_shared_memory(chunk_file, block_seconds)
+                    except Exception as e:
+                        raise RuntimeError(f"'{chunk_file.name}': {e}") from e
+                    # Tracked before submitting so the buffer is released even if submit fails
+                    in_flight.append((chunk_file, enhanced_chunk_file, None, shm, frames, sr))
+                    future = executor.submit(_enhance_shared_chunk, shm.name, frames, sr, settings)
+                    in_flight[-1] = (chunk_file, enhanced_chunk_file, future, shm, frames, sr)
+
+                while len(in_flight) > workers:
+                    _complete_oldest()
+
+            while in_flight:
+                _complete_oldest()
+
+        except Exception as e:
+            Logger.error(f"Error processing chunk {e}")
+            succeeded = False
+            for _, _, future, _, _, _ in in_flight:
+                if future is not None:
+                    future.cancel()
+            executor.shutdown(wait=True)
+            while in_flight:
+                _release(in_flight.popleft()[3])
+
+    return succeeded
+
+
+# === Project Noise Profile ===
+def get_project_noise_profile(project: Path, chunks: list[Path],
+                              block_seconds=DEFAULT_BLOCK_SECONDS) -> NoiseProfile | None:
+    """
+    Returns the noise profile of a split project, estimated once from the quietest
+    windows across all of its chunks and cached next to its metadata.json.
+    The cache is rebuilt when the chunks change.
+
+    Returns:
+        NoiseProfile | None: None if the project contains no usable (non-digital-silence) audio.
+    """
+    profile_file = Path(project) / NOISE_PROFILE_FILE_NAME
+    key = profile_key(chunks)
+    if profile_file.exists():
+        try:
+            profile = NoiseProfile.load(profile_file)
+            if profile.Key == key:
+                Logger.info(f"Using cached noise profile for '{Path(project).name}'")
+                return profile
+        except Exception as e:
+            Logger.warning(f"Ignoring unreadable noise profile '{profile_file}': {e}")
+
+    Logger.info(f"Estimating noise profile for '{Path(project).name}' from {len(chunks)} chunks...")
+    sr = get_sample_rate(chunks[0])
+    clip = estimate_noise_clip((iter_audio_blocks(chunk, block_seconds) for chunk in chunks), sr)
+    if clip.size == 0:
+        return None
+
+    profile = NoiseProfile(clip, sr, key)
+    profile.save(profile_file)
+    return profile
+
+
+def prepare_noise_reference(profile: NoiseProfile | None, lowcut, highcut, sr):
+    """
+    Per-frequency noise statistics for the stationary gate. The profile clip goes
+    through the same band-pass filter as the audio it is compared to.
+
+    Returns:
+        None when no profile is available for this sample rate.
+    """
+    if profile is None or profile.SampleRate != sr:
+        return None
+    return noise_spectral_stats(bandpass_filter(profile.Clip, lowcut, highcut, sr), sr)
+
+
+# === Main Enhancement Functions ===
+def EnhanceProject(project: Path,
+                   out_dir: Path,
+                   audio_format: AudioFormat = AudioFormat.WAV,
+                   lowcut=80, highcut=8000,
+                   compress_threshold_db=-20, compress_ratio=2,
+                   gain_db=6,
+                   overwrite: bool = False,
+                   block_seconds=DEFAULT_BLOCK_SECONDS,
+                   workers: int = 1,
+                   noise_mode: NoiseReductionMode = NoiseReductionMode.NONSTATIONARY) -> bool:
+    """
+    Enhances every chunk of a single project and appends it to the project's final
+    file as it goes. Skips chunks already processed unless overwrite=True.
+
+    In STATIONARY mode every chunk is gated against the same project noise
+    profile (see get_project_noise_profile).
+
+    With workers=1 audio is processed in blocks of `block_seconds`, so peak memory
+    depends on the block size and not on the recording length. With workers > 1
+    whole chunks are enhanced independently on a process pool instead.
+
+    Returns:
+        bool: True if all chunks of the project were enhanced.
+    """
+    project = Path(project)
+    project_name = project.name
+    Logger.info(f"Processing project: '{project_name}'")
+
+    project_out_dir = Path(out_dir) / project_name
+    enhanced_chunk_dir = project_out_dir / "enhanced_chunks"
+    enhanced_chunk_dir.mkdir(parents=True, exist_ok=True)
+
+    chunks = sorted([f for f in project.iterdir()
+                     if f.is_file() and f.suffix.lower() in AUDIO_EXTENSIONS])
+    if not chunks:
+        Logger.warning(f"No audio chunks found in '{project_name}'. Skipping.")
+        return False
+
+    Logger.info(f"Found {len(chunks)} chunks in '{project_name}'")
+
+    final_file = project_out_dir / f"{project_name}.{audio_format.value}"
+    write_final = overwrite or not final_file.exists()
+    if not write_final:
+        Logger.info(f"Final file exists for '{project_name}'. Skipping save.")
+
+    sr = get_sample_rate(chunks[0])
+    noise_reference = None
+    pending = overwrite or any(not (enhanced_chunk_dir / f"{c.stem}_enhanced.wav").exists() for c in chunks)
+    if noise_mode == NoiseReductionMode.STATIONARY and pending:
+        try:
+            profile = get_project_noise_profile(project, chunks, block_seconds)
+            noise_reference = prepare_noise_reference(profile, lowcut, highcut, sr)
+        except Exception as e:
+            Logger.error(f"Error estimating the noise profile of '{project_name}': {e}")
+            return False
+        if noise_reference is None:
+            Logger.warning(f"No usable noise profile for '{project_name}'. Using non-stationary noise reduction.")
+            noise_mode = NoiseReductionMode.NONSTATIONARY
+
+    settings = dict(lowcut=lowcut, highcut=highcut,
+                    compress_threshold_db=compress_threshold_db, compress_ratio=compress_ratio,
+                    gain_db=gain_db, noise_mode=noise_mode, noise_reference=noise_reference)
+    codec, bitrate = get_audio_settings(audio_format)
+    sink = AudioSink(final_file, sr, codec=codec, bitrate=bitrate) if write_final else None
+
+    succeeded = False
+    try:
+        if workers > 1:
+            succeeded = _enhance_chunks_parallel(chunks, enhanced_chunk_dir, sink, settings,
+                                                 overwrite, workers, block_seconds)
+        else:
+            succeeded = _enhance_chunks_streaming(chunks, enhanced_chunk_dir, sink, settings,
+                                                  overwrite, block_seconds)
+    finally:
+        if sink:
+            try:
+                sink.close()
+            except Exception as e:
+                # e.g. the ffmpeg encoder failed: what is on disk is truncated
+                Logger.error(f"Error finishing the final file of '{project_name}': {e}")
+                succeeded = False
+            if succeeded:
+                Logger.info(f"Final enhanced audio saved to: '{final_file}'")
+            else:
+                # An incomplete final file would be skipped as "existing" on the next run
+                final_file.unlink(missing_ok=True)
+    return succeeded
 
 
-# === Main Enhancement Function ===
 def EnhanceAudioFolder(input_dir: Path,
                        out_dir: Path,
                        audio_format: AudioFormat = AudioFormat.WAV,
                        lowcut=80, highcut=8000,
                        compress_threshold_db=-20, compress_ratio=2,
                        gain_db=6,
-                       overwrite: bool = False):
+                       overwrite: bool = False,
+                       workers: int = 1,
+                       noise_mode: NoiseReductionMode = NoiseReductionMode.NONSTATIONARY):
     """
     Enhances all audio projects in a folder structure.
     Each project has multiple chunks.
     Skips chunks already processed unless overwrite=True.
+    With workers > 1 the chunks of each project are enhanced on a process pool.
     """
     input_dir = Path(input_dir)
     out_dir = Path(out_dir)
@@ -128,63 +725,12 @@ def EnhanceAudioFolder(input_dir: Path,
     failed_projects = []
 
     for project in projects:
-        project_name = project.name
-        Logger.info(f"Processing project: '{project_name}'")
-
-        project_out_dir = out_dir / project_name
-        enhanced_chunk_dir = project_out_dir / "enhanced_chunks"
-        enhanced_chunk_dir.mkdir(parents=True, exist_ok=True)
-
-        enhanced_chunks = []
-        sr = None
-
-        chunks = sorted([f for f in project.iterdir()
-                         if f.is_file() and f.suffix.lower() in AUDIO_EXTENSIONS])
-        if not chunks:
-            Logger.warning(f"No audio chunks found in '{project_name}'. Skipping.")
-            failed_projects.append(project_name)
-            continue
-
-        Logger.info(f"Found {len(chunks)} chunks in '{project_name}'")
-
-        for idx, chunk_file in enumerate(chunks, start=1):
-            Logger.info(f"Processing chunk {idx}/{len(chunks)}: '{chunk_file.name}'")
-
-            try:
-                enhanced_chunk_file = enhanced_chunk_dir / f"{chunk_file.stem}_enhanced.wav"
-
-                if enhanced_chunk_file.exists() and not overwrite:
-                    Logger.info(f"Enhanced chunk exists: '{enhanced_chunk_file.name}'. Skipping.")
-                    chunk, sr = load_audio_chunk(enhanced_chunk_file)
-                    enhanced_chunks.append(chunk)
-                    continue
-
-                chunk, sr = load_audio_chunk(chunk_file)
-                enhanced = bandpass_filter(chunk, lowcut, highcut, sr)
-                enhanced = reduce_noise_audio(enhanced, sr)
-                enhanced = compress_audio(enhanced, threshold_db=compress_threshold_db, ratio=compress_ratio)
-                enhanced = boost_volume(enhanced, gain_db)
-                enhanced = normalize_audio(enhanced)
-
-                save_audio(enhanced, sr, enhanced_chunk_file)
-                enhanced_chunks.append(enhanced)
-
-            except Exception as e:
-                Logger.error(f"Error processing chunk '{chunk_file.name}': {e}")
-                failed_projects.append(project_name)
-                break
-
-        # Save concatenated final audio
-        if enhanced_chunks:
-            final_audio = np.concatenate(enhanced_chunks)
-            final_file = project_out_dir / f"{project_name}.{audio_format.value}"
-
-            if final_file.exists() and not overwrite:
-                Logger.info(f"Final file exists for '{project_name}'. Skipping save.")
-            else:
-                codec, bitrate = get_audio_settings(audio_format)
-                save_audio(final_audio, sr, final_file, codec=codec, bitrate=bitrate)
-                Logger.info(f"Final enhanced audio saved to: '{final_file}'")
+        if not EnhanceProject(project, out_dir, audio_format,
+                              lowcut=lowcut, highcut=highcut,
+                              compress_threshold_db=compress_threshold_db, compress_ratio=compress_ratio,
+                              gain_db=gain_db, overwrite=overwrite, workers=workers,
+                              noise_mode=noise_mode):
+            failed_projects.append(project.name)
 
     if failed_projects:
         Logger.warning(f"{len(failed_projects)} projects failed during enhancement:")
@@ -1,10 +1,32 @@
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from enum import Enum
 from pathlib import Path
+
+import ffmpeg
 from moviepy import VideoFileClip
 
 from DataProcessing import AUDIO_EXTENSIONS
-from DataProcessing.ffmpegUtil import AudioFormat, get_audio_settings
-from Utility.Logger import Logger
+from DataProcessing.ffmpegUtil import AudioFormat, get_audio_settings, safe_probe, flush_probe_cache, \
+    ffmpeg_slot, get_max_ffmpeg_processes, share_ffmpeg_slots
+from Utility.Logger import Logger, LogLevel
+
+# Sample rate used when transcoding, same default as moviepy's write_audiofile
+EXTRACTION_SAMPLE_RATE = 44100
+
+# Source codecs that can be stream-copied as-is into the target container
+COPY_COMPATIBLE_CODECS = {
+    AudioFormat.WAV: ("pcm_s16le",),
+    AudioFormat.MP3: ("mp3",),
+    AudioFormat.FLAC: ("flac",),
+    AudioFormat.OGG: ("vorbis",),
+}
+
+
+class ExtractionEngine(Enum):
+    FFMPEG = "ffmpeg"    # demux/transcode only the audio track, moviepy as fallback
+    MOVIEPY = "moviepy"  # full decode through VideoFileClip
 
 
 def ExtractAudioFromVideo(input_video_path, output_audio_path=None, audio_format=AudioFormat.WAV):
@@ -29,7 +51,8 @@ def ExtractAudioFromVideo(input_video_path, output_audio_path=None, audio_format
             output_audio_path = f"{base_name}.{audio_format.value}"
 
         codec, bitrate = get_audio_settings(audio_format)
-        audio_clip.write_audiofile(output_audio_path, codec=codec, bitrate=bitrate)
+        with ffmpeg_slot():
+            audio_clip.write_audiofile(output_audio_path, codec=codec, bitrate=bitrate)
 
         audio_clip.close()
         video_clip.close()
@@ -39,10 +62,167 @@ def ExtractAudioFromVideo(input_video_path, output_audio_path=None, audio_format
         Logger.error(f"An error occurred while extracting audio from '{input_video_path}': {e}")
 
 
+def get_audio_codec_name(input_video_path) -> str | None:
+    """
+    Returns the codec name of the first audio stream, or None if the file has no audio.
+    """
+    probe = safe_probe(str(input_video_path))
+    for stream in probe.get("streams", []):
+        if stream.get("codec_type") == "audio":
+            return stream.get("codec_name")
+    return None
+
+
+def extract_audio_ffmpeg(input_video_path, output_audio_path, audio_format=AudioFormat.WAV, source_codec=None):
+    """
+    Extracts the first audio track with ffmpeg, without decoding the video stream.
+    The track is stream-copied when its codec already matches the target format,
+    otherwise only the audio is transcoded.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg cannot demux or encode the file.
+    """
+    output_kwargs = {"map": "0:a:0", "vn": None}
+    if source_codec in COPY_COMPATIBLE_CODECS.get(audio_format, ()):
+        output_kwargs["acodec"] = "copy"
+    else:
+        codec, bitrate = get_audio_settings(audio_format)
+        output_kwargs.update(acodec=codec, ar=EXTRACTION_SAMPLE_RATE)
+        if bitrate:
+            output_kwargs["audio_bitrate"] = bitrate
+
+    with ffmpeg_slot():
+        (
+            ffmpeg.input(str(input_video_path))
+                  .output(str(output_audio_path), **output_kwargs)
+                  .run(overwrite_output=True, quiet=True)
+        )
+
+
+def extract_audio_moviepy(input_video_path, output_audio_path, audio_format=AudioFormat.WAV) -> bool:
+    """
+    Extracts audio by fully decoding the file through moviepy.
+
+    Returns:
+        bool: False if the file has no audio track.
+    """
+    video_clip = VideoFileClip(str(input_video_path))
+    try:
+        audio_clip = video_clip.audio
+        if audio_clip is None:
+            return False
+
+        codec, bitrate = get_audio_settings(audio_format)
+        # moviepy encodes through an ffmpeg process too
+        with ffmpeg_slot():
+            audio_clip.write_audiofile(str(output_audio_path), codec=codec, bitrate=bitrate, logger=None)
+        audio_clip.close()
+        return True
+    finally:
+        video_clip.close()
+
+
+def _init_extraction_worker(level: LogLevel, ffmpeg_slots, max_ffmpeg_processes: int):
+    """
+    Process-pool initializer: the worker's ffmpeg processes draw from `ffmpeg_slots`,
+    the ffmpeg cap shared by the whole pool.
+    """
+    Logger.SetupWorker(level)
+    share_ffmpeg_slots(ffmpeg_slots, max_ffmpeg_processes)
+
+
+def _extract_audio_job(file_path: Path,
+                       audio_output_path: Path,
+                       audio_format: AudioFormat,
+                       engine: ExtractionEngine,
+                       source_codec: str | None) -> bool:
+    """
+    Runs a single extraction inside a pool worker. Returns True on success.
+    """
+    if engine == ExtractionEngine.FFMPEG:
+        try:
+            extract_audio_ffmpeg(file_path, audio_output_path, audio_format, source_codec)
+            Logger.info(f"Audio extracted to '{audio_output_path.name}'")
+            return True
+        except ffmpeg.Error as e:
+            Logger.warning(f"ffmpeg could not extract audio from '{file_path.name}', "
+                           f"falling back to moviepy: {e.stderr.decode(errors='ignore').strip()[-300:]}")
+            if audio_output_path.exists():
+                audio_output_path.unlink()
+
+    if not extract_audio_moviepy(file_path, audio_output_path, audio_format):
+        Logger.warning(f"No audio track found in '{file_path.name}'. Skipping.")
+        return False
+
+    Logger.info(f"Audio extracted to '{audio_output_path.name}'")
+    return True
+
+
+def _plan_extraction(file_path: Path,
+                     out_dir: Path,
+                     audio_format: AudioFormat,
+                     overwrite: bool,
+                     engine: ExtractionEngine) -> tuple[Path | None, str | None, bool]:
+    """
+    Per-file checks shared by ExtractAudioFile and VideoFolderToAudio: existing
+    output, then (ffmpeg engine) the source codec deciding between copy and transcode.
+
+    Returns:
+        tuple: (audio_output_path, source_codec, needs_extraction). When nothing has to
+               be extracted, audio_output_path is the existing audio file, or None if
+               the file has no audio track.
+    """
+    basename = file_path.stem
+    existing = [f for f in out_dir.glob(f"{basename}.*") if f.suffix.lower() in AUDIO_EXTENSIONS]
+    if existing and not overwrite:
+        Logger.info(f"An audio file named '{basename}' already exists. Skipping.")
+        return existing[0], None, False
+
+    source_codec = None
+    if engine == ExtractionEngine.FFMPEG:
+        try:
+            source_codec = get_audio_codec_name(file_path)
+        except Exception:
+            # Unprobeable container: let the extraction fall back to moviepy
+            source_codec = None
+        else:
+            if source_codec is None:
+                Logger.warning(f"No audio track found in '{file_path.name}'. Skipping.")
+                return None, None, False
+
+    return out_dir / f"{basename}.{audio_format.value}", source_codec, True
+
+
+def ExtractAudioFile(file_path: Path,
+                     out_dir: Path,
+                     audio_format: AudioFormat = AudioFormat.WAV,
+                     overwrite: bool = False,
+                     engine: ExtractionEngine = ExtractionEngine.FFMPEG) -> Path | None:
+    """
+    Extracts the audio of a single video file into `out_dir`, in the calling thread.
+
+    Returns:
+        Path: The audio file (the existing one if already extracted), or None on failure.
+    """
+    file_path = Path(file_path)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    audio_output_path, source_codec, needs_extraction = _plan_extraction(file_path, out_dir, audio_format,
+                                                                         overwrite, engine)
+    if not needs_extraction:
+        return audio_output_path
+    if _extract_audio_job(file_path, audio_output_path, audio_format, engine, source_codec):
+        return audio_output_path
+    return None
+
+
 def VideoFolderToAudio(input_directory: Path,
                        out_dir: Path,
                        audio_format: AudioFormat = AudioFormat.WAV,
-                       overwrite: bool = False):
+                       overwrite: bool = False,
+                       workers: int = 1,
+                       engine: ExtractionEngine = ExtractionEngine.FFMPEG):
     """
     Extracts audio from all video files in a folder.
 
@@ -51,6 +231,8 @@ def VideoFolderToAudio(input_directory: Path,
         out_dir (Path): Folder where audio outputs will be stored.
         audio_format (AudioFormat): Desired audio format.
         overwrite (bool): If True, overwrite existing audio files.
+        workers (int): Number of files extracted in parallel (process pool size).
+        engine (ExtractionEngine): ffmpeg demux (default) or full moviepy decode.
     """
     input_directory = Path(input_directory)
     out_dir = Path(out_dir)
@@ -64,41 +246,42 @@ def VideoFolderToAudio(input_directory: Path,
     Logger.info(f"Found {len(files_to_process)} files to process in '{input_directory}'")
 
     failed_files = []
+    pending = []
 
     for idx, file_path in enumerate(files_to_process, start=1):
-        basename = file_path.stem
-        audio_output_path = out_dir / f"{basename}.{audio_format.value}"
-
         Logger.info(f"Processing file [{idx}/{len(files_to_process)}]: {file_path.name}")
-
-        # Skip if audio with same basename already exists
-        existing = list(out_dir.glob(f"{basename}.*"))
-        if any(f.suffix.lower() in AUDIO_EXTENSIONS for f in existing) and not overwrite:
-            Logger.info(f"An audio file named '{basename}' already exists. Skipping.")
-            continue
-
-        try:
-            video_clip = VideoFileClip(str(file_path))
-            audio_clip = video_clip.audio
-
-            if audio_clip is None:
-                Logger.warning(f"No audio track found in '{file_path.name}'. Skipping.")
-                video_clip.close()
-                failed_files.append(file_path.name)
-                continue
-
-            codec, bitrate = get_audio_settings(audio_format)
-            audio_clip.write_audiofile(str(audio_output_path), codec=codec, bitrate=bitrate)
-
-            audio_clip.close()
-            video_clip.close()
-            Logger.info(f"Audio extracted to '{audio_output_path.name}'")
-
-        except Exception as e:
-            Logger.error(f"Error processing '{file_path.name}': {e}")
+        # Probed here rather than in the workers, so the probe cache is flushed below
+        audio_output_path, source_codec, needs_extraction = _plan_extraction(file_path, out_dir, audio_format,
+                                                                             overwrite, engine)
+        if audio_output_path is None:
             failed_files.append(file_path.name)
+        elif needs_extraction:
+            pending.append((file_path, audio_output_path, source_codec))
+
+    if pending:
+        # The extractions run in the workers: they share one cap, as the threads of a process do
+        mp_context = multiprocessing.get_context()
+        max_ffmpeg_processes = get_max_ffmpeg_processes()
+        ffmpeg_slots = mp_context.BoundedSemaphore(max_ffmpeg_processes)
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(pending))), mp_context=mp_context,
+                                 initializer=_init_extraction_worker,
+                                 initargs=(Logger.GetLevel(), ffmpeg_slots, max_ffmpeg_processes)) as executor:
+            futures = {
+                executor.submit(_extract_audio_job, file_path, audio_output_path,
+                                audio_format, engine, source_codec): file_path
+                for file_path, audio_output_path, source_codec in pending
+            }
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    if not future.result():
+                        failed_files.append(file_path.name)
+                except Exception as e:
+                    Logger.error(f"Error processing '{file_path.name}': {e}")
+                    failed_files.append(file_path.name)
 
     Logger.info("Audio extraction complete.")
+    flush_probe_cache()
 
     if failed_files:
         Logger.warning(f"{len(failed_files)} files failed to process:")
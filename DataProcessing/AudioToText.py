@@ -1,39 +1,228 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 
+import numpy as np
 import whisper
-from whisper import transcribe
+from whisper.audio import SAMPLE_RATE as WHISPER_SAMPLE_RATE
+from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
 
-from DataProcessing import AUDIO_EXTENSIONS
-from Utility.Logger import Logger
+from DataProcessing import AUDIO_EXTENSIONS, VIDEO_EXTENSIONS, METADATA_FILE_NAME
+from DataProcessing.MediaSplitter import load_project_metadata
+from DataProcessing.SpeechActivity import detect_speech_regions, trim_to_speech
+from DataProcessing.SplitPlanner import detect_silences, plan_cut_points
+from DataProcessing.ffmpegUtil import decode_audio, safe_probe, get_max_ffmpeg_processes, share_ffmpeg_slots
+from Utility.Logger import Logger, LogLevel
+
+DEFAULT_MODEL_SIZE = "small"
+THREADS_PER_WORKER = 4  # intra-op threads that keep one Whisper worker busy on CPU
+
+# Model of the current worker process, loaded once by _init_transcription_worker
+_worker_model = None
+
+
+def default_transcription_workers() -> int:
+    return max(1, (os.cpu_count() or 1) // THREADS_PER_WORKER)
+
+
+def _init_transcription_worker(level: LogLevel, model_size: str, threads: int,
+                               ffmpeg_slots, max_ffmpeg_processes: int):
+    """
+    Process-pool initializer: loads the model once per worker process. The worker
+    then keeps it for every chunk it pulls from the pool's queue. Its decodes draw
+    from `ffmpeg_slots`, the ffmpeg cap shared by the whole pool.
+    """
+    global _worker_model
+    Logger.SetupWorker(level)
+    share_ffmpeg_slots(ffmpeg_slots, max_ffmpeg_processes)
+
+    import torch
+    # Workers split the cores between them instead of each one using all of them
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_size)
+
+
+def _transcribe_chunk(source: Path,
+                      language: str | None,
+                      speech_regions: list | None = None,
+                      start_s: float | None = None,
+                      duration_s: float | None = None,
+                      detect_speech: bool = False) -> tuple[str, str | None]:
+    """
+    Pool worker: decodes (a time window of) any media file straight into memory at
+    Whisper's sample rate and transcribes it. With known speech regions, or with
+    detect_speech=True, the long silences between them are cut out first.
+
+    Returns:
+        tuple: (text, language), language being None when there was nothing to transcribe.
+    """
+    audio, _ = decode_audio(source, WHISPER_SAMPLE_RATE, start_s=start_s, duration_s=duration_s)
+    if speech_regions is None and detect_speech:
+        speech_regions = detect_speech_regions(audio, WHISPER_SAMPLE_RATE)
+    if speech_regions is not None:
+        audio = trim_to_speech(audio, WHISPER_SAMPLE_RATE, speech_regions)
+    if audio.size == 0:
+        return "", None
+
+    result = _worker_model.transcribe(audio, language=language,
+                                      fp16=_worker_model.device.type == "cuda")
+    return result.get("text", "").strip(), result.get("language")
+
+
+def _project_language(project: Path, metadata: dict) -> str | None:
+    """
+    Language from the project's metadata.json, or None to let Whisper detect it.
+    """
+    if not (project / METADATA_FILE_NAME).exists():
+        return None
+    language = str(metadata.get("Language", "")).lower()
+    if language in TO_LANGUAGE_CODE or language in LANGUAGES:
+        return language
+    Logger.warning(f"Language '{language}' of '{project.name}' is not supported by Whisper. Detecting it.")
+    return None
+
+
+def _write_combined_transcription(project_name: str, project_out_dir: Path,
+                                  transcript_files: list[Path], overwrite: bool):
+    project_txt = project_out_dir / f"{project_name}.txt"
+    if project_txt.exists() and not overwrite:
+        Logger.info(f"Combined transcription already exists for '{project_name}'. Skipping.")
+        return
+
+    transcriptions = [f.read_text(encoding="utf-8") for f in transcript_files]
+    with open(project_txt, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(t for t in transcriptions if t))
+    Logger.info(f"Combined transcription saved to: {project_txt}")
+
+
+def _run_transcription(queue: list, project_transcripts: dict, remaining: dict, failed_projects: list,
+                       model_size: str, workers: int | None, overwrite: bool):
+    """
+    Runs queued tasks on the worker pool and writes every transcript as it completes.
+
+    The language of a project without one is detected by Whisper on its first chunk
+    and then pinned: its other chunks are held back until it is known, so the language
+    cannot change from one chunk (or window) to the next.
+
+    Args:
+        queue (list): (project_name, txt_file, label, _transcribe_chunk kwargs) per task.
+        project_transcripts (dict): project_name -> (project_out_dir, ordered transcript files).
+        remaining (dict): project_name -> queued tasks, counted down as they complete.
+    """
+    if not queue:
+        return
+
+    workers = min(workers or default_transcription_workers(), len(queue))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    Logger.info(f"Transcribing {len(queue)} chunks with {workers} workers "
+                f"({threads} threads each, model '{model_size}')")
+
+    ready = []
+    held: dict[str, list] = {}  # project_name -> tasks waiting for the detected language
+    for item in queue:
+        project_name, _, _, task = item
+        if task["language"] is None:
+            if project_name in held:
+                held[project_name].append(item)
+                continue
+            held[project_name] = []
+        ready.append(item)
+
+    # The decodes run in the workers: they share one cap, as the threads of a process do
+    mp_context = multiprocessing.get_context()
+    max_ffmpeg_processes = get_max_ffmpeg_processes()
+    ffmpeg_slots = mp_context.BoundedSemaphore(max_ffmpeg_processes)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                             initializer=_init_transcription_worker,
+                             initargs=(Logger.GetLevel(), model_size, threads,
+                                       ffmpeg_slots, max_ffmpeg_processes)) as executor:
+        futures = {}
+
+        def _submit(item):
+            futures[executor.submit(_transcribe_chunk, **item[3])] = item
+
+        def _release_held(project_name: str, language: str | None):
+            pending = held.get(project_name)
+            if pending is None:
+                return
+            if language:
+                Logger.info(f"Detected language '{language}' for '{project_name}'")
+                del held[project_name]
+                for item in pending:
+                    item[3]["language"] = language
+                    _submit(item)
+            elif pending:
+                # Nothing to detect it from (e.g. a failed or silent chunk): try the next one
+                _submit(pending.pop(0))
+            else:
+                del held[project_name]
+
+        for item in ready:
+            _submit(item)
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                project_name, txt_file, label, _ = futures.pop(future)
+                try:
+                    transcription, language = future.result()
+                except Exception as e:
+                    Logger.error(f"Error transcribing '{label}': {e}")
+                    if project_name not in failed_projects:
+                        failed_projects.append(project_name)
+                    _release_held(project_name, None)
+                    continue
+                _release_held(project_name, language)
+
+                with open(txt_file, "w", encoding="utf-8") as f:
+                    f.write(transcription)
+                Logger.info(f"Transcribed '{label}'")
+
+                remaining[project_name] -= 1
+                if remaining[project_name] == 0 and project_name not in failed_projects:
+                    _write_combined_transcription(project_name, *project_transcripts[project_name], overwrite)
+
+
+def _report_failures(failed_projects: list):
+    Logger.info("Transcription complete.")
+    if failed_projects:
+        Logger.warning(f"{len(failed_projects)} projects failed:")
+        for p in failed_projects:
+            Logger.warning(f"  - {p}")
+    else:
+        Logger.info("All projects processed successfully.")
 
 
 def TranscribeAudioFolder(
     input_dir: Path,
     out_dir: Path,
-    model_size: str = "small",
+    model_size: str = DEFAULT_MODEL_SIZE,
     overwrite: bool = False,
+    workers: int | None = None,
 ):
     """
     Transcribes all audio projects in a folder structure using OpenAI Whisper.
 
+    Chunks of all projects are queued to a pool of long-lived worker processes,
+    each of which loads the model once. A project's combined transcription is
+    written as soon as its last chunk is done, and includes the chunks whose
+    transcripts already existed. When the split recorded speech regions, silent
+    chunks are not transcribed and silences are trimmed from the others.
+
     Args:
         input_dir (Path): Directory containing project subfolders with audio chunks.
         out_dir (Path): Output directory where transcriptions will be saved.
         model_size (str): Whisper model size (e.g., 'tiny', 'base', 'small', 'medium', 'large').
         overwrite (bool): Whether to overwrite existing transcriptions.
+        workers (int, optional): Worker processes (defaults to one per THREADS_PER_WORKER cores).
     """
     input_dir = Path(input_dir)
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    Logger.info(f"Loading Whisper model: {model_size}")
-    try:
-        model = whisper.load_model(model_size)
-    except Exception as e:
-        Logger.error(f"Failed to load Whisper model '{model_size}': {e}")
-        return
-
-    projects = [p for p in input_dir.iterdir() if p.is_dir()]
+    projects = sorted(p for p in input_dir.iterdir() if p.is_dir())
     if not projects:
         Logger.warning(f"No projects found in {input_dir}")
         return
@@ -41,11 +230,12 @@ def TranscribeAudioFolder(
     Logger.info(f"Found {len(projects)} projects to process in '{input_dir}'")
 
     failed_projects = []
+    project_transcripts: dict[str, tuple[Path, list[Path]]] = {}
+    remaining: dict[str, int] = {}
+    queue = []  # (project_name, txt_file, label, _transcribe_chunk kwargs)
 
     for project in projects:
         project_name = project.name
-        Logger.info(f"Processing project: {project_name}")
-
         project_out_dir = out_dir / project_name
         transcripts_dir = project_out_dir / "transcripts"
         transcripts_dir.mkdir(parents=True, exist_ok=True)
@@ -58,44 +248,116 @@ def TranscribeAudioFolder(
             failed_projects.append(project_name)
             continue
 
-        combined_transcription = []
-
-        for idx, chunk_file in enumerate(chunks, start=1):
-            txt_file = transcripts_dir / f"{chunk_file.stem}.txt"
-
+        metadata = load_project_metadata(project)
+        language = _project_language(project, metadata)
+        speech_index = metadata.get("SpeechRegions", {})
+        txt_files = [transcripts_dir / f"{chunk_file.stem}.txt" for chunk_file in chunks]
+        project_transcripts[project_name] = (project_out_dir, txt_files)
+        remaining[project_name] = 0
+        for chunk_file, txt_file in zip(chunks, txt_files):
             if txt_file.exists() and not overwrite:
                 Logger.info(f"Transcript for '{chunk_file.name}' already exists. Skipping.")
                 continue
+            speech_regions = speech_index.get(chunk_file.name)
+            if speech_regions == []:
+                Logger.warning(f"No speech detected in '{chunk_file.name}'. Writing an empty transcript.")
+                txt_file.write_text("", encoding="utf-8")
+                continue
+            queue.append((project_name, txt_file, chunk_file.name,
+                          dict(source=chunk_file, language=language, speech_regions=speech_regions)))
+            remaining[project_name] += 1
 
-            try:
-                Logger.info(f"Transcribing chunk {idx}/{len(chunks)}: {chunk_file.name}")
-                result = transcribe(str(chunk_file))
-                transcription = result.get("text", "").strip()
+        if remaining[project_name] == 0:
+            _write_combined_transcription(project_name, project_out_dir, txt_files, overwrite)
 
-                with open(txt_file, "w", encoding="utf-8") as f:
-                    f.write(transcription)
+    _run_transcription(queue, project_transcripts, remaining, failed_projects, model_size, workers, overwrite)
+    _report_failures(failed_projects)
 
-                combined_transcription.append(transcription)
 
-            except Exception as e:
-                Logger.error(f"Error transcribing '{chunk_file.name}': {e}")
-                failed_projects.append(project_name)
-                break
+def TranscribeMediaFolder(
+    input_dirs: list[Path],
+    out_dir: Path,
+    chunk_duration_s: float,
+    silence_tolerance_s: float = 0,
+    model_size: str = DEFAULT_MODEL_SIZE,
+    overwrite: bool = False,
+    workers: int | None = None,
+    metadata_dirs: list[Path] = (),
+):
+    """
+    Transcribes raw audio/video files directly, without extracting or splitting
+    them to disk first: every worker decodes its own time window of the source
+    through an ffmpeg pipe. Windows follow the same plan as split_media (optionally
+    moved to silences) and silences inside each window are trimmed before inference.
+    Output layout is the same as TranscribeAudioFolder's.
+
+    Args:
+        input_dirs (list[Path]): Folders with media files. When the same name appears in
+                                 several folders, the first folder wins.
+        chunk_duration_s (float): Length of the transcribed windows.
+        silence_tolerance_s (float): Move window boundaries to silences within this many seconds.
+        metadata_dirs (list[Path]): Folders of split projects. The language in a project's
+                                    metadata.json is used for the media file of the same name;
+                                    otherwise Whisper detects it once per file.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
 
-        # Save combined transcription for project
-        if combined_transcription:
-            project_txt = project_out_dir / f"{project_name}.txt"
-            if project_txt.exists() and not overwrite:
-                Logger.info(f"Combined transcription already exists for '{project_name}'. Skipping.")
+    sources: dict[str, Path] = {}
+    for input_dir in input_dirs:
+        for f in sorted(Path(input_dir).iterdir()):
+            if f.is_file() and f.suffix.lower() in AUDIO_EXTENSIONS + VIDEO_EXTENSIONS:
+                sources.setdefault(f.stem, f)
+    if not sources:
+        Logger.warning(f"No media files found in {', '.join(str(d) for d in input_dirs)}")
+        return
+
+    Logger.info(f"Found {len(sources)} media files to transcribe")
+
+    failed_projects = []
+    project_transcripts: dict[str, tuple[Path, list[Path]]] = {}
+    remaining: dict[str, int] = {}
+    queue = []
+
+    for project_name, source in sources.items():
+        try:
+            duration = float(safe_probe(str(source))["format"]["duration"])
+            if silence_tolerance_s > 0:
+                cut_points = plan_cut_points(duration, chunk_duration_s,
+                                             detect_silences(source, duration), silence_tolerance_s)
             else:
-                with open(project_txt, "w", encoding="utf-8") as f:
-                    f.write("\n\n".join(combined_transcription))
-                Logger.info(f"Combined transcription saved to: {project_txt}")
+                cut_points = [float(c) for c in np.arange(chunk_duration_s, duration, chunk_duration_s)]
+        except Exception as e:
+            Logger.error(f"Error planning windows for '{source.name}': {e}")
+            failed_projects.append(project_name)
+            continue
 
-    Logger.info("Transcription complete.")
-    if failed_projects:
-        Logger.warning(f"{len(failed_projects)} projects failed:")
-        for p in failed_projects:
-            Logger.warning(f"  - {p}")
-    else:
-        Logger.info("All projects processed successfully.")
+        project_out_dir = out_dir / project_name
+        transcripts_dir = project_out_dir / "transcripts"
+        transcripts_dir.mkdir(parents=True, exist_ok=True)
+
+        language = None
+        for metadata_dir in metadata_dirs:
+            project_dir = Path(metadata_dir) / project_name
+            if (project_dir / METADATA_FILE_NAME).exists():
+                language = _project_language(project_dir, load_project_metadata(project_dir))
+                break
+
+        boundaries = [0.0, *cut_points, duration]
+        txt_files = [transcripts_dir / f"{project_name}_part{i + 1:03d}.txt" for i in range(len(boundaries) - 1)]
+        project_transcripts[project_name] = (project_out_dir, txt_files)
+        remaining[project_name] = 0
+        for txt_file, start, end in zip(txt_files, boundaries, boundaries[1:]):
+            if txt_file.exists() and not overwrite:
+                Logger.info(f"Transcript '{txt_file.name}' already exists. Skipping.")
+                continue
+            queue.append((project_name, txt_file, f"{source.name} [{start:.0f}s-{end:.0f}s]",
+                          dict(source=source, language=language, start_s=start, duration_s=end - start,
+                               detect_speech=True)))
+            remaining[project_name] += 1
+
+        if remaining[project_name] == 0:
+            _write_combined_transcription(project_name, project_out_dir, txt_files, overwrite)
+
+    _run_transcription(queue, project_transcripts, remaining, failed_projects, model_size, workers, overwrite)
+    _report_failures(failed_projects)
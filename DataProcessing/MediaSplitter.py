@@ -1,11 +1,18 @@
-﻿import shutil
+﻿import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
+from glob import escape as glob_escape
 from pathlib import Path
 
 import ffmpeg
 import numpy as np
 
-from DataProcessing.ffmpegUtil import safe_probe
+from DataProcessing import METADATA_FILE_NAME
+from DataProcessing.SpeechActivity import index_speech_regions
+from DataProcessing.SplitPlanner import get_split_plan
+from DataProcessing.ffmpegUtil import safe_probe, ffmpeg_slot, flush_probe_cache
+from Utility.FileUtil import ReadJson, WriteJson
 from Utility.Logger import Logger
 
 
@@ -27,14 +34,102 @@ def detect_media_mode(input_path: Path) -> MediaMode:
     return MediaMode.AUDIO
 
 
+def _segment_output_args(mode: MediaMode, audio_sr: int) -> tuple[str, dict]:
+    """
+    Returns (extension, ffmpeg output kwargs) used to encode chunks for the given mode.
+    """
+    if mode == MediaMode.VIDEO:
+        return "mp4", {"c": "copy"}
+    elif mode == MediaMode.AUDIO:
+        return "wav", {"format": "wav", "ac": 1, "ar": audio_sr}
+    raise ValueError("Unsupported MediaMode")
+
+
+def load_project_metadata(project_dir: Path) -> dict:
+    """
+    Reads the metadata.json of a split project, or returns the defaults if missing/corrupt.
+    """
+    metadata_file = Path(project_dir) / METADATA_FILE_NAME
+    try:
+        metadata = ReadJson(metadata_file)
+    except (json.JSONDecodeError, IOError):
+        metadata = {}
+    metadata.setdefault("Language", "english")
+    return metadata
+
+
+def save_project_metadata(project_dir: Path, metadata: dict):
+    WriteJson(Path(project_dir) / METADATA_FILE_NAME, metadata)
+
+
+def _split_seek(input_path: Path, file_outdir: Path, basename: str,
+                duration: float, cut_points: list[float], mode: MediaMode, audio_sr: int):
+    """
+    Split by launching one ffmpeg process per chunk, each seeking into the input.
+    """
+    boundaries = [0.0, *cut_points, duration]
+    extension, output_kwargs = _segment_output_args(mode, audio_sr)
+
+    for i, (start, end) in enumerate(zip(boundaries, boundaries[1:])):
+        chunk_name = f"{basename}_part{i+1:03d}"
+        outfile = file_outdir / f"{chunk_name}.{extension}"
+        with ffmpeg_slot():
+            (
+                ffmpeg.input(str(input_path), ss=start, t=(end - start))
+                      .output(str(outfile), **output_kwargs)
+                      .run(overwrite_output=True, quiet=True)
+            )
+        Logger.info(f"Saved chunk: {outfile.name} ({end - start:.2f}s)")
+
+
+def _split_segment_muxer(input_path: Path, file_outdir: Path, basename: str,
+                         chunk_duration_s: int, cut_points: list[float], mode: MediaMode, audio_sr: int):
+    """
+    Split in a single ffmpeg invocation with the segment muxer: the input is read
+    and decoded once and every chunk is written in the same pass.
+    """
+    extension, output_kwargs = _segment_output_args(mode, audio_sr)
+    segment_kwargs = {
+        "f": "segment",
+        "segment_start_number": 1,
+        "segment_format": output_kwargs.pop("format", extension),
+        "reset_timestamps": 1,
+    }
+    if cut_points:
+        segment_kwargs["segment_times"] = ",".join(f"{c:.3f}" for c in cut_points)
+    else:
+        segment_kwargs["segment_time"] = chunk_duration_s
+    # The segment muxer expands printf-style patterns, so literal '%' must be escaped
+    pattern = file_outdir / f"{basename.replace('%', '%%')}_part%03d.{extension}"
+    with ffmpeg_slot():
+        (
+            ffmpeg.input(str(input_path))
+                  .output(str(pattern), **segment_kwargs, **output_kwargs)
+                  .run(overwrite_output=True, quiet=True)
+        )
+
+    for outfile in sorted(file_outdir.glob(f"{glob_escape(basename)}_part*.{extension}")):
+        Logger.info(f"Saved chunk: {outfile.name}")
+
+
 def split_media(input_path: Path,
                 output_dir: Path,
                 chunk_duration_s: int,
                 mode: MediaMode | None = None,
                 audio_sr: int = 44100,
-                overwrite: bool = False):
+                overwrite: bool = False,
+                single_pass: bool = True,
+                silence_tolerance_s: float = 0,
+                detect_speech: bool = True):
     """
     Split a media file (audio or video) into fixed-duration chunks.
+
+    With single_pass=True the whole file is split by one ffmpeg process using the
+    segment muxer; otherwise one seeking ffmpeg process is launched per chunk.
+    With silence_tolerance_s > 0 every cut is moved to the nearest silence within
+    that many seconds; the plan is cached in the project's metadata.json.
+    With detect_speech=True the speech regions of every chunk are recorded in the
+    metadata under "SpeechRegions", so silent chunks can be skipped downstream.
     """
     input_path = Path(input_path)
     if not input_path.exists():
@@ -45,44 +140,45 @@ def split_media(input_path: Path,
         mode = detect_media_mode(input_path)
         Logger.info(f"Auto-detected mode: {mode.value}")
 
+    if mode not in (MediaMode.AUDIO, MediaMode.VIDEO):
+        Logger.error(f"Failed to split '{input_path.name}': Unsupported MediaMode")
+        raise ValueError("Unsupported MediaMode")
+
     # Prepare output dir
     basename = input_path.stem
     file_outdir = Path(output_dir) / basename
+    # Metadata (language, cached split plan) survives an overwrite
+    metadata = load_project_metadata(file_outdir)
     if file_outdir.exists() and overwrite:
         shutil.rmtree(file_outdir)
     file_outdir.mkdir(parents=True, exist_ok=True)
 
     # Probe duration
-    probe = ffmpeg.probe(str(input_path))
+    probe = safe_probe(str(input_path))
     duration = float(probe["format"]["duration"])
-    num_chunks = int(np.ceil(duration / chunk_duration_s))
 
-    Logger.info(f"{basename}: {duration:.2f}s total, {num_chunks} chunks of {chunk_duration_s}s")
+    if silence_tolerance_s > 0:
+        cut_points = get_split_plan(input_path, metadata, duration, chunk_duration_s, silence_tolerance_s)
+    else:
+        cut_points = [float(c) for c in np.arange(chunk_duration_s, duration, chunk_duration_s)]
+        metadata.pop("SplitPlan", None)
+    save_project_metadata(file_outdir, metadata)
 
-    for i in range(num_chunks):
-        start = i * chunk_duration_s
-        end = min(start + chunk_duration_s, duration)
-        chunk_name = f"{basename}_part{i+1:03d}"
+    Logger.info(f"{basename}: {duration:.2f}s total, {len(cut_points) + 1} chunks of ~{chunk_duration_s}s")
 
-        if mode == MediaMode.VIDEO:
-            outfile = file_outdir / f"{chunk_name}.mp4"
-            (
-                ffmpeg.input(str(input_path), ss=start, t=(end - start))
-                      .output(str(outfile), c="copy")
-                      .run(overwrite_output=True, quiet=True)
-            )
-        elif mode == MediaMode.AUDIO:
-            outfile = file_outdir / f"{chunk_name}.wav"
-            (
-                ffmpeg.input(str(input_path), ss=start, t=(end - start))
-                      .output(str(outfile), format="wav", ac=1, ar=audio_sr)
-                      .run(overwrite_output=True, quiet=True)
-            )
-        else:
-            Logger.error(f"Failed to split chunk {chunk_name}: Unsupported MediaMode")
-            raise ValueError("Unsupported MediaMode")
+    if single_pass:
+        _split_segment_muxer(input_path, file_outdir, basename, chunk_duration_s, cut_points, mode, audio_sr)
+    else:
+        _split_seek(input_path, file_outdir, basename, duration, cut_points, mode, audio_sr)
 
-        Logger.info(f"Saved chunk: {outfile.name} ({end - start:.2f}s)")
+    metadata.pop("SpeechRegions", None)
+    if detect_speech:
+        extension, _ = _segment_output_args(mode, audio_sr)
+        chunks = sorted(file_outdir.glob(f"{glob_escape(basename)}_part*.{extension}"))
+        metadata["SpeechRegions"] = index_speech_regions(chunks)
+        silent = sum(1 for regions in metadata["SpeechRegions"].values() if not regions)
+        Logger.info(f"{basename}: speech found in {len(chunks) - silent}/{len(chunks)} chunks")
+    save_project_metadata(file_outdir, metadata)
 
     Logger.info(f"Done splitting '{basename}'. Chunks saved in '{file_outdir}'.")
 
@@ -90,9 +186,20 @@ def split_media(input_path: Path,
 def SplitMediaInFolder(input_directory: Path,
                        out_dir: Path,
                        chunk_duration_s: int,
-                       overwrite: bool = False):
+                       overwrite: bool = False,
+                       single_pass: bool = True,
+                       silence_tolerance_s: float = 0,
+                       detect_speech: bool = True,
+                       workers: int = 1) -> list[str]:
     """
     Splits all media files in a folder into chunks (audio or video).
+
+    Files are split concurrently on `workers` threads; the number of ffmpeg
+    processes running at the same time is capped by the global ffmpeg cap
+    (see set_max_ffmpeg_processes).
+
+    Returns:
+        list: Names of the files that failed to split.
     """
     input_directory = Path(input_directory)
     out_dir = Path(out_dir)
@@ -102,29 +209,51 @@ def SplitMediaInFolder(input_directory: Path,
 
     if not files_to_process:
         Logger.warning(f"No media files found in directory: '{input_directory}'")
-        return
+        return []
 
     Logger.info(f"Found {len(files_to_process)} files to process in '{input_directory}'")
 
+    pending = []
     for file_path in files_to_process:
-        basename = file_path.stem
-        expected_output_dir = out_dir / basename
-
-        Logger.info(f"Processing file: {file_path.name}")
-
+        expected_output_dir = out_dir / file_path.stem
         if expected_output_dir.is_dir() and not overwrite:
-            Logger.info(f"Output '{expected_output_dir}' already exists. Skipping.")
+            Logger.info(f"Output '{expected_output_dir}' already exists. Skipping '{file_path.name}'.")
             continue
+        pending.append(file_path)
 
-        try:
-            split_media(
-                input_path=file_path,
-                output_dir=out_dir,
-                chunk_duration_s=chunk_duration_s,
-                mode=None,  # auto-detect (video/audio)
-                overwrite=overwrite
-            )
-        except Exception as e:
-            Logger.error(f"Error while splitting '{file_path.name}': {e}")
+    failed_files = {}
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+            futures = {
+                executor.submit(
+                    split_media,
+                    input_path=file_path,
+                    output_dir=out_dir,
+                    chunk_duration_s=chunk_duration_s,
+                    mode=None,  # auto-detect (video/audio)
+                    overwrite=overwrite,
+                    single_pass=single_pass,
+                    silence_tolerance_s=silence_tolerance_s,
+                    detect_speech=detect_speech
+                ): file_path
+                for file_path in pending
+            }
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    Logger.error(f"Error while splitting '{file_path.name}': {e}")
+                    failed_files[file_path.name] = e
 
     Logger.info("All processing complete.")
+    flush_probe_cache()
+
+    if failed_files:
+        Logger.warning(f"{len(failed_files)} files failed to split:")
+        for name, error in failed_files.items():
+            Logger.warning(f"  - {name}: {error}")
+    else:
+        Logger.info(f"{len(pending)} files split successfully.")
+
+    return list(failed_files)
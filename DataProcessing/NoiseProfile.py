@@ -0,0 +1,126 @@
+import heapq
+import json
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+from scipy.ndimage import uniform_filter
+from scipy.signal import stft, istft
+
+NOISE_PROFILE_FILE_NAME = "noise_profile.npz"
+
+PROFILE_WINDOW_SECONDS = 0.5   # length of the windows ranked by energy
+PROFILE_WINDOWS = 8            # quietest windows kept -> 4 s noise clip
+DIGITAL_SILENCE_RMS = 1e-6     # exact zeros carry no information about the noise
+
+STFT_SIZE = 1024
+STFT_HOP = 256
+GATE_N_STD = 1.5               # bins below mean + n_std * std of the noise are gated
+GATE_SMOOTH_FRAMES = 5         # mask smoothing over time (frames) ...
+GATE_SMOOTH_BINS = 3           # ... and frequency (bins), avoids "musical noise"
+GATE_PROP_DECREASE = 1.0
+
+
+class NoiseReductionMode(Enum):
+    NONSTATIONARY = "nonstationary"  # noisereduce's adaptive gate, noise floor tracked per chunk
+    STATIONARY = "stationary"        # fixed spectral gate from the cached project profile
+
+
+class NoiseProfile:
+    """
+    Noise estimate shared by all chunks of a project: the concatenation of the
+    quietest windows found across the chunks.
+    """
+
+    def __init__(self, clip: np.ndarray, sample_rate: int, key: str = ""):
+        self.Clip = np.asarray(clip, dtype=np.float32)
+        self.SampleRate = sample_rate
+        self.Key = key
+
+    def save(self, path: Path):
+        np.savez(path, clip=self.Clip, sample_rate=self.SampleRate, key=self.Key)
+
+    @staticmethod
+    def load(path: Path) -> "NoiseProfile":
+        with np.load(path) as data:
+            return NoiseProfile(data["clip"], int(data["sample_rate"]), str(data["key"]))
+
+
+def profile_key(chunk_files: list[Path]) -> str:
+    """
+    Identifies the chunk set and the estimation settings a profile was computed from.
+    """
+    chunks = []
+    for chunk_file in sorted(chunk_files):
+        stat = Path(chunk_file).stat()
+        chunks.append([Path(chunk_file).name, stat.st_size, stat.st_mtime_ns])
+    return json.dumps({"Chunks": chunks, "Window": PROFILE_WINDOW_SECONDS, "Windows": PROFILE_WINDOWS})
+
+
+def estimate_noise_clip(block_streams, sr: int,
+                        window_s: float = PROFILE_WINDOW_SECONDS,
+                        n_windows: int = PROFILE_WINDOWS) -> np.ndarray:
+    """
+    Finds the `n_windows` quietest windows (by RMS) across all the given block
+    streams and returns them concatenated. Only the selected windows are kept in
+    memory while scanning.
+
+    Args:
+        block_streams: Iterable of per-chunk iterables of mono float32 blocks.
+        sr (int): Sample rate of the blocks.
+    """
+    window = int(window_s * sr)
+    quietest = []  # max-heap on RMS via negated keys: (-rms, order, samples)
+    order = 0
+
+    for blocks in block_streams:
+        for block in blocks:
+            usable = len(block) - len(block) % window
+            if usable == 0:
+                continue
+            windows = block[:usable].reshape(-1, window)
+            rms = np.sqrt(np.mean(np.square(windows, dtype=np.float32), axis=1))
+            for idx in np.argsort(rms)[:n_windows]:
+                if rms[idx] < DIGITAL_SILENCE_RMS:
+                    continue
+                entry = (-float(rms[idx]), order, windows[idx].copy())
+                order += 1
+                if len(quietest) < n_windows:
+                    heapq.heappush(quietest, entry)
+                elif entry[0] > quietest[0][0]:
+                    heapq.heapreplace(quietest, entry)
+
+    if not quietest:
+        return np.zeros(0, dtype=np.float32)
+    # Keep the original time order of the selected windows
+    return np.concatenate([samples for _, _, samples in sorted(quietest, key=lambda e: e[1])])
+
+
+def noise_spectral_stats(noise_clip: np.ndarray, sr: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per-frequency mean and standard deviation (dB) of the noise clip.
+    """
+    _, _, spectrum = stft(noise_clip, fs=sr, nperseg=STFT_SIZE, noverlap=STFT_SIZE - STFT_HOP)
+    noise_db = 20 * np.log10(np.abs(spectrum) + 1e-10)
+    return noise_db.mean(axis=1), noise_db.std(axis=1)
+
+
+def stationary_gate(signal: np.ndarray, sr: int, noise_stats: tuple[np.ndarray, np.ndarray],
+                    n_std: float = GATE_N_STD, prop_decrease: float = GATE_PROP_DECREASE) -> np.ndarray:
+    """
+    Stationary spectral gate: one batched STFT over the whole signal, a mask from the
+    precomputed noise statistics, one inverse STFT.
+    """
+    if len(signal) < STFT_SIZE:
+        return np.asarray(signal, dtype=np.float32)
+
+    mean_db, std_db = noise_stats
+    _, _, spectrum = stft(signal, fs=sr, nperseg=STFT_SIZE, noverlap=STFT_SIZE - STFT_HOP)
+    threshold = (mean_db + n_std * std_db)[:, None]
+
+    mask = (20 * np.log10(np.abs(spectrum) + 1e-10) > threshold).astype(np.float32)
+    mask = uniform_filter(mask, size=(GATE_SMOOTH_BINS, GATE_SMOOTH_FRAMES))
+    spectrum *= mask * prop_decrease + (1.0 - prop_decrease)
+
+    _, gated = istft(spectrum, fs=sr, nperseg=STFT_SIZE, noverlap=STFT_SIZE - STFT_HOP)
+    return gated[:len(signal)].astype(np.float32, copy=False)
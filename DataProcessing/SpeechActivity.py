@@ -0,0 +1,143 @@
+from pathlib import Path
+
+import numpy as np
+
+from DataProcessing.ffmpegUtil import decode_audio
+from Utility.Logger import Logger
+
+VAD_SAMPLE_RATE = 8000        # speech energy is well represented at telephone bandwidth
+VAD_FRAME_SECONDS = 0.03
+VAD_FLOOR_PERCENTILE = 10     # frames this quiet are taken as the noise floor
+VAD_MARGIN_DB = 12            # a frame is speech if this much louder than the floor ...
+VAD_ABSOLUTE_FLOOR_DB = -50   # ... and louder than this (dBFS), when no project floor is known
+VAD_DIGITAL_SILENCE_DB = -100 # frames this quiet are padding/zeros and say nothing about the noise
+VAD_MIN_SPEECH_SECONDS = 0.2  # shorter blips (clicks, bumps) are ignored
+VAD_MERGE_GAP_SECONDS = 0.5   # pauses shorter than this stay inside a region
+VAD_PADDING_SECONDS = 0.2     # kept around every region so onsets are not clipped
+
+TRIM_GAP_SECONDS = 0.3        # silence left between regions when trimming
+
+
+def frame_energy_db(signal: np.ndarray, sr: int) -> np.ndarray:
+    """
+    Energy (dBFS) of the non-overlapping VAD frames of a signal.
+    """
+    frame = max(1, int(VAD_FRAME_SECONDS * sr))
+    n_frames = len(signal) // frame
+    frames = signal[:n_frames * frame].reshape(n_frames, frame)
+    return 10 * np.log10(np.mean(np.square(frames), axis=1) + 1e-12)
+
+
+def project_floor_db(energies: list[np.ndarray]) -> float:
+    """
+    Speech threshold floor of a whole recording: its noise floor (the quietest
+    frames across all of its chunks) plus the VAD margin. Unlike a fixed dBFS floor,
+    it follows quietly recorded sources down instead of taking them for silence.
+    """
+    frames = np.concatenate([e[e > VAD_DIGITAL_SILENCE_DB] for e in energies] or [np.zeros(0)])
+    if frames.size == 0:
+        return VAD_ABSOLUTE_FLOOR_DB
+    return float(np.percentile(frames, VAD_FLOOR_PERCENTILE)) + VAD_MARGIN_DB
+
+
+def detect_speech_regions(signal: np.ndarray, sr: int, floor_db: float = VAD_ABSOLUTE_FLOOR_DB) -> list[list[float]]:
+    """
+    Energy-based voice activity detection over non-overlapping frames, fully
+    vectorized: per-frame RMS, an adaptive threshold above the noise floor, then
+    removal of short blips, merging of short pauses and padding.
+
+    Args:
+        floor_db (float): Frames are never speech below this level (see project_floor_db).
+
+    Returns:
+        list: [start, end] of every speech region, in seconds. Empty if the signal is silent.
+    """
+    return _speech_regions(frame_energy_db(signal, sr), sr, len(signal) / sr, floor_db)
+
+
+def _speech_regions(energy_db: np.ndarray, sr: int, duration: float, floor_db: float) -> list[list[float]]:
+    frame = max(1, int(VAD_FRAME_SECONDS * sr))
+    if energy_db.size == 0:
+        return []
+
+    threshold = max(np.percentile(energy_db, VAD_FLOOR_PERCENTILE) + VAD_MARGIN_DB, floor_db)
+    active = energy_db > threshold
+
+    starts, ends = _runs(active)
+    if len(starts) == 0:
+        return []
+    # Close short pauses first, so syllables separated by them count as one region
+    opens = np.concatenate([[True], (starts[1:] - ends[:-1]) * VAD_FRAME_SECONDS >= VAD_MERGE_GAP_SECONDS])
+    starts, ends = starts[opens], ends[np.append(opens[1:], True)]
+    long_enough = (ends - starts) * VAD_FRAME_SECONDS >= VAD_MIN_SPEECH_SECONDS
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    regions = []
+    for start, end in zip(starts * frame / sr, ends * frame / sr):
+        start = max(0.0, float(start) - VAD_PADDING_SECONDS)
+        end = min(duration, float(end) + VAD_PADDING_SECONDS)
+        if regions and start <= regions[-1][1]:
+            regions[-1][1] = round(end, 2)
+        else:
+            regions.append([round(start, 2), round(end, 2)])
+    return regions
+
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Start (inclusive) and end (exclusive) indices of the runs of True in a boolean mask.
+    """
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def index_speech_regions(chunk_files: list[Path]) -> dict[str, list[list[float]]]:
+    """
+    Runs voice activity detection on every chunk of a project, against the noise
+    floor of the whole project (see project_floor_db).
+
+    Returns:
+        dict: Chunk file name -> speech regions (see detect_speech_regions).
+              Chunks that could not be analysed are left out.
+    """
+    energies = {}
+    durations = {}
+    for chunk_file in chunk_files:
+        try:
+            signal = decode_audio(chunk_file, VAD_SAMPLE_RATE)[0]
+        except Exception as e:
+            Logger.warning(f"Voice activity detection failed on '{chunk_file.name}': {e}")
+            continue
+        energies[chunk_file.name] = frame_energy_db(signal, VAD_SAMPLE_RATE)
+        durations[chunk_file.name] = len(signal) / VAD_SAMPLE_RATE
+
+    floor_db = project_floor_db(list(energies.values()))
+    index = {}
+    for name, energy_db in energies.items():
+        index[name] = _speech_regions(energy_db, VAD_SAMPLE_RATE, durations[name], floor_db)
+        if not index[name]:
+            Logger.info(f"No speech detected in '{name}' (floor {floor_db:.0f} dBFS)")
+    return index
+
+
+def is_silent_chunk(metadata: dict, chunk_name: str) -> bool:
+    """
+    True only if the chunk was analysed and no speech was found in it.
+    """
+    return metadata.get("SpeechRegions", {}).get(chunk_name) == []
+
+
+def trim_to_speech(signal: np.ndarray, sr: int, regions: list[list[float]],
+                   gap_s: float = TRIM_GAP_SECONDS) -> np.ndarray:
+    """
+    Keeps only the speech regions of a signal, separated by `gap_s` of silence.
+    """
+    if not regions:
+        return signal[:0]
+    gap = np.zeros(int(gap_s * sr), dtype=signal.dtype)
+    pieces = []
+    for start, end in regions:
+        if pieces:
+            pieces.append(gap)
+        pieces.append(signal[int(start * sr):int(end * sr)])
+    return np.concatenate(pieces)
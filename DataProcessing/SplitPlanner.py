@@ -0,0 +1,124 @@
+import re
+from pathlib import Path
+
+import ffmpeg
+
+from DataProcessing.ffmpegUtil import ffmpeg_slot
+from Utility.Logger import Logger
+
+SILENCE_START_RE = re.compile(r"silence_start:\s*(-?\d+(?:\.\d+)?)")
+SILENCE_END_RE = re.compile(r"silence_end:\s*(-?\d+(?:\.\d+)?)")
+
+DEFAULT_SILENCE_NOISE_DB = -35
+DEFAULT_MIN_SILENCE_S = 0.3
+CUT_PADDING_S = 0.1  # keep cuts slightly inside the silence, away from speech onsets
+
+
+def detect_silences(input_path: Path,
+                    duration: float,
+                    noise_db: float = DEFAULT_SILENCE_NOISE_DB,
+                    min_silence_s: float = DEFAULT_MIN_SILENCE_S) -> list[tuple[float, float]]:
+    """
+    Runs a single ffmpeg silencedetect pass over the audio track of a file.
+
+    Returns:
+        list: (start, end) of every silent interval, in seconds.
+    """
+    with ffmpeg_slot():
+        _, stderr = (
+            ffmpeg.input(str(input_path))
+                  .output("-", format="null", vn=None, af=f"silencedetect=noise={noise_db}dB:d={min_silence_s}")
+                  .run(capture_stderr=True)
+        )
+
+    silences = []
+    start = None
+    for line in stderr.decode(errors="ignore").splitlines():
+        if match := SILENCE_START_RE.search(line):
+            start = max(0.0, float(match.group(1)))
+        elif (match := SILENCE_END_RE.search(line)) and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+
+    # Silence running until the end of the file never gets a silence_end line
+    if start is not None:
+        silences.append((start, duration))
+    return silences
+
+
+def plan_cut_points(duration: float,
+                    chunk_duration_s: float,
+                    silences: list[tuple[float, float]],
+                    tolerance_s: float) -> list[float]:
+    """
+    Moves every nominal cut (multiples of chunk_duration_s) to the nearest point
+    inside a silence, as long as it lies within tolerance_s of the nominal cut.
+    Cuts with no silence in reach stay where they are.
+
+    Returns:
+        list: Sorted cut points in seconds (chunk boundaries, excluding 0 and duration).
+    """
+    cuts = []
+    nominal = chunk_duration_s
+    while nominal < duration:
+        best = nominal
+        best_distance = None
+        for s_start, s_end in silences:
+            if s_end < nominal - tolerance_s:
+                continue
+            if s_start > nominal + tolerance_s:
+                break
+            pad = min(CUT_PADDING_S, (s_end - s_start) / 2)
+            candidate = min(max(nominal, s_start + pad), s_end - pad)
+            distance = abs(candidate - nominal)
+            if distance <= tolerance_s and (best_distance is None or distance < best_distance):
+                best, best_distance = candidate, distance
+
+        # Never produce empty or inverted chunks
+        if (not cuts or best > cuts[-1]) and best < duration:
+            cuts.append(round(best, 3))
+        nominal += chunk_duration_s
+    return cuts
+
+
+def get_split_plan(input_path: Path,
+                   metadata: dict,
+                   duration: float,
+                   chunk_duration_s: float,
+                   tolerance_s: float,
+                   noise_db: float = DEFAULT_SILENCE_NOISE_DB,
+                   min_silence_s: float = DEFAULT_MIN_SILENCE_S) -> list[float]:
+    """
+    Returns the silence-aligned cut points for a file, reusing the plan cached in the
+    project metadata when the source file and the settings are unchanged.
+    The (possibly new) plan is stored back into `metadata` under "SplitPlan".
+    If the silence analysis fails, the fixed grid is returned and nothing is cached.
+    """
+    input_path = Path(input_path)
+    stat = input_path.stat()
+    source = {"Size": stat.st_size, "MTime": stat.st_mtime_ns}
+    settings = {
+        "ChunkDuration": chunk_duration_s,
+        "Tolerance": tolerance_s,
+        "NoiseDb": noise_db,
+        "MinSilence": min_silence_s,
+    }
+
+    cached = metadata.get("SplitPlan")
+    if cached and cached.get("Source") == source and cached.get("Settings") == settings:
+        Logger.info(f"Using cached split plan for '{input_path.name}'")
+        return cached["CutPoints"]
+
+    Logger.info(f"Analysing silences in '{input_path.name}' to plan chunk boundaries...")
+    try:
+        silences = detect_silences(input_path, duration, noise_db, min_silence_s)
+    except (ffmpeg.Error, OSError) as e:
+        stderr_lines = (getattr(e, "stderr", None) or b"").decode(errors="ignore").strip().splitlines()
+        reason = stderr_lines[-1] if stderr_lines else e
+        Logger.warning(f"Silence analysis of '{input_path.name}' failed ({reason}). Using fixed chunk boundaries.")
+        return plan_cut_points(duration, chunk_duration_s, [], tolerance_s)
+    cuts = plan_cut_points(duration, chunk_duration_s, silences, tolerance_s)
+    Logger.info(f"{input_path.name}: {len(silences)} silences found, {len(cuts)} cut points planned")
+
+    metadata["SplitPlan"] = {"Source": source, "Settings": settings, "CutPoints": cuts}
+    return cuts
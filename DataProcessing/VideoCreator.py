@@ -1,30 +1,109 @@
+from enum import Enum
 from pathlib import Path
+
+import ffmpeg
 from moviepy import AudioFileClip, ColorClip
 
 from DataProcessing import AUDIO_EXTENSIONS, VIDEO_EXTENSIONS
-from DataProcessing.ffmpegUtil import get_video_settings, VideoFormat
+from DataProcessing.ffmpegUtil import get_video_settings, safe_probe, flush_probe_cache, ffmpeg_slot, VideoFormat
 from Utility.Logger import Logger
 
 VIDEO_SIZE = (1280, 720)
 VIDEO_COLOR = (0, 0, 0)  # black
 
+# Fast engine: the picture is a constant black frame, so keep it as cheap as possible
+FAST_VIDEO_SIZE = (426, 240)
+FAST_VIDEO_FPS = 1
+FAST_KEYFRAME_INTERVAL_S = 2  # dense keyframes so stream-copy splitting can cut close to the planned points
+
+# Audio codecs each container can carry as-is, without re-encoding
+AUDIO_COPY_CODECS = {
+    VideoFormat.MP4: ("aac", "mp3"),
+    VideoFormat.MOV: ("aac", "mp3", "pcm_s16le"),
+    VideoFormat.MKV: ("aac", "mp3", "pcm_s16le", "flac", "vorbis", "opus"),
+    VideoFormat.AVI: ("mp3", "pcm_s16le"),
+}
+
+
+class SynthesisEngine(Enum):
+    FFMPEG = "ffmpeg"    # lavfi color source + audio stream copy, moviepy as fallback
+    MOVIEPY = "moviepy"  # ColorClip rendered frame by frame
 
-def CreateVideoFromAudio(input_audio_path, output_video_path, video_format=VideoFormat.MP4):
+
+def create_video_ffmpeg(input_audio_path, output_video_path, video_format=VideoFormat.MP4):
     """
-    Converts an audio file to a video file using a black screen.
+    Muxes an audio file with a black lavfi color source at minimal size and frame rate.
+    The audio is stream-copied when the target container supports its codec.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg fails to create the video.
     """
-    try:
-        audio_clip = AudioFileClip(input_audio_path)
+    probe = safe_probe(str(input_audio_path))
+    duration = float(probe["format"]["duration"])
+    audio_codec_name = next((s.get("codec_name") for s in probe.get("streams", [])
+                             if s.get("codec_type") == "audio"), None)
+
+    video_codec, audio_codec = get_video_settings(video_format)
+    if audio_codec_name in AUDIO_COPY_CODECS.get(video_format, ()):
+        audio_codec = "copy"
+
+    width, height = FAST_VIDEO_SIZE
+    black = ffmpeg.input(f"color=c=black:s={width}x{height}:r={FAST_VIDEO_FPS}:d={duration:.3f}", f="lavfi")
+    audio = ffmpeg.input(str(input_audio_path)).audio
+
+    output_kwargs = {
+        "vcodec": video_codec,
+        "acodec": audio_codec,
+        "g": FAST_VIDEO_FPS * FAST_KEYFRAME_INTERVAL_S,
+        "shortest": None,
+    }
+    if video_codec == "libx264":
+        output_kwargs.update(preset="ultrafast", tune="stillimage", pix_fmt="yuv420p")
+    if video_format in (VideoFormat.MP4, VideoFormat.MOV):
+        output_kwargs["movflags"] = "+faststart"
+
+    with ffmpeg_slot():
+        (
+            ffmpeg.output(black, audio, str(output_video_path), **output_kwargs)
+                  .run(overwrite_output=True, quiet=True)
+        )
+
+
+def create_video_moviepy(input_audio_path, output_video_path, video_format=VideoFormat.MP4):
+    """
+    Renders a black 1280x720, 24 fps ColorClip with moviepy.
+    """
+    audio_clip = AudioFileClip(str(input_audio_path))
+
+    # Create black screen clip with same duration as audio
+    black_clip = ColorClip(size=VIDEO_SIZE, color=VIDEO_COLOR, duration=audio_clip.duration)
+    black_clip = black_clip.with_fps(24).with_audio(audio_clip)
+
+    video_codec, audio_codec = get_video_settings(video_format)
+    # moviepy encodes through an ffmpeg process too
+    with ffmpeg_slot():
+        black_clip.write_videofile(str(output_video_path), codec=video_codec, audio_codec=audio_codec)
 
-        # Create black screen clip with same duration as audio
-        black_clip = ColorClip(size=VIDEO_SIZE, color=VIDEO_COLOR, duration=audio_clip.duration)
-        black_clip = black_clip.with_fps(24).with_audio(audio_clip)
+    black_clip.close()
+    audio_clip.close()
 
-        video_codec, audio_codec = get_video_settings(video_format)
-        black_clip.write_videofile(output_video_path, codec=video_codec, audio_codec=audio_codec)
 
-        black_clip.close()
-        audio_clip.close()
+def CreateVideoFromAudio(input_audio_path, output_video_path, video_format=VideoFormat.MP4,
+                         engine: SynthesisEngine = SynthesisEngine.FFMPEG):
+    """
+    Converts an audio file to a video file using a black screen.
+    """
+    try:
+        if engine == SynthesisEngine.FFMPEG:
+            try:
+                create_video_ffmpeg(input_audio_path, output_video_path, video_format)
+                Logger.info(f"Video created: {output_video_path}")
+                return
+            except ffmpeg.Error as e:
+                Logger.warning(f"ffmpeg could not create a video from '{input_audio_path}', "
+                               f"falling back to moviepy: {e.stderr.decode(errors='ignore').strip()[-300:]}")
+
+        create_video_moviepy(input_audio_path, output_video_path, video_format)
         Logger.info(f"Video created: {output_video_path}")
 
     except Exception as e:
@@ -37,6 +116,7 @@ def AudioFolderToVideo(
     out_dir: Path,
     video_format: VideoFormat = VideoFormat.MP4,
     overwrite: bool = False,
+    engine: SynthesisEngine = SynthesisEngine.FFMPEG,
 ):
     """
     Converts all audio files in a folder to videos with a black screen.
@@ -72,11 +152,12 @@ def AudioFolderToVideo(
             continue
 
         try:
-            CreateVideoFromAudio(str(file_path), str(video_output_path), video_format=video_format)
+            CreateVideoFromAudio(str(file_path), str(video_output_path), video_format=video_format, engine=engine)
         except Exception:
             failed_files.append(file_path.name)
 
     Logger.info("Audio to video conversion complete.")
+    flush_probe_cache()
 
     if failed_files:
         Logger.warning(f"{len(failed_files)} files failed to process:")
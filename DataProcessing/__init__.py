@@ -27,3 +27,5 @@ for folder in folders:
 
 VIDEO_EXTENSIONS = (".mp4", ".mov", ".3gp", ".avi", ".mkv")
 AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a")
+
+METADATA_FILE_NAME = "metadata.json"
@@ -1,7 +1,29 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
 from enum import Enum
+from pathlib import Path
+
 import ffmpeg
+import numpy as np
+
+from DataProcessing import DATA_PROC_BASE_DIR
 from Utility.Logger import Logger
 
+DEFAULT_MAX_FFMPEG_PROCESSES = os.cpu_count() or 4
+PROBE_CACHE_FILE = DATA_PROC_BASE_DIR / ".cache" / "probe_cache.json"
+PROBE_CACHE_MAX_ENTRIES = 5000
+PROBE_CACHE_MAX_AGE_SECONDS = 60 * 60 * 24 * 30
+PROBE_CACHE_HASH_BYTES = 64 * 1024
+DECODE_BLOCK_SECONDS = 30
+_max_ffmpeg_processes = DEFAULT_MAX_FFMPEG_PROCESSES
+_ffmpeg_slots: threading.BoundedSemaphore | None = None
+_ffmpeg_slots_lock = threading.Lock()
+_held_ffmpeg_slot = threading.local()
+
 
 class VideoFormat(Enum):
     MP4 = "mp4"
@@ -17,12 +39,200 @@ class AudioFormat(Enum):
     OGG = "ogg"
 
 
-def safe_probe(path: str):
+def set_max_ffmpeg_processes(max_processes: int):
+    """
+    Sets the global cap on ffmpeg processes run concurrently by this process.
+    The cap is sized once, at startup: it cannot change after the first ffmpeg
+    process has started.
+    """
+    global _max_ffmpeg_processes
+    max_processes = max(1, max_processes)
+    with _ffmpeg_slots_lock:
+        if _ffmpeg_slots is not None and max_processes != _max_ffmpeg_processes:
+            raise RuntimeError(f"The ffmpeg process cap is already {_max_ffmpeg_processes} "
+                               f"and in use, it cannot be changed to {max_processes}")
+        _max_ffmpeg_processes = max_processes
+
+
+def get_max_ffmpeg_processes() -> int:
+    return _max_ffmpeg_processes
+
+
+def share_ffmpeg_slots(slots, max_processes: int):
+    """
+    Makes this process draw its ffmpeg slots from `slots`, a multiprocessing semaphore
+    created by the parent with `max_processes` slots, so the processes of a pool share
+    one cap instead of having one each. Call it from the pool initializer.
+    """
+    global _ffmpeg_slots, _max_ffmpeg_processes
+    with _ffmpeg_slots_lock:
+        _ffmpeg_slots = slots
+        _max_ffmpeg_processes = max_processes
+
+
+def _get_ffmpeg_slots() -> threading.BoundedSemaphore:
+    global _ffmpeg_slots
+    with _ffmpeg_slots_lock:
+        if _ffmpeg_slots is None:
+            _ffmpeg_slots = threading.BoundedSemaphore(_max_ffmpeg_processes)
+        return _ffmpeg_slots
+
+
+@contextmanager
+def ffmpeg_slot():
+    """
+    Holds one of the global ffmpeg process slots for the duration of the block.
+    A thread takes one slot at most: the processes it starts while already holding
+    one (the decoder feeding an encoder it opened) share it, so it never waits on
+    a slot it holds itself.
+    """
+    depth = getattr(_held_ffmpeg_slot, "depth", 0)
+    if depth:
+        _held_ffmpeg_slot.depth = depth + 1
+        try:
+            yield
+        finally:
+            _held_ffmpeg_slot.depth -= 1
+        return
+
+    with _get_ffmpeg_slots():
+        _held_ffmpeg_slot.depth = 1
+        try:
+            yield
+        finally:
+            _held_ffmpeg_slot.depth = 0
+
+
+class ProbeCache:
+    """
+    Persistent cache of ffprobe results, keyed by absolute path and validated
+    against the file's size and mtime (plus, optionally, a hash of its first and
+    last bytes for storage where mtimes are unreliable).
+    Entries unused for `max_age_s` are evicted, then the least recently used
+    ones beyond `max_entries`.
+    """
+
+    def __init__(self, cache_file: Path = PROBE_CACHE_FILE,
+                 max_entries: int = PROBE_CACHE_MAX_ENTRIES,
+                 max_age_s: float = PROBE_CACHE_MAX_AGE_SECONDS,
+                 use_content_hash: bool = False):
+        self.CacheFile = Path(cache_file)
+        self.MaxEntries = max_entries
+        self.MaxAge = max_age_s
+        self.UseContentHash = use_content_hash
+        self.Hits = 0
+        self.Misses = 0
+        self._lock = threading.Lock()
+        self._entries: dict | None = None
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            try:
+                with open(self.CacheFile, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (IOError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def _identity(self, path: Path) -> dict:
+        stat = path.stat()
+        identity = {"Size": stat.st_size, "MTime": stat.st_mtime_ns}
+        if self.UseContentHash:
+            digest = hashlib.sha1()
+            with open(path, "rb") as f:
+                digest.update(f.read(PROBE_CACHE_HASH_BYTES))
+                if stat.st_size > PROBE_CACHE_HASH_BYTES:
+                    f.seek(-min(PROBE_CACHE_HASH_BYTES, stat.st_size - PROBE_CACHE_HASH_BYTES), os.SEEK_END)
+                    digest.update(f.read())
+            identity["Hash"] = digest.hexdigest()
+        return identity
+
+    def probe(self, path) -> dict:
+        """
+        Returns the ffprobe result for `path`, probing only on a cache miss.
+        """
+        path = Path(path).resolve()
+        key = str(path)
+        identity = self._identity(path)
+
+        with self._lock:
+            entry = self._load().get(key)
+            if entry and entry["Identity"] == identity:
+                self.Hits += 1
+                entry["LastUsed"] = time.time()
+                self._dirty = True
+                return entry["Probe"]
+            self.Misses += 1
+
+        result = ffmpeg.probe(key)
+
+        with self._lock:
+            self._load()[key] = {"Identity": identity, "LastUsed": time.time(), "Probe": result}
+            self._dirty = True
+        return result
+
+    def flush(self):
+        """
+        Evicts stale entries and writes the cache to disk (atomically),
+        merging with entries written meanwhile by other processes.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = self._load()
+
+            try:
+                with open(self.CacheFile, "r", encoding="utf-8") as f:
+                    on_disk = json.load(f)
+            except (IOError, json.JSONDecodeError):
+                on_disk = {}
+            for key, entry in on_disk.items():
+                if key not in entries or entries[key]["LastUsed"] < entry["LastUsed"]:
+                    entries[key] = entry
+
+            oldest_allowed = time.time() - self.MaxAge
+            fresh = [(k, e) for k, e in entries.items() if e["LastUsed"] >= oldest_allowed]
+            fresh.sort(key=lambda item: item[1]["LastUsed"], reverse=True)
+            self._entries = dict(fresh[:self.MaxEntries])
+
+            self.CacheFile.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.CacheFile.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_file, self.CacheFile)
+            self._dirty = False
+
+    def report(self):
+        total = self.Hits + self.Misses
+        if total:
+            Logger.info(f"Probe cache: {self.Hits} hits, {self.Misses} misses "
+                        f"({100 * self.Hits / total:.0f}% hit rate)")
+
+
+_probe_cache = ProbeCache()
+
+
+def flush_probe_cache():
+    """
+    Persists the shared probe cache and logs its hit/miss counters.
+    """
+    try:
+        _probe_cache.flush()
+    except Exception as e:
+        Logger.warning(f"Could not persist probe cache to '{_probe_cache.CacheFile}': {e}")
+    _probe_cache.report()
+
+
+def safe_probe(path: str, use_cache: bool = True):
     """
     Safely probe a media file and return metadata.
+    Results are served from the persistent probe cache when the file is unchanged.
     Logs detailed error info instead of crashing silently.
     """
     try:
+        if use_cache:
+            return _probe_cache.probe(path)
         return ffmpeg.probe(str(path))
     except ffmpeg.Error as e:
         Logger.error(f"FFPROBE ERROR for '{path}':\n{e.stderr.decode(errors='ignore')}")
@@ -56,3 +266,110 @@ def get_audio_settings(audio_format: AudioFormat):
         AudioFormat.OGG: ("libvorbis", None),       # Good quality
     }
     return AUDIO_CODEC_MAP.get(audio_format, ("pcm_s16le", None))
+
+
+def get_audio_sample_rate(path) -> int:
+    """
+    Native sample rate of the first audio stream of a media file (probe is cached).
+    """
+    for stream in safe_probe(str(path)).get("streams", []):
+        if stream.get("codec_type") == "audio":
+            return int(stream["sample_rate"])
+    raise ValueError(f"No audio stream in '{path}'")
+
+
+def _read_into(stream, view: memoryview) -> int:
+    """
+    Fills `view` from a pipe, returning fewer bytes only at end of stream.
+    """
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def decode_audio_blocks(path,
+                        sr: int | None = None,
+                        channels: int = 1,
+                        start_s: float | None = None,
+                        duration_s: float | None = None,
+                        block_seconds: float = DECODE_BLOCK_SECONDS):
+    """
+    Decodes the audio track of any media file straight into NumPy, through an
+    ffmpeg process writing raw float32 PCM to a pipe (no intermediate file).
+
+    Args:
+        sr (int, optional): Output sample rate (defaults to the native one).
+        channels (int): Output channel count; ffmpeg down/up-mixes as needed.
+        start_s, duration_s (float, optional): Only decode this time window.
+        block_seconds (float): Length of the yielded blocks.
+
+    Yields:
+        np.ndarray: Writable float32 blocks, shaped (frames,) for mono and
+                    (frames, channels) otherwise. The last block may be shorter.
+    """
+    sr = sr or get_audio_sample_rate(path)
+    input_kwargs = {}
+    if start_s:
+        input_kwargs["ss"] = start_s
+    if duration_s is not None:
+        input_kwargs["t"] = duration_s
+
+    frame_bytes = 4 * channels
+    block_frames = max(1, int(block_seconds * sr))
+
+    with ffmpeg_slot():
+        process = (
+            ffmpeg.input(str(path), **input_kwargs)
+                  .output("pipe:", format="f32le", acodec="pcm_f32le", ac=channels, ar=sr)
+                  .global_args("-loglevel", "error")
+                  .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        # Drained concurrently so a chatty ffmpeg can never block on a full stderr pipe
+        stderr = bytearray()
+        drain = threading.Thread(target=lambda: stderr.extend(process.stderr.read()), daemon=True)
+        drain.start()
+
+        finished = False
+        try:
+            while True:
+                block = np.empty(block_frames * channels, dtype="<f4")
+                filled = _read_into(process.stdout, memoryview(block).cast("B"))
+                frames = filled // frame_bytes
+                if frames:
+                    block = block[:frames * channels]
+                    yield block if channels == 1 else block.reshape(frames, channels)
+                if filled < block.nbytes or not frames:
+                    break
+            finished = True
+        finally:
+            if not finished:
+                # The consumer stopped early (or failed): do not wait for the whole decode
+                process.kill()
+            process.stdout.close()
+            returncode = process.wait()
+            drain.join()
+
+    if finished and returncode != 0:
+        raise ffmpeg.Error("ffmpeg", None, bytes(stderr))
+
+
+def decode_audio(path,
+                 sr: int | None = None,
+                 channels: int = 1,
+                 start_s: float | None = None,
+                 duration_s: float | None = None) -> tuple[np.ndarray, int]:
+    """
+    Decodes (a time window of) the audio track of a media file in one array.
+
+    Returns:
+        tuple: (audio as float32 numpy array, sample_rate)
+    """
+    sr = sr or get_audio_sample_rate(path)
+    blocks = list(decode_audio_blocks(path, sr, channels, start_s, duration_s))
+    if not blocks:
+        return np.zeros((0,) if channels == 1 else (0, channels), dtype=np.float32), sr
+    return np.concatenate(blocks), sr
@@ -85,6 +85,19 @@ class Logger:
         Logger._IsInitialized()
         return Logger._logger
 
+    @staticmethod
+    def GetLevel() -> LogLevel:
+        Logger._IsInitialized()
+        return LogLevel(Logger._logger.level)
+
+    @staticmethod
+    def SetupWorker(level: LogLevel) -> None:
+        """
+        Process-pool initializer: re-create the logger inside a worker process
+        (required on platforms that spawn instead of fork).
+        """
+        Logger.setup(level=level)
+
     @ staticmethod
     def GetConsole() -> Console:
         Logger._IsInitialized()
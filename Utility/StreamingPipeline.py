@@ -0,0 +1,167 @@
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable
+
+from Utility.Logger import Logger
+
+_END_OF_STREAM = object()
+
+
+class PipelineStage:
+    """
+    A pipeline stage: `workers` threads pulling items from a bounded input queue.
+
+    The handler is called as handler(item, emit). `emit(item)` forwards a result
+    to the default downstream stage, `emit(item, to="name")` to a named one.
+    Emitting blocks while the target queue is full, which is what propagates
+    backpressure upstream. A handler can give an item back with `requeue(item)`
+    to have it handled again once the queue has run dry.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any, Callable], None], workers: int = 1, queue_size: int = 0):
+        self.Name = name
+        self.Handler = handler
+        self.Workers = max(1, workers)
+        self.Queue = queue.Queue(maxsize=queue_size)
+        self.Outputs: dict[str, "PipelineStage"] = {}
+        self.DefaultOutput: "PipelineStage | None" = None
+        self.Failures: list[tuple[Any, Exception]] = []
+        self._open_producers = 0
+        self._outstanding = 0  # items queued or being handled
+        self._closed = False
+        self._requeued = deque()
+        self._lock = threading.Lock()
+
+    def emit(self, item, to: str | None = None):
+        target = self.Outputs[to] if to else self.DefaultOutput
+        if target is None:
+            raise ValueError(f"Stage '{self.Name}' has no output '{to}'")
+        target._put(item)
+
+    def requeue(self, item):
+        """
+        Gives an item being handled by this stage back for another try. Requeued items
+        bypass the bounded queue, so a worker never blocks on its own stage.
+        """
+        with self._lock:
+            self._outstanding += 1
+            self._requeued.append(item)
+
+    def _put(self, item):
+        with self._lock:
+            self._outstanding += 1
+        self.Queue.put(item)
+
+    def _close_if_drained(self):
+        # Requeued items can only come from items still outstanding, so the stage
+        # is closed once no producer is open and nothing is left to handle
+        with self._lock:
+            closed = self._open_producers == 0 and self._outstanding == 0 and not self._closed
+            self._closed = self._closed or closed
+        if closed:
+            for _ in range(self.Workers):
+                self.Queue.put(_END_OF_STREAM)
+
+    def _producer_finished(self):
+        with self._lock:
+            self._open_producers -= 1
+        self._close_if_drained()
+
+    def _next_item(self):
+        try:
+            return self.Queue.get_nowait()
+        except queue.Empty:
+            pass
+        # The worker that requeued an item always comes back here, so it is never stranded
+        with self._lock:
+            if self._requeued:
+                return self._requeued.popleft()
+        return self.Queue.get()
+
+    def _work(self):
+        while True:
+            item = self._next_item()
+            if item is _END_OF_STREAM:
+                return
+            try:
+                self.Handler(item, self.emit)
+            except (Exception, SystemExit) as e:
+                # SystemExit too: a handler calling sys.exit() must not kill the worker
+                # thread, or upstream stages would block forever on this stage's full queue
+                Logger.error(f"[{self.Name}] Failed on '{item}': {e!r}")
+                with self._lock:
+                    self.Failures.append((item, e))
+            with self._lock:
+                self._outstanding -= 1
+            self._close_if_drained()
+
+
+class StreamingPipeline:
+    """
+    Runs stages concurrently, connected by bounded queues. Items move to the next
+    stage as soon as they are produced instead of waiting for the whole previous
+    stage to finish. A stage shuts down once all of its producers are done.
+    """
+
+    def __init__(self):
+        self.Stages: dict[str, PipelineStage] = {}
+        self._sources: list[tuple[PipelineStage, list]] = []
+
+    def add(self, stage: PipelineStage) -> PipelineStage:
+        self.Stages[stage.Name] = stage
+        return stage
+
+    def connect(self, source: PipelineStage, target: PipelineStage, default: bool = True):
+        source.Outputs[target.Name] = target
+        if default:
+            source.DefaultOutput = target
+        target._open_producers += 1
+
+    def feed(self, stage: PipelineStage, items: list):
+        """
+        Schedules `items` to be put into the stage's queue when the pipeline starts.
+        """
+        self._sources.append((stage, list(items)))
+        stage._open_producers += 1
+
+    def run(self) -> dict[str, list[tuple[Any, Exception]]]:
+        """
+        Runs the pipeline to completion.
+
+        Returns:
+            dict: Failed items (with their exception) per stage name.
+        """
+        stage_threads = {}
+        for stage in self.Stages.values():
+            stage_threads[stage.Name] = [
+                threading.Thread(target=stage._work, name=f"{stage.Name}-{i}", daemon=True)
+                for i in range(stage.Workers)
+            ]
+            for thread in stage_threads[stage.Name]:
+                thread.start()
+            if stage._open_producers == 0:
+                stage._open_producers = 1
+                stage._producer_finished()
+
+        def _feed(stage: PipelineStage, items: list):
+            for item in items:
+                stage._put(item)
+            stage._producer_finished()
+
+        feeders = [threading.Thread(target=_feed, args=source, daemon=True) for source in self._sources]
+        for feeder in feeders:
+            feeder.start()
+
+        # A stage's outputs are closed once all of its workers returned;
+        # stages were added in topological order, so join them in that order.
+        for stage in self.Stages.values():
+            for thread in stage_threads[stage.Name]:
+                thread.join()
+            for target in set(stage.Outputs.values()):
+                target._producer_finished()
+
+        for feeder in feeders:
+            feeder.join()
+
+        return {name: stage.Failures for name, stage in self.Stages.items() if stage.Failures}
@@ -0,0 +1,253 @@
+import threading
+import time
+
+from selenium.webdriver.remote.webelement import WebElement
+from seleniumbase import Driver
+
+from Utility.Logger import Logger
+
+DEFAULT_MAX_USES = 10
+DEFAULT_MAX_IDLE = 8
+RESET_RECONNECT_SECONDS = 6
+
+
+def _proxy_key(proxy: dict | None) -> str:
+    return f"{proxy['ip']}:{proxy['port']}" if proxy else "direct"
+
+
+class _Browser:
+    """
+    One Chrome instance bound to a proxy, possibly shared by several tabs.
+    """
+
+    def __init__(self, driver, proxy_key: str):
+        self.Driver = driver
+        self.ProxyKey = proxy_key
+        self.Uses = 0
+        self.Leases = 0
+        self.Retired = False
+        self.LastUsed = time.monotonic()
+        self.FreeHandles: list[str] = []
+        self.ActiveHandle = driver.current_window_handle
+        # Serializes WebDriver commands when tabs share the browser
+        self.Lock = threading.RLock()
+
+
+class _TabElement(WebElement):
+    """
+    WebElement of a shared browser. Its parent is the tab's driver handle, so every
+    command it sends (directly or through execute_script) first brings its tab to the
+    front. Being a real WebElement, it is accepted by expected conditions and script
+    arguments like any other element.
+    """
+
+
+class _TabDriver:
+    """
+    Driver handle of one tab of a shared browser. WebDriver commands act on the
+    focused window, so each call takes the browser lock and switches to this tab.
+
+    The lock is held for the whole call. That keeps long calls exclusive too:
+    uc_open_with_reconnect disconnects the driver from the browser while the page
+    loads, so no other tab may send commands meanwhile, and each execute_async_script
+    slice of the transcript harvest holds it for at most HARVEST_SLICE_SECONDS.
+    """
+
+    def __init__(self, browser: _Browser, handle: str):
+        self._browser = browser
+        self._handle = handle
+
+    def _activate(self):
+        if self._browser.ActiveHandle != self._handle:
+            self._browser.Driver.switch_to.window(self._handle)
+            self._browser.ActiveHandle = self._handle
+
+    def _wrap(self, result):
+        # Rebinds elements to this tab, including those inside raw `execute` responses
+        if isinstance(result, WebElement) and not isinstance(result, _TabElement):
+            return _TabElement(self, result.id)
+        if isinstance(result, list):
+            return [self._wrap(r) for r in result]
+        if isinstance(result, dict):
+            return {k: self._wrap(v) for k, v in result.items()}
+        return result
+
+    def _call(self, target, name):
+        with self._browser.Lock:
+            self._activate()
+            attr = getattr(target, name)
+        if not callable(attr):
+            return self._wrap(attr)
+
+        def call(*args, **kwargs):
+            with self._browser.Lock:
+                self._activate()
+                return self._wrap(attr(*args, **kwargs))
+        return call
+
+    def __getattr__(self, name):
+        return self._call(self._browser.Driver, name)
+
+
+class BrowserSession:
+    """
+    A browser tab leased from a DriverPool. Use `Driver` like a seleniumbase driver.
+    """
+
+    def __init__(self, browser: _Browser, handle: str, shared: bool, warm: bool):
+        self._browser = browser
+        self.Handle = handle
+        self.Driver = _TabDriver(browser, handle) if shared else browser.Driver
+        # True when the tab was reset to the pool's start page by the previous job
+        self.IsWarm = warm
+
+
+class DriverPool:
+    """
+    Thread-safe pool of warm undetected-Chrome sessions, keyed by proxy.
+
+    Sessions are reset between jobs and handed out again. A browser is recycled
+    after `max_uses` jobs or as soon as a job on it fails. With `tabs_per_driver`
+    above 1, concurrent jobs on the same proxy share one browser in separate tabs.
+    They then also share cookies and storage, so use it only with proxies
+    (and sites) that tolerate it. At most `max_idle` unused browsers are kept,
+    the least recently used ones are closed first.
+    """
+
+    def __init__(self, headless_Mode=False, reset_url: str | None = None,
+                 max_uses: int = DEFAULT_MAX_USES, tabs_per_driver: int = 1,
+                 max_idle: int = DEFAULT_MAX_IDLE):
+        self.HeadlessMode = headless_Mode
+        self.ResetUrl = reset_url
+        self.MaxUses = max(1, max_uses)
+        self.TabsPerDriver = max(1, tabs_per_driver)
+        self.MaxIdle = max(0, max_idle)
+        self._browsers: dict[str, list[_Browser]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(browsers) for browsers in self._browsers.values())
+
+    def _lease(self, browser: _Browser) -> str | None:
+        browser.Leases += 1
+        browser.Uses += 1
+        browser.LastUsed = time.monotonic()
+        return browser.FreeHandles.pop() if browser.FreeHandles else None
+
+    def Acquire(self, proxy: dict | None = None) -> BrowserSession:
+        """
+        Returns a session on a browser using `proxy`, starting a new browser if none is free.
+        """
+        key = _proxy_key(proxy)
+        browser, handle = None, None
+        warm = False
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("DriverPool is shut down")
+            for candidate in self._browsers.get(key, []):
+                if (not candidate.Retired and candidate.Leases < self.TabsPerDriver
+                        and candidate.Uses < self.MaxUses):
+                    browser = candidate
+                    handle = self._lease(browser)
+                    warm = handle is not None
+                    break
+
+        if browser is None:
+            Logger.debug(f"Starting a new browser for proxy {key}")
+            driver = Driver(uc=True, headless=self.HeadlessMode, proxy=key if proxy else None)
+            browser = _Browser(driver, key)
+            with self._lock:
+                self._browsers.setdefault(key, []).append(browser)
+                self._lease(browser)
+            handle = browser.ActiveHandle
+        elif handle is None:
+            # Another job holds the first tab of this browser
+            with browser.Lock:
+                browser.Driver.switch_to.new_window("tab")
+                handle = browser.Driver.current_window_handle
+                browser.ActiveHandle = handle
+
+        return BrowserSession(browser, handle, self.TabsPerDriver > 1, warm)
+
+    def _reset(self, session: BrowserSession):
+        """
+        Clears the state left by the previous job and reopens the start page.
+        Cookies and storage are per browser, so shared browsers only navigate.
+        """
+        driver = session.Driver
+        if self.TabsPerDriver == 1:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            driver.delete_all_cookies()
+        if self.ResetUrl:
+            driver.uc_open_with_reconnect(self.ResetUrl, RESET_RECONNECT_SECONDS)
+
+    def Release(self, session: BrowserSession, failed: bool = False):
+        """
+        Returns a session to the pool. Failed sessions and worn-out browsers are closed.
+        """
+        browser = session._browser
+        if failed or browser.Uses >= self.MaxUses:
+            browser.Retired = True
+        elif not self._closed:
+            try:
+                self._reset(session)
+            except Exception as e:
+                Logger.warning(f"Could not reset browser of proxy {browser.ProxyKey}: {e}")
+                browser.Retired = True
+
+        to_quit = []
+        with self._lock:
+            browser.Leases -= 1
+            browser.LastUsed = time.monotonic()
+            if not browser.Retired:
+                browser.FreeHandles.append(session.Handle)
+            if (browser.Retired or self._closed) and browser.Leases == 0:
+                to_quit.append(browser)
+            to_quit.extend(self._evict_idle())
+            for b in to_quit:
+                self._browsers[b.ProxyKey].remove(b)
+                if not self._browsers[b.ProxyKey]:
+                    del self._browsers[b.ProxyKey]
+
+        for b in to_quit:
+            self._quit(b)
+
+    def _evict_idle(self) -> list[_Browser]:
+        idle = [b for browsers in self._browsers.values() for b in browsers
+                if b.Leases == 0 and not b.Retired]
+        idle.sort(key=lambda b: b.LastUsed)
+        evicted = idle[:max(0, len(idle) - self.MaxIdle)]
+        for b in evicted:
+            b.Retired = True
+        return evicted
+
+    @staticmethod
+    def _quit(browser: _Browser):
+        try:
+            browser.Driver.quit()
+        except Exception as e:
+            Logger.debug(f"Error closing browser of proxy {browser.ProxyKey}: {e}")
+
+    def Shutdown(self):
+        """
+        Closes every idle browser. Browsers still leased are closed when released.
+        """
+        with self._lock:
+            self._closed = True
+            idle = [b for browsers in self._browsers.values() for b in browsers if b.Leases == 0]
+            for b in idle:
+                self._browsers[b.ProxyKey].remove(b)
+                if not self._browsers[b.ProxyKey]:
+                    del self._browsers[b.ProxyKey]
+        for b in idle:
+            self._quit(b)
+        if idle:
+            Logger.info(f"Closed {len(idle)} pooled browsers")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.Shutdown()
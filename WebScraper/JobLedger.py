@@ -0,0 +1,279 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from pathlib import Path
+
+from Utility.Logger import Logger
+from WebScraper import JOB_LEDGER_FILE
+from WebScraper.ResultStore import hash_file
+from WebScraper.VideoTranscriptJobDescriptor import VideoTranscriptJobDescriptor, GenerateJobsFromProject
+
+BUSY_TIMEOUT_SECONDS = 30
+STALE_CLAIM_SECONDS = 60 * 60 * 2
+DEFAULT_MAX_ATTEMPTS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id        TEXT PRIMARY KEY,
+    project       TEXT NOT NULL,
+    project_dir   TEXT NOT NULL,
+    video_path    TEXT NOT NULL,
+    output_folder TEXT NOT NULL,
+    language      TEXT NOT NULL,
+    state         TEXT NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    proxy         TEXT,
+    claimed_by    TEXT,
+    claimed_at    REAL,
+    duration      REAL,
+    latency       REAL,
+    total_seconds REAL NOT NULL DEFAULT 0,
+    output_hash   TEXT,
+    last_error    TEXT,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, attempts);
+CREATE TABLE IF NOT EXISTS projects (
+    project_dir   TEXT PRIMARY KEY,
+    mtime_ns      INTEGER NOT NULL
+);
+"""
+
+
+class JobState(Enum):
+    Pending = "pending"
+    Running = "running"
+    Done = "done"
+    Failed = "failed"
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED: exists, owned by someone else
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _is_dead_local_worker(worker_id: str | None) -> bool:
+    """
+    True for a default worker id (host:pid) of this host whose process has exited.
+    """
+    host, _, pid = (worker_id or "").rpartition(":")
+    return host == socket.gethostname() and pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid))
+
+
+def _root_filter(project_root: Path | str | None) -> tuple[str, tuple]:
+    """
+    SQL condition (and its parameters) selecting the projects inside `project_root`.
+    """
+    if project_root is None:
+        return "1", ()
+    prefix = str(Path(project_root).resolve()) + os.sep
+    return "substr(project_dir, 1, ?) = ?", (len(prefix), prefix)
+
+
+class JobLedger:
+    """
+    Persistent record of transcription jobs in SQLite (WAL mode), shared by every
+    thread and process working on the same tree.
+
+    Each job has a state, attempt count, last proxy, latency/duration of its last
+    attempt, total time spent on it and the hash of its HTML output. Claims run in
+    BEGIN IMMEDIATE transactions, so concurrent processes never claim the same job.
+    Claims left by a process of this host that exited are given back at the next
+    Claim; other claims (e.g. custom worker ids) after STALE_CLAIM_SECONDS.
+    Projects are only rescanned when their folder changed since the last Sync.
+
+    WAL needs shared memory between the processes, so the database must be on a
+    local disk, not on a network filesystem.
+    """
+
+    def __init__(self, db_file: Path | str = JOB_LEDGER_FILE, worker_id: str | None = None):
+        self.DbFile = Path(db_file)
+        self.WorkerId = worker_id or default_worker_id()
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.DbFile, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def Sync(self, input_folder: Path | str, output_folder: Path | str) -> int:
+        """
+        Registers the jobs of every project folder that is new or changed since the
+        last Sync. Chunks whose HTML already exists are recorded as done, done jobs
+        whose HTML was deleted go back to pending.
+        :return: number of projects rescanned
+        """
+        input_folder = Path(input_folder)
+        rescanned = 0
+        for project_dir in sorted(p for p in input_folder.iterdir() if p.is_dir()):
+            key = str(project_dir.resolve())
+            mtime_ns = project_dir.stat().st_mtime_ns
+            row = self._connection().execute(
+                "SELECT mtime_ns FROM projects WHERE project_dir = ?", (key,)).fetchone()
+            if row and row["mtime_ns"] == mtime_ns:
+                continue
+
+            jobs = GenerateJobsFromProject(project_dir, output_folder)
+            # Generating the jobs may write a default metadata.json into the folder
+            mtime_ns = project_dir.stat().st_mtime_ns
+            now = time.time()
+            with self._transaction() as db:
+                for job in jobs:
+                    html_file = job.GetHTMLOutputFilePath()
+                    if os.path.isfile(html_file):
+                        state, output_hash = JobState.Done.value, hash_file(html_file)
+                    else:
+                        state, output_hash = JobState.Pending.value, None
+                    db.execute(
+                        "INSERT INTO jobs (job_id, project, project_dir, video_path, output_folder, "
+                        "language, state, output_hash, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (job_id) DO UPDATE SET state = excluded.state, "
+                        "output_hash = excluded.output_hash, updated_at = excluded.updated_at "
+                        "WHERE state = 'pending' AND excluded.state = 'done'",
+                        (job.JobId, project_dir.name, key, str(job.VideoPath), str(job.OutputFolder),
+                         job.Language, state, output_hash, now))
+                db.execute("INSERT OR REPLACE INTO projects (project_dir, mtime_ns) VALUES (?, ?)", (key, mtime_ns))
+            rescanned += 1
+
+        if rescanned:
+            Logger.info(f"Job ledger: rescanned {rescanned} changed projects in '{input_folder}'")
+        self._requeue_missing_outputs(input_folder)
+        return rescanned
+
+    def _requeue_missing_outputs(self, input_folder: Path):
+        # Deleting an HTML file does not touch the project folder, so done jobs are checked one by one
+        root_sql, root_params = _root_filter(input_folder)
+        rows = self._connection().execute(f"SELECT * FROM jobs WHERE state = ? AND {root_sql}",
+                                          (JobState.Done.value, *root_params)).fetchall()
+        missing = [row["job_id"] for row in rows if not os.path.isfile(self._to_job(row).GetHTMLOutputFilePath())]
+        if not missing:
+            return
+        with self._transaction() as db:
+            db.executemany("UPDATE jobs SET state = ?, output_hash = NULL, updated_at = ? WHERE job_id = ? AND state = ?",
+                           [(JobState.Pending.value, time.time(), job_id, JobState.Done.value) for job_id in missing])
+        Logger.info(f"Job ledger: {len(missing)} done jobs lost their HTML output and are pending again")
+
+    @staticmethod
+    def _release_dead_claims(db: sqlite3.Connection):
+        rows = db.execute("SELECT job_id, claimed_by FROM jobs WHERE state = ?", (JobState.Running.value,)).fetchall()
+        dead = [row["job_id"] for row in rows if _is_dead_local_worker(row["claimed_by"])]
+        if not dead:
+            return
+        db.executemany("UPDATE jobs SET state = ?, claimed_by = NULL, claimed_at = NULL, updated_at = ? "
+                       "WHERE job_id = ?", [(JobState.Pending.value, time.time(), job_id) for job_id in dead])
+        Logger.warning(f"Job ledger: gave back {len(dead)} jobs claimed by exited processes")
+
+    def Claim(self, limit: int = 1, project_root: Path | str | None = None) -> list[VideoTranscriptJobDescriptor]:
+        """
+        Atomically moves up to `limit` pending (or stale running) jobs to running for
+        this worker, least attempted first. Claims of exited processes are given back first.
+        :param project_root: only claim jobs of projects inside this folder
+        """
+        now = time.time()
+        root_sql, root_params = _root_filter(project_root)
+        with self._transaction() as db:
+            self._release_dead_claims(db)
+            rows = db.execute(f"SELECT * FROM jobs WHERE (state = ? OR (state = ? AND claimed_at < ?)) "
+                              f"AND {root_sql} ORDER BY attempts, job_id LIMIT ?",
+                              (JobState.Pending.value, JobState.Running.value, now - STALE_CLAIM_SECONDS,
+                               *root_params, limit)).fetchall()
+            db.executemany("UPDATE jobs SET state = ?, claimed_by = ?, claimed_at = ?, updated_at = ? "
+                           "WHERE job_id = ?",
+                           [(JobState.Running.value, self.WorkerId, now, now, row["job_id"]) for row in rows])
+        return [self._to_job(row) for row in rows]
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> VideoTranscriptJobDescriptor:
+        return VideoTranscriptJobDescriptor(row["project"], row["video_path"], row["output_folder"],
+                                            {"Language": row["language"]})
+
+    def RecordAttempt(self, job: VideoTranscriptJobDescriptor, proxy: str, latency: float | None,
+                      seconds: float, error: str | None = None):
+        """
+        Counts one upload attempt on a claimed job and the time it took.
+        """
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET attempts = attempts + 1, proxy = ?, latency = ?, "
+                       "total_seconds = total_seconds + ?, last_error = COALESCE(?, last_error), "
+                       "claimed_at = ?, updated_at = ? WHERE job_id = ?",
+                       (proxy, latency, seconds, error, time.time(), time.time(), job.JobId))
+
+    def Complete(self, job: VideoTranscriptJobDescriptor, duration: float | None = None):
+        """
+        Marks a job done, with the hash of its HTML output.
+        """
+        output_hash = hash_file(job.GetHTMLOutputFilePath())
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET state = ?, duration = COALESCE(?, duration), output_hash = ?, "
+                       "claimed_by = NULL, claimed_at = NULL, last_error = NULL, updated_at = ? WHERE job_id = ?",
+                       (JobState.Done.value, duration, output_hash, time.time(), job.JobId))
+
+    def Release(self, job: VideoTranscriptJobDescriptor, max_attempts: int | None = None):
+        """
+        Gives an unfinished job back to the queue, or marks it failed once it used
+        `max_attempts` upload attempts.
+        """
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET state = CASE WHEN ? IS NOT NULL AND attempts >= ? THEN ? ELSE ? END, "
+                       "claimed_by = NULL, claimed_at = NULL, updated_at = ? WHERE job_id = ? AND state = ?",
+                       (max_attempts, max_attempts, JobState.Failed.value, JobState.Pending.value,
+                        time.time(), job.JobId, JobState.Running.value))
+
+    def Summary(self, project_root: Path | str | None = None) -> dict[JobState, int]:
+        """
+        Number of jobs in every state.
+        """
+        root_sql, root_params = _root_filter(project_root)
+        counts = {state: 0 for state in JobState}
+        for row in self._connection().execute(
+                f"SELECT state, COUNT(*) AS n FROM jobs WHERE {root_sql} GROUP BY state", root_params):
+            counts[JobState(row["state"])] = row["n"]
+        return counts
+
+    def FailedJobs(self, project_root: Path | str | None = None) -> list[str]:
+        root_sql, root_params = _root_filter(project_root)
+        rows = self._connection().execute(f"SELECT job_id, last_error FROM jobs WHERE state = ? AND {root_sql}",
+                                          (JobState.Failed.value, *root_params))
+        return [f"{row['job_id']}: {row['last_error']}" for row in rows]
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from Utility.Logger import Logger
+from WebScraper.JobLedger import default_worker_id
+from WebScraper.ResultStore import hash_file
+from WebScraper.VideoTranscriptJobDescriptor import VideoTranscriptJobDescriptor
+
+LEASE_TTL_SECONDS = 60 * 5
+LEASE_HEARTBEAT_SECONDS = 30
+
+
+class LeaseQueue:
+    """
+    Work queue shared by upload workers on several hosts through a shared filesystem.
+
+    A job is claimed by creating its lease file with O_CREAT | O_EXCL, which only
+    one worker can do. The owner refreshes the lease's mtime every `heartbeat_s`;
+    a lease not refreshed for `lease_ttl_s` is expired and can be reclaimed by any
+    worker. A finished job gets a done marker with its output hash, and its lease
+    is removed. Every upload attempt adds its own file below the job's attempt
+    directory; a job given back after `max_attempts` of them gets a failed marker
+    and is not claimed again. Ages are measured against the filesystem's own clock (the mtime of
+    a file touched just before), so clock skew between hosts does not matter.
+
+    Unlike the JobLedger (SQLite WAL needs shared memory between processes and is
+    unsafe on NFS/SMB), this only relies on exclusive create, rename and mtime.
+    It offers the same RecordAttempt/Complete/Release calls to UploadScheduler.
+    """
+
+    def __init__(self, queue_dir: Path | str, worker_id: str | None = None,
+                 lease_ttl_s: float = LEASE_TTL_SECONDS, heartbeat_s: float = LEASE_HEARTBEAT_SECONDS):
+        self.QueueDir = Path(queue_dir)
+        self.WorkerId = worker_id or default_worker_id()
+        self.LeaseTTL = lease_ttl_s
+        self.Heartbeat = heartbeat_s
+        self.LeaseDir = self.QueueDir / "leases"
+        self.DoneDir = self.QueueDir / "done"
+        self.FailedDir = self.QueueDir / "failed"
+        self.AttemptDir = self.QueueDir / "attempts"
+        for directory in (self.LeaseDir, self.DoneDir, self.FailedDir, self.AttemptDir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self._clock_file = self.QueueDir / "clocks" / f"{uuid.uuid4().hex}.clock"
+        self._clock_file.parent.mkdir(parents=True, exist_ok=True)
+        self._held: dict[str, VideoTranscriptJobDescriptor] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --- Keys and markers ---
+    @staticmethod
+    def GetKey(job: VideoTranscriptJobDescriptor) -> str:
+        """
+        Host-independent job key: the chunk's path below the shared tree, not its mount point.
+        """
+        relative = f"{job.VideoPath.parent.parent.name}/{job.VideoProjectFolder.name}/{job.VideoPath.name}"
+        return f"{job.VideoPath.stem}_{hashlib.sha1(relative.encode()).hexdigest()[:12]}"
+
+    def _lease_path(self, key: str) -> Path:
+        return self.LeaseDir / f"{key}.lease"
+
+    def _done_path(self, key: str) -> Path:
+        return self.DoneDir / f"{key}.json"
+
+    def _failed_path(self, key: str) -> Path:
+        return self.FailedDir / f"{key}.json"
+
+    def _attempt_dir(self, key: str) -> Path:
+        return self.AttemptDir / key
+
+    def _write_marker(self, path: Path, marker: dict):
+        tmp_file = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(marker, f)
+        os.replace(tmp_file, path)
+
+    def IsDone(self, job: VideoTranscriptJobDescriptor) -> bool:
+        key = self.GetKey(job)
+        if self._done_path(key).exists():
+            return True
+        # Output of a run from before the queue existed (an HTML being written has a lease)
+        return job.GetHTMLOutputFilePath().is_file() and not self._lease_path(key).exists()
+
+    def IsFailed(self, job: VideoTranscriptJobDescriptor) -> bool:
+        return self._failed_path(self.GetKey(job)).exists()
+
+    def _attempt_files(self, key: str) -> list[Path]:
+        attempt_dir = self._attempt_dir(key)
+        return list(attempt_dir.glob("*.json")) if attempt_dir.is_dir() else []
+
+    def Attempts(self, job: VideoTranscriptJobDescriptor) -> int:
+        """
+        Upload attempts recorded on the job by every worker.
+        """
+        return len(self._attempt_files(self.GetKey(job)))
+
+    def _server_now(self) -> float:
+        self._clock_file.touch()
+        os.utime(self._clock_file)
+        return self._clock_file.stat().st_mtime
+
+    def _remove_stale_clocks(self):
+        """
+        Deletes the clock files of workers that were killed before they could remove
+        their own. A live worker whose clock is removed just recreates it on next use.
+        """
+        now = self._server_now()
+        for clock in self._clock_file.parent.glob("*.clock"):
+            try:
+                if clock != self._clock_file and now - clock.stat().st_mtime > self.LeaseTTL:
+                    clock.unlink()
+            except FileNotFoundError:
+                pass
+
+    # --- Claims ---
+    def _create_lease(self, path: Path) -> bool:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"Worker": self.WorkerId, "Claimed": time.time()}, f)
+        return True
+
+    def _reclaim_expired(self, path: Path) -> bool:
+        """
+        Moves an expired lease out of the way. Renaming is atomic, so of several
+        workers racing on the same lease only one moves it; if what got moved had
+        been renewed meanwhile, it is put back.
+        """
+        try:
+            observed = path.stat().st_mtime
+        except FileNotFoundError:
+            return True
+        if self._server_now() - observed < self.LeaseTTL:
+            return False
+
+        stale = path.with_name(f"{path.name}.{uuid.uuid4().hex}.stale")
+        try:
+            os.rename(path, stale)
+        except FileNotFoundError:
+            return True  # another worker moved it first
+        if stale.stat().st_mtime != observed:
+            # A fresh lease replaced the expired one after we looked: give it back
+            try:
+                os.link(stale, path)
+            except FileExistsError:
+                pass
+            stale.unlink()
+            return False
+        owner = self._read_owner(stale)
+        stale.unlink()
+        Logger.warning(f"Reclaimed expired lease '{path.stem}' of worker {owner}")
+        return True
+
+    @staticmethod
+    def _read_owner(path: Path) -> str | None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("Worker")
+        except (IOError, json.JSONDecodeError):
+            return None
+
+    def TryClaim(self, job: VideoTranscriptJobDescriptor) -> bool:
+        if self.IsDone(job) or self.IsFailed(job):
+            return False
+        key = self.GetKey(job)
+        path = self._lease_path(key)
+        if not self._create_lease(path):
+            if not self._reclaim_expired(path) or not self._create_lease(path):
+                return False
+        with self._lock:
+            self._held[key] = job
+        return True
+
+    def Claim(self, jobs: list[VideoTranscriptJobDescriptor], limit: int) -> list[VideoTranscriptJobDescriptor]:
+        """
+        Claims up to `limit` of the given jobs that are neither done, failed nor leased.
+        """
+        claimed = []
+        for job in jobs:
+            if len(claimed) >= limit:
+                break
+            if self.TryClaim(job):
+                claimed.append(job)
+        return claimed
+
+    def Pending(self, jobs: list[VideoTranscriptJobDescriptor]) -> int:
+        """
+        Number of jobs neither done nor failed, leased or not.
+        """
+        return sum(not self.IsDone(job) and not self.IsFailed(job) for job in jobs)
+
+    def FailedJobs(self, jobs: list[VideoTranscriptJobDescriptor]) -> list[str]:
+        failed = []
+        for job in jobs:
+            path = self._failed_path(self.GetKey(job))
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    failed.append(f"{path.stem}: {json.load(f).get('LastError')}")
+            except FileNotFoundError:
+                pass
+            except json.JSONDecodeError:
+                failed.append(f"{path.stem}: None")
+        return failed
+
+    # --- Heartbeats ---
+    def _still_mine(self, key: str) -> bool:
+        return self._read_owner(self._lease_path(key)) == self.WorkerId
+
+    def _renew_all(self):
+        with self._lock:
+            held = dict(self._held)
+        for key, job in held.items():
+            try:
+                if not self._still_mine(key):
+                    raise FileNotFoundError
+                os.utime(self._lease_path(key))
+            except FileNotFoundError:
+                Logger.warning(f"Lost the lease of job {job}. Cancelling it.")
+                job.Cancel.set()
+                with self._lock:
+                    self._held.pop(key, None)
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.Heartbeat):
+            try:
+                self._renew_all()
+                self._remove_stale_clocks()
+            except OSError as e:
+                Logger.warning(f"Lease heartbeat failed: {e}")
+
+    def Start(self):
+        if self._thread is None:
+            self._remove_stale_clocks()
+            self._thread = threading.Thread(target=self._heartbeat_loop, name="lease-heartbeat", daemon=True)
+            self._thread.start()
+
+    def Stop(self):
+        """
+        Stops the heartbeats and gives back every lease still held.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            held = list(self._held.values())
+        for job in held:
+            self.Release(job)
+        self._clock_file.unlink(missing_ok=True)
+
+    def __enter__(self):
+        self.Start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.Stop()
+
+    # --- UploadScheduler interface ---
+    def RecordAttempt(self, job: VideoTranscriptJobDescriptor, proxy: str, latency: float | None,
+                      seconds: float, error: str | None = None):
+        """
+        Counts one upload attempt in its own file, so concurrent workers never update the same one.
+        """
+        key = self.GetKey(job)
+        attempt_dir = self._attempt_dir(key)
+        attempt_dir.mkdir(exist_ok=True)
+        self._write_marker(attempt_dir / f"{uuid.uuid4().hex}.json",
+                           {"Worker": self.WorkerId, "Ended": time.time(), "Proxy": proxy,
+                            "Latency": latency, "Seconds": seconds, "Error": error})
+        # An attempt just ended: renew now rather than wait for the next heartbeat
+        if key in self._held and self._still_mine(key):
+            os.utime(self._lease_path(key))
+
+    def Complete(self, job: VideoTranscriptJobDescriptor, duration: float | None = None):
+        key = self.GetKey(job)
+        self._write_marker(self._done_path(key),
+                           {"Worker": self.WorkerId, "Completed": time.time(), "Duration": duration,
+                            "OutputHash": hash_file(job.GetHTMLOutputFilePath())})
+        self.Release(job)
+
+    def _last_error(self, key: str) -> str | None:
+        attempts = []
+        for path in self._attempt_files(key):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    attempts.append(json.load(f))
+            except (IOError, json.JSONDecodeError):
+                pass
+        errors = sorted((a for a in attempts if a.get("Error")), key=lambda a: a.get("Ended", 0))
+        return errors[-1]["Error"] if errors else None
+
+    def Release(self, job: VideoTranscriptJobDescriptor, max_attempts: int | None = None):
+        """
+        Gives a held job back to the queue, or marks it failed once it used
+        `max_attempts` upload attempts.
+        """
+        key = self.GetKey(job)
+        with self._lock:
+            held = self._held.pop(key, None)
+        if held is None or not self._still_mine(key):
+            return
+        if max_attempts is not None and not self.IsDone(job):
+            attempts = len(self._attempt_files(key))
+            if attempts >= max_attempts:
+                self._write_marker(self._failed_path(key),
+                                   {"Worker": self.WorkerId, "Failed": time.time(), "Attempts": attempts,
+                                    "LastError": self._last_error(key)})
+                Logger.warning(f"Job {job} failed after {attempts} attempts")
+        self._lease_path(key).unlink(missing_ok=True)
@@ -1,4 +1,13 @@
+import asyncio
 import ipaddress
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
 import requests
 from requests.exceptions import RequestException
 from selenium import webdriver
@@ -7,9 +16,29 @@ from selenium.webdriver.common.by import By
 from swiftshadow.classes import ProxyInterface
 
 from Utility.FileUtil import ReadJson, WriteJson, IsModifiedRecently
-from WebScraper import PROXY_FILE
+from WebScraper import PROXY_FILE, PROXY_STATS_FILE
 from Utility.Logger import Logger
 
+SCORE_EWMA_ALPHA = 0.3
+SCORE_PRIOR_SUCCESS_RATE = 0.5
+SCORE_PRIOR_UPLOAD_SECONDS = 300
+SCORE_MIN_SUCCESS_RATE = 0.01
+SCORE_BAN_SECONDS = 60 * 60 * 6
+SCORE_MAX_AGE_SECONDS = 60 * 60 * 24 * 7
+SCORE_FLUSH_EVERY_UPDATES = 20
+SCORE_FLUSH_INTERVAL_SECONDS = 30
+SELECT_EPSILON = 0.1
+
+PROBE_URL = "http://httpbin.org/ip"
+PROBE_TIMEOUT_SECONDS = 5
+PROBE_CONCURRENCY = 200
+PROBE_PER_HOST = 4
+PROBE_DEADLINE_SECONDS = 60
+
+
+def proxy_key(proxy: dict) -> str:
+    return f"{proxy['ip']}:{proxy['port']}"
+
 
 def test_proxy(ip, port, test_url="https://httpbin.org/ip", use_https=False):
     proxy = f"{ip}:{port}"
@@ -100,7 +129,85 @@ def fetch_proxy_swiftshadow(find_https=True):
     return proxy_list
 
 
-def getProxyList(proxy_file=PROXY_FILE, MAX_AGE_SECONDS=1800):
+def _probe_request(probe_url: str) -> bytes:
+    """
+    What a client sends to an HTTP proxy: an absolute-form GET for http URLs, and
+    a CONNECT for https ones (the tunnel is what a browser needs; no TLS is done).
+    """
+    url = urlsplit(probe_url)
+    if url.scheme == "https":
+        authority = f"{url.hostname}:{url.port or 443}"
+        return f"CONNECT {authority} HTTP/1.1\r\nHost: {authority}\r\n\r\n".encode()
+    return (f"GET {probe_url} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+            f"Connection: close\r\nUser-Agent: Mozilla/5.0\r\n\r\n").encode()
+
+
+async def _probe_proxy(proxy: dict, request: bytes, timeout: float,
+                       slots: asyncio.Semaphore, host_slots: dict[str, asyncio.Semaphore]) -> float | None:
+    """
+    :return: seconds until the proxy answered with a 2xx status line, or None if it did not
+    """
+    host_slot = host_slots.setdefault(proxy["ip"], asyncio.Semaphore(PROBE_PER_HOST))
+    # Per-host slot first, so tasks queued behind a busy host do not hold global slots
+    async with host_slot, slots:
+        start = time.perf_counter()
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(proxy["ip"], int(proxy["port"])), timeout)
+            writer.write(request)
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), timeout - (time.perf_counter() - start))
+        except (OSError, asyncio.TimeoutError, ValueError):
+            return None
+        finally:
+            if writer:
+                writer.close()
+        parts = status_line.split()
+        if len(parts) >= 2 and parts[0].startswith(b"HTTP/") and parts[1].startswith(b"2"):
+            return time.perf_counter() - start
+        return None
+
+
+async def _probe_all(proxies: list[dict], probe_url: str, timeout: float, concurrency: int,
+                     deadline: float) -> list[tuple[float, dict]]:
+    request = _probe_request(probe_url)
+    slots = asyncio.Semaphore(concurrency)
+    host_slots: dict[str, asyncio.Semaphore] = {}
+    tasks = {asyncio.create_task(_probe_proxy(p, request, timeout, slots, host_slots)): p for p in proxies}
+    if not tasks:
+        return []
+
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        Logger.warning(f"Proxy probe deadline of {deadline}s reached, {len(pending)} proxies left unchecked")
+        await asyncio.wait(pending)
+
+    return [(task.result(), tasks[task]) for task in done if task.result() is not None]
+
+
+def probe_proxies(proxies: list[dict], probe_url: str = PROBE_URL,
+                  timeout: float = PROBE_TIMEOUT_SECONDS,
+                  concurrency: int = PROBE_CONCURRENCY,
+                  deadline: float = PROBE_DEADLINE_SECONDS) -> list[dict]:
+    """
+    Checks proxies concurrently on one asyncio loop, at most `concurrency` at a time
+    and PROBE_PER_HOST per IP address. Proxies not confirmed within `deadline`
+    seconds overall count as dead.
+
+    Returns:
+        list: The live proxies, fastest first, each with its probe "latency" in seconds.
+    """
+    Logger.info(f"Probing {len(proxies)} proxies against {probe_url}...")
+    results = asyncio.run(_probe_all(proxies, probe_url, timeout, concurrency, deadline))
+    results.sort(key=lambda item: item[0])
+    live = [{**proxy, "latency": round(latency, 3)} for latency, proxy in results]
+    Logger.info(f"{len(live)}/{len(proxies)} proxies are live")
+    return live
+
+
+def getProxyList(proxy_file=PROXY_FILE, MAX_AGE_SECONDS=1800, probe_url: str = PROBE_URL):
     if IsModifiedRecently(proxy_file, MAX_AGE_SECONDS):
         proxy_list = ReadJson(proxy_file)
         Logger.info(f"Loaded {len(proxy_list)} proxies from file '{proxy_file}'")
@@ -108,8 +215,185 @@ def getProxyList(proxy_file=PROXY_FILE, MAX_AGE_SECONDS=1800):
             return proxy_list
 
     Logger.info("Finding new proxies...")
-    proxy_list = fetch_proxies()
+    proxy_list = probe_proxies(fetch_proxies(), probe_url)
     WriteJson(proxy_file, proxy_list)
-    Logger.info(f"Downloaded {len(proxy_list)} proxies and saved to file '{proxy_file}'")
+    Logger.info(f"Saved {len(proxy_list)} live proxies to file '{proxy_file}'")
 
     return proxy_list
+
+
+class ProxyScores:
+    """
+    Persistent per-proxy statistics, kept apart from the proxy list so they survive
+    its refreshes. For every proxy it tracks an exponentially weighted moving
+    average (EWMA) of the page connect latency, of the duration of successful
+    uploads and of the success rate. Updates are buffered and written in batches.
+    """
+
+    def __init__(self, stats_file=PROXY_STATS_FILE, alpha: float = SCORE_EWMA_ALPHA):
+        self.StatsFile = Path(stats_file)
+        self.Alpha = alpha
+        self._lock = threading.Lock()
+        self._pending_updates = 0
+        self._last_flush = time.monotonic()
+        try:
+            self._stats: dict[str, dict] = ReadJson(self.StatsFile)
+        except (IOError, json.JSONDecodeError):
+            self._stats = {}
+
+    def _ewma(self, old: float | None, value: float) -> float:
+        return value if old is None else old + self.Alpha * (value - old)
+
+    def Get(self, proxy_str: str) -> dict:
+        with self._lock:
+            return dict(self._stats.get(proxy_str, {}))
+
+    def Record(self, proxy_str: str, success: bool, latency: float | None = None,
+               duration: float | None = None) -> dict:
+        """
+        Folds one attempt into the proxy's averages. Durations only count for
+        successes: a dead proxy fails fast, which must not make it look quick.
+        :return: the updated entry
+        """
+        with self._lock:
+            entry = self._stats.setdefault(proxy_str, {"Attempts": 0, "ConsecutiveFailures": 0})
+            entry["Attempts"] += 1
+            entry["SuccessRate"] = self._ewma(entry.get("SuccessRate"), 1.0 if success else 0.0)
+            entry["ConsecutiveFailures"] = 0 if success else entry["ConsecutiveFailures"] + 1
+            if latency is not None:
+                entry["Latency"] = self._ewma(entry.get("Latency"), latency)
+            if success and duration is not None:
+                entry["Duration"] = self._ewma(entry.get("Duration"), duration)
+            entry["LastUsed"] = time.time()
+            self._pending_updates += 1
+            return dict(entry)
+
+    def Score(self, proxy_str: str, probe_latency: float = 0.0) -> float:
+        """
+        Expected successful uploads per second (higher is better). Proxies without
+        history get a neutral prior so they are tried before known-bad ones, ranked
+        by `probe_latency` when nothing better is known.
+        """
+        with self._lock:
+            entry = self._stats.get(proxy_str, {})
+        success_rate = entry.get("SuccessRate", SCORE_PRIOR_SUCCESS_RATE)
+        seconds = entry.get("Duration", SCORE_PRIOR_UPLOAD_SECONDS + entry.get("Latency", probe_latency))
+        return max(success_rate, SCORE_MIN_SUCCESS_RATE) / max(seconds, 1.0)
+
+    def IsBanned(self, proxy_str: str, max_failures: int) -> bool:
+        """
+        True if the proxy failed `max_failures` times in a row recently.
+        """
+        entry = self.Get(proxy_str)
+        return (entry.get("ConsecutiveFailures", 0) >= max_failures
+                and time.time() - entry.get("LastUsed", 0) < SCORE_BAN_SECONDS)
+
+    def ShouldFlush(self) -> bool:
+        with self._lock:
+            return self._pending_updates >= SCORE_FLUSH_EVERY_UPDATES or (
+                self._pending_updates and time.monotonic() - self._last_flush >= SCORE_FLUSH_INTERVAL_SECONDS)
+
+    def Flush(self):
+        """
+        Writes the stats (atomically), dropping proxies unused for SCORE_MAX_AGE_SECONDS.
+        """
+        with self._lock:
+            if not self._pending_updates:
+                return
+            oldest_allowed = time.time() - SCORE_MAX_AGE_SECONDS
+            self._stats = {k: e for k, e in self._stats.items() if e.get("LastUsed", 0) >= oldest_allowed}
+            snapshot = dict(self._stats)
+            self._pending_updates = 0
+            self._last_flush = time.monotonic()
+
+        tmp_file = self.StatsFile.with_suffix(f".{os.getpid()}.tmp")
+        WriteJson(tmp_file, snapshot)
+        os.replace(tmp_file, self.StatsFile)
+
+
+class ProxyPool:
+    """
+    Thread-safe proxy list shared by concurrent upload jobs.
+    Proxies that cannot reach the page are dropped at once; proxies that fail
+    `max_failures` times in a row with a generic error are dropped as well, and
+    are skipped when a refreshed list brings them back for a while.
+    Select() prefers the proxies with the best score (see ProxyScores) and picks
+    a random one with probability `epsilon`, so new or recovering proxies still
+    get tried. Removals and stats are persisted in batches; call Flush() at the end.
+    """
+
+    def __init__(self, proxy_list: list[dict], proxy_file=PROXY_FILE, max_failures: int = 3,
+                 scores: ProxyScores | None = None, epsilon: float = SELECT_EPSILON):
+        self.ProxyFile = proxy_file
+        self.MaxFailures = max_failures
+        self.Scores = scores or ProxyScores()
+        self.Epsilon = epsilon
+        self._proxies = [p for p in proxy_list if not self.Scores.IsBanned(proxy_key(p), max_failures)]
+        if len(self._proxies) < len(proxy_list):
+            Logger.info(f"Skipping {len(proxy_list) - len(self._proxies)} proxies that failed recently")
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self._list_dirty = False
+
+    def __len__(self):
+        with self._lock:
+            return len(self._proxies)
+
+    def Snapshot(self) -> list[dict]:
+        with self._lock:
+            return list(self._proxies)
+
+    def Select(self, exclude: set[str] = frozenset()) -> dict | None:
+        """
+        Epsilon-greedy choice among the proxies whose "ip:port" is not in `exclude`.
+        """
+        candidates = [p for p in self.Snapshot() if proxy_key(p) not in exclude]
+        if not candidates:
+            return None
+        with self._lock:
+            explore = self._random.random() < self.Epsilon
+            if explore:
+                return self._random.choice(candidates)
+        return max(candidates, key=lambda p: self.Scores.Score(proxy_key(p), p.get("latency", 0.0)))
+
+    def Refresh(self, proxy_list: list[dict]):
+        """
+        Replaces the proxies with a newly fetched list, skipping recently banned ones.
+        """
+        proxies = [p for p in proxy_list if not self.Scores.IsBanned(proxy_key(p), self.MaxFailures)]
+        with self._lock:
+            self._proxies = proxies
+            self._list_dirty = False
+        Logger.info(f"Proxy pool refreshed with {len(proxies)} proxies")
+
+    def Remove(self, proxy: dict):
+        with self._lock:
+            if proxy in self._proxies:
+                self._proxies.remove(proxy)
+                self._list_dirty = True
+
+    def RecordResult(self, proxy: dict, success: bool, latency: float | None = None,
+                     duration: float | None = None) -> bool:
+        """
+        Scores one attempt. Returns True if the proxy got removed after
+        `max_failures` consecutive failures.
+        """
+        entry = self.Scores.Record(proxy_key(proxy), success, latency, duration)
+        removed = not success and entry["ConsecutiveFailures"] >= self.MaxFailures
+        if removed:
+            self.Remove(proxy)
+            Logger.warning(f"Removed proxy {proxy_key(proxy)} after {self.MaxFailures} failures")
+        if self.Scores.ShouldFlush():
+            self.Flush()
+        return removed
+
+    def Flush(self):
+        """
+        Persists pending removals to `proxy_file` and pending stats to the score store.
+        """
+        with self._lock:
+            proxies = list(self._proxies) if self._list_dirty else None
+            self._list_dirty = False
+        if proxies is not None:
+            WriteJson(self.ProxyFile, proxies)
+        self.Scores.Flush()
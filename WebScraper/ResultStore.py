@@ -0,0 +1,108 @@
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from Utility.Logger import Logger
+from WebScraper import RESULT_STORE_DIR
+from WebScraper.VideoTranscriptJobDescriptor import VideoTranscriptJobDescriptor
+
+HASH_BLOCK_SIZE = 1024 * 1024
+DEFAULT_MAX_STORE_BYTES = 512 * 1024 * 1024
+
+
+def hash_file(path: Path | str, block_size: int = HASH_BLOCK_SIZE) -> str:
+    """
+    SHA-256 of a file, read in fixed-size blocks so memory stays constant.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultStore:
+    """
+    Content-addressed store of transcription results.
+
+    Each uploaded chunk is identified by the SHA-256 of its bytes plus the job
+    language, so a recording received under another name, or re-split with the
+    same settings, reuses the HTML already produced instead of being uploaded
+    again. Results are kept as one HTML blob per key, named after the key, with
+    no shared index: several processes (or hosts) can use the same store, since
+    every write is an atomic rename. A blob's mtime records its last use, and the
+    least recently used blobs are evicted once the store exceeds `max_bytes`.
+    """
+
+    def __init__(self, store_dir: Path = RESULT_STORE_DIR, max_bytes: int = DEFAULT_MAX_STORE_BYTES):
+        self.StoreDir = Path(store_dir)
+        self.MaxBytes = max_bytes
+        self.StoreDir.mkdir(parents=True, exist_ok=True)
+        # Index of earlier versions; blobs are found by name now
+        (self.StoreDir / "index.json").unlink(missing_ok=True)
+
+    @staticmethod
+    def GetKey(job: VideoTranscriptJobDescriptor) -> str:
+        if job.ContentHash is None:
+            job.ContentHash = hash_file(job.VideoPath)
+        return f"{job.ContentHash}_{job.Language.lower()}"
+
+    def _blob_path(self, key: str) -> Path:
+        return self.StoreDir / f"{key}.html"
+
+    @staticmethod
+    def _copy_atomic(src: Path, dst: Path):
+        tmp_file = dst.with_name(f"{dst.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            shutil.copyfile(src, tmp_file)
+            os.replace(tmp_file, dst)
+        finally:
+            tmp_file.unlink(missing_ok=True)
+
+    def _evict(self):
+        blobs = []
+        for entry in os.scandir(self.StoreDir):
+            if entry.name.endswith(".html"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another process
+                blobs.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in blobs)
+        for _, size, path in sorted(blobs):
+            if total <= self.MaxBytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total -= size
+            Logger.debug(f"Evicted stored result {Path(path).stem}")
+
+    def Restore(self, job: VideoTranscriptJobDescriptor) -> bool:
+        """
+        Copies a stored result for the job's content to its HTML output path.
+        Returns True if the job could be completed from the store.
+        """
+        blob = self._blob_path(self.GetKey(job))
+        html_file = job.GetHTMLOutputFilePath()
+        html_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._copy_atomic(blob, html_file)
+            os.utime(blob)
+        except FileNotFoundError:
+            return False
+
+        Logger.info(f"Reused stored transcript for {job}")
+        job.IsCompleted = True
+        return True
+
+    def Store(self, job: VideoTranscriptJobDescriptor):
+        """
+        Adds the HTML produced for a completed job to the store.
+        """
+        html_file = job.GetHTMLOutputFilePath()
+        if not html_file.is_file():
+            return
+        self._copy_atomic(html_file, self._blob_path(self.GetKey(job)))
+        self._evict()
@@ -4,17 +4,23 @@ import threading
 from pathlib import Path
 
 from DataProcessing import VIDEO_EXTENSIONS, AUDIO_EXTENSIONS
+from DataProcessing.SpeechActivity import is_silent_chunk
 from Utility.FileUtil import ReadJson, WriteJson
+from Utility.Logger import Logger
 
 
 class VideoTranscriptJobDescriptor:
 
     def __init__(self, videoProjectFolder: Path | str, videoPath: Path | str, outFolder: Path | str, metadata: dict):
-        self.Lock = threading.Lock()
+        # Set once an attempt succeeds, so hedged duplicate attempts stop early
+        self.Cancel = threading.Event()
         self.IsCompleted = False
         self.VideoPath = Path(videoPath)
         self.VideoProjectFolder = Path(videoProjectFolder)
         self.Language = metadata.get("Language", "english")
+        self.ContentHash: str | None = None
+        # Stable identity of the job across runs and processes (see JobLedger)
+        self.JobId = str(self.VideoPath.resolve())
 
         # File di output .txt con lo stesso nome del video
         self.OutputFolder = Path(outFolder)
@@ -27,36 +33,50 @@ class VideoTranscriptJobDescriptor:
         return self.OutputFolder / self.VideoProjectFolder / f"{self.VideoPath.stem}.html"
 
 
+def GenerateJobsFromProject(project_folder: Path | str, out_folder_html: Path | str) -> list[VideoTranscriptJobDescriptor]:
+    project_folder = Path(project_folder)
+    video_files = sorted(f.name for f in project_folder.iterdir()
+                         if f.is_file() and f.name.lower().endswith(VIDEO_EXTENSIONS+AUDIO_EXTENSIONS))
+    if not video_files:
+        return []
+
+    metadata_file = project_folder / "metadata.json"
+    try:
+        metadata = ReadJson(metadata_file)
+    except (json.JSONDecodeError, IOError):
+        metadata = {"Language": "english"}
+        if not metadata_file.exists():
+            WriteJson(metadata_file, metadata)
+
+    # Chunks in which voice activity detection found no speech have nothing to transcribe
+    silent = [file for file in video_files if is_silent_chunk(metadata, file)]
+    if silent:
+        # Logged per chunk: a chunk wrongly taken for silence loses its part of the transcript
+        Logger.warning(f"Skipping {len(silent)} chunks of '{project_folder.name}' without detected speech:")
+        for file in silent:
+            Logger.warning(f"  - {file}")
+        video_files = [file for file in video_files if file not in silent]
+
+    return [
+        VideoTranscriptJobDescriptor(
+            project_folder.name,
+            project_folder / file,
+            out_folder_html,
+            metadata,
+        )
+        for file in video_files
+    ]
+
+
 def GenerateJobsFromVideo(video_folder: Path | str, out_folder_html: Path | str) -> list[VideoTranscriptJobDescriptor]:
     jobs = []
     video_folder = Path(video_folder)
 
     # Loop ricorsivo su tutte le sottocartelle
-    for root, _, files in os.walk(video_folder):
+    for root, _, _ in os.walk(video_folder):
         root_path = Path(root)
         if root_path.name.lower() == video_folder.name.lower():
             continue
-        video_files = [f for f in files if f.lower().endswith(VIDEO_EXTENSIONS+AUDIO_EXTENSIONS)]
-        metadata_file = root_path / "metadata.json"
-
-        if video_files:
-            try:
-                metadata = ReadJson(metadata_file)
-            except (json.JSONDecodeError, IOError):
-                metadata = {"Language": "english"}
-                if not metadata_file.exists():
-                    WriteJson(metadata_file, metadata)
-
-            jobs.extend(
-                [
-                    VideoTranscriptJobDescriptor(
-                        root_path.name,
-                        root_path / file,
-                        out_folder_html,
-                        metadata,
-                    )
-                    for file in video_files
-                ]
-            )
+        jobs.extend(GenerateJobsFromProject(root_path, out_folder_html))
 
     return jobs
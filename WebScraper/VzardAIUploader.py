@@ -1,128 +1,216 @@
 ﻿import os
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from selenium.common import TimeoutException
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 from seleniumbase import Driver
 from selenium.webdriver.common.by import By
 
 from DataProcessing import HTML_OUTPUT_FOLDER, SPLITTED_VIDEO_FOLDER
+from WebScraper.DriverPool import DriverPool
+from WebScraper.JobLedger import DEFAULT_MAX_ATTEMPTS, JobLedger, JobState
+from WebScraper.LeaseQueue import LeaseQueue, LEASE_TTL_SECONDS, LEASE_HEARTBEAT_SECONDS
 from WebScraper.ProxyUtil import *
+from WebScraper.ResultStore import ResultStore
 from WebScraper.VideoTranscriptJobDescriptor import *
-from WebScraper.WebScrapingUtility import find_element_if_present, click_element_if_clickable, JobStatus, PageUnreachable
+from WebScraper.WebScrapingUtility import find_element_if_present, click_element_if_clickable, JobStatus, \
+    PageUnreachable, JobCancelled, harvest_inner_html
 from Utility.Logger import Logger
 
 # --- Settings ---
 UPLOAD_URL = "https://vizard.ai/upload?from=video-to-text&tool-page=%2Fen%2Ftools%2Fvideo-to-text"
 WAIT_TIME_AFTER_UPLOAD = 60 * 10
+PROXY_PROBE_URL = "https://vizard.ai/"
+HARVEST_TIMEOUT_SECONDS = 120
+PAGE_STATE_TIMEOUT_SECONDS = 60 * 3
+PAGE_STATE_POLL_SECONDS = 0.25
+CLAIM_BATCH_PER_WORKER = 4
+CLAIM_POLL_SECONDS = 10
+DEFAULT_MAX_HEDGES = 2
+
+
+class PageState(Enum):
+    Transcript = "transcript"
+    Language = "language"
+    Continue = "continue"
+    Cloudflare = "cloudflare"
+    Retry = "retry"
+    Unknown = "unknown"
+
+
+# Runs in the page: one pass over the text nodes finds every known state, and the
+# first one in priority order is returned with its element.
+_PAGE_STATE_SCRIPT = """
+const language = arguments[0];
+const transcript = document.getElementById('transcript_button');
+if (transcript) return ['transcript', transcript];
+const found = {};
+const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+    const text = node.nodeValue.replace(/\\s+/g, ' ').trim().toLowerCase();
+    if (!text) continue;
+    let state = null;
+    if (text === language) state = 'language';
+    else if (text === 'continue') state = 'continue';
+    else if (text === 'retry') state = 'retry';
+    else if (text.includes('checking if the site connection is secure')) state = 'cloudflare';
+    if (state && !(state in found)) found[state] = node.parentElement;
+}
+for (const state of ['language', 'cloudflare', 'retry', 'continue']) {
+    if (found[state]) return [state, found[state]];
+}
+return null;
+"""
+
+
+def detect_page_state(driver, language: str, states=None, timeout: float = PAGE_STATE_TIMEOUT_SECONDS,
+                      cancel: threading.Event | None = None):
+    """
+    Waits for whichever known page state shows up first, polling one combined
+    in-page probe every PAGE_STATE_POLL_SECONDS.
+    :param states: only accept these states (default: any)
+    :param cancel: raises JobCancelled at the next poll once set
+    :return: (PageState, its element), or (PageState.Unknown, None) on timeout
+    """
+    def probe(d):
+        if cancel is not None and cancel.is_set():
+            raise JobCancelled
+        found = d.execute_script(_PAGE_STATE_SCRIPT, language.lower())
+        if found and (states is None or PageState(found[0]) in states):
+            return PageState(found[0]), found[1]
+        return False
 
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=PAGE_STATE_POLL_SECONDS).until(probe)
+    except TimeoutException:
+        return PageState.Unknown, None
 
-def MainUploadLoop(driver, language='english', max_retries=3, threadName="Noname"):
-    retry_count = 0
-    while retry_count < max_retries:
-        Logger.info(f"{threadName}: Checking page state (Attempt {retry_count + 1}/{max_retries})...")
 
-        transcript_button = find_element_if_present(driver, By.ID, "transcript_button", 60*3)
-        language_xpath = f"//*[translate(normalize-space(text()), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz') = '{language.lower()}']"
-        language_button = find_element_if_present(driver, By.XPATH, language_xpath, timeout=5)
+def _wait_until_gone(driver, element, timeout: float):
+    """
+    Returns as soon as a clicked element is hidden or detached, so the next state
+    check does not see it again.
+    """
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=PAGE_STATE_POLL_SECONDS).until(
+            EC.invisibility_of_element(element))
+    except TimeoutException:
+        pass
 
-        cloudflare_xpath = "//*[contains(translate(normalize-space(text()), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'checking if the site connection is secure')]"
-        cloudflare_banner = find_element_if_present(driver, By.XPATH, cloudflare_xpath, timeout=5)
 
-        retry_xpath = "//*[translate(normalize-space(text()), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz') = 'retry']"
-        retry_button = find_element_if_present(driver, By.XPATH, retry_xpath, timeout=5)
+def MainUploadLoop(driver, language='english', max_retries=3, threadName="Noname",
+                   cancel: threading.Event | None = None):
+    """
+    Drives the page from the upload to the transcript. Once `cancel` is set, raises
+    JobCancelled at the next state check.
+    """
+    retry_count = 0
+    while retry_count < max_retries:
+        if cancel is not None and cancel.is_set():
+            raise JobCancelled
+        Logger.info(f"{threadName}: Checking page state (Attempt {retry_count + 1}/{max_retries})...")
+        state, element = detect_page_state(driver, language, cancel=cancel)
 
-        if transcript_button:
+        if state == PageState.Transcript:
             Logger.info(f"{threadName}: Found transcript button.")
-            if click_element_if_clickable(driver, transcript_button, timeout=30):
+            if click_element_if_clickable(driver, element, timeout=30, threadName=threadName):
                 Logger.info(f"{threadName}: Transcript button clicked successfully.")
                 break
-            else:
-                Logger.warning(f"{threadName}: Transcript button found but could not be clicked.")
-                retry_count += 1
-                time.sleep(5)
-                continue
+            Logger.warning(f"{threadName}: Transcript button found but could not be clicked.")
+            retry_count += 1
 
-        elif language_button:
+        elif state == PageState.Language:
             Logger.info(f"{threadName}: Found language button '{language}'.")
-            if click_element_if_clickable(driver, language_button, timeout=15):
-                Logger.info(f"{threadName}: Language button clicked.")
-                continue_xpath = "//*[translate(normalize-space(text()), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz') = 'continue']"
-                continue_button = find_element_if_present(driver, By.XPATH, continue_xpath, timeout=5)
-                if click_element_if_clickable(driver, continue_button, timeout=5):
-                    Logger.info(f"{threadName}: 'Continue' button clicked.")
-                    time.sleep(2)
-                    continue
-                else:
-                    Logger.warning(f"{threadName}: 'Continue' button not found or not clickable after selecting language.")
-                    retry_count += 1
-                    time.sleep(5)
-                    continue
-            else:
+            if not click_element_if_clickable(driver, element, timeout=15, threadName=threadName):
                 Logger.warning(f"{threadName}: Could not click the language button.")
                 retry_count += 1
-                time.sleep(5)
                 continue
+            Logger.info(f"{threadName}: Language button clicked.")
+            _, continue_button = detect_page_state(driver, language, states={PageState.Continue}, timeout=5,
+                                                   cancel=cancel)
+            if click_element_if_clickable(driver, continue_button, timeout=5, threadName=threadName):
+                Logger.info(f"{threadName}: 'Continue' button clicked.")
+                _wait_until_gone(driver, continue_button, 10)
+            else:
+                Logger.warning(f"{threadName}: 'Continue' button not found or not clickable after selecting language.")
+                retry_count += 1
+
+        elif state == PageState.Continue:
+            if click_element_if_clickable(driver, element, timeout=5, threadName=threadName):
+                Logger.info(f"{threadName}: 'Continue' button clicked.")
+                _wait_until_gone(driver, element, 10)
+            else:
+                retry_count += 1
 
-        elif cloudflare_banner:
+        elif state == PageState.Cloudflare:
             Logger.warning(f"{threadName}: Cloudflare/Bot detection banner detected. Aborting.")
             return
 
-        elif retry_button:
+        elif state == PageState.Retry:
             Logger.info(f"{threadName}: Found 'retry' button.")
-            if click_element_if_clickable(driver, retry_button, timeout=10):
-                retry_count += 1
+            retry_count += 1
+            if click_element_if_clickable(driver, element, timeout=10, threadName=threadName):
                 Logger.info(f"{threadName}: Clicked 'retry' button ({retry_count}/{max_retries}).")
-                time.sleep(10)
-                continue
+                _wait_until_gone(driver, element, 10)
             else:
                 Logger.warning(f"{threadName}: Could not click the 'retry' button.")
-                retry_count += 1
-                time.sleep(5)
-                continue
 
         else:
-            Logger.warning(f"{threadName}: No known state element found. Waiting and retrying...")
+            Logger.warning(f"{threadName}: No known state element found within "
+                           f"{PAGE_STATE_TIMEOUT_SECONDS}s. Retrying...")
             retry_count += 1
-            time.sleep(15)
 
     if retry_count >= max_retries:
         Logger.error(f"{threadName}: Maximum number of retries ({max_retries}) reached. Could not proceed.")
 
 
-def upload_video(job: VideoTranscriptJobDescriptor, proxy: dict[str] = None, headless_Mode=False):
-    job.Lock.acquire()
-    if job.IsCompleted:
-        job.Lock.release()
-        return
-    else:
-        job.Lock.release()
+def _check_cancelled(job: VideoTranscriptJobDescriptor):
+    if job.IsCompleted or job.Cancel.is_set():
+        raise JobCancelled
+
+
+def upload_video(job: VideoTranscriptJobDescriptor, proxy: dict[str] = None, headless_Mode=False,
+                 driver_pool: DriverPool | None = None, metrics: dict | None = None):
+    """
+    Uploads one chunk and saves the transcript HTML. With a `driver_pool` the browser
+    is leased from it (and returned to it) instead of being started and quit here.
+    `metrics` receives the "Latency" until the upload page was usable, in seconds.
+    Concurrent attempts on the same job (hedges) race each other; each one stops at its
+    next check once the job's Cancel event is set, and only the first one saves its HTML.
+    """
+    start = time.perf_counter()
+    _check_cancelled(job)
 
     threadName = threading.get_ident()
-    ConditionSettedByMe = False
     driver = None
+    session = None
+    failed = False
     try:
-        driver = Driver(uc=True, headless=headless_Mode,
-                        proxy=f"{proxy['ip']}:{proxy['port']}" if proxy else None)
+        if driver_pool:
+            session = driver_pool.Acquire(proxy)
+            driver = session.Driver
+        else:
+            driver = Driver(uc=True, headless=headless_Mode,
+                            proxy=f"{proxy['ip']}:{proxy['port']}" if proxy else None)
 
         try:
-            driver.uc_open_with_reconnect(UPLOAD_URL, 6)
-            time.sleep(2)
-            file_input = driver.find_element(By.ID, "file-input")
+            # A warm session was already reset to the upload page by its previous job
+            file_input = find_element_if_present(driver, By.ID, "file-input", 5) if session and session.IsWarm else None
+            if not file_input:
+                driver.uc_open_with_reconnect(UPLOAD_URL, 6)
+                time.sleep(2)
+                file_input = driver.find_element(By.ID, "file-input")
         except Exception:
             raise PageUnreachable
+        if metrics is not None:
+            metrics["Latency"] = time.perf_counter() - start
 
+        _check_cancelled(job)
         file_input.send_keys(str(job.VideoPath))
-
-        if job.Lock.locked():
-            Logger.info(f"{threadName}: Waiting on lock acquisition")
-
-        job.Lock.acquire()
-        ConditionSettedByMe = True
-        if job.IsCompleted:
-            return
-        Logger.info(f"{threadName}: Waiting that the upload finishes...blocking other instances")
+        Logger.info(f"{threadName}: Waiting that the upload finishes...")
 
         upload_button = WebDriverWait(driver, 30).until(
             EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'win-confirm-button') and contains(text(), 'Upload')]"))
@@ -130,109 +218,368 @@ def upload_video(job: VideoTranscriptJobDescriptor, proxy: dict[str] = None, hea
         upload_button.click()
         driver.uc_gui_click_captcha()
 
-        MainUploadLoop(driver, job.Language, 3, threadName=str(threadName))
+        MainUploadLoop(driver, job.Language, 3, threadName=str(threadName), cancel=job.Cancel)
 
+        _check_cancelled(job)
         text_area = driver.find_element(By.ID, "textArea")
-        paragraph_count = 0
-        while True:
-            try:
-                paragraph = text_area.find_element(By.ID, f"paragraph_{paragraph_count}")
-                driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", paragraph)
-                time.sleep(0.5)
-                Logger.info(f"{threadName}: Scrolled to paragraph_{paragraph_count}")
-                paragraph_count += 1
-            except Exception:
-                Logger.info(f"{threadName}: No more paragraphs found after paragraph_{paragraph_count-1}. Finished scrolling.")
-                break
-
-        Logger.info(f"{threadName}: Scrolling complete.")
-
-        text_area_HTML = text_area.get_attribute("innerHTML")
+        text_area_HTML = harvest_inner_html(driver, text_area, "[id^='paragraph_']", HARVEST_TIMEOUT_SECONDS,
+                                            threadName=threadName, cancel=job.Cancel)
+        _check_cancelled(job)
         html_filename = job.GetHTMLOutputFilePath()
         os.makedirs(os.path.dirname(html_filename), exist_ok=True)
-        with open(html_filename, "w", encoding="utf-8") as f:
+        # Written aside and renamed, so readers of a shared tree never see a partial file
+        tmp_filename = f"{html_filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as f:
             f.write(text_area_HTML)
+        os.replace(tmp_filename, html_filename)
         Logger.info(f"{threadName}: Saved HTML to {html_filename}\n")
         job.IsCompleted = True
+        job.Cancel.set()
 
-    except Exception:
+    except JobCancelled:
+        raise
+    except BaseException:
+        failed = True
         raise
     finally:
-        if driver:
+        if session:
+            driver_pool.Release(session, failed)
+        elif driver:
             driver.quit()
-        if ConditionSettedByMe:
-            job.Lock.release()
-            Logger.info(f"{threadName}: lock released for job {job}")
 
 
-def try_upload(jobDesc: VideoTranscriptJobDescriptor, proxy: dict[str], headless_mode=False) -> JobStatus:
+def try_upload(jobDesc: VideoTranscriptJobDescriptor, proxy: dict[str], headless_mode=False,
+               driver_pool: DriverPool | None = None, metrics: dict | None = None) -> JobStatus:
+    """
+    :param metrics: receives the attempt's "Latency" (see upload_video) and, on success, its "Duration"
+    """
+    start = time.perf_counter()
     try:
-        upload_video(jobDesc, proxy, headless_mode)
+        upload_video(jobDesc, proxy, headless_mode, driver_pool, metrics)
+        if metrics is not None:
+            metrics["Duration"] = time.perf_counter() - start
         return JobStatus.Success
     except PageUnreachable:
         return JobStatus.PageConnectionError
+    except JobCancelled:
+        return JobStatus.Cancelled
     except Exception as e:
         Logger.error(f"try_upload Exception: {e}")
         return JobStatus.GenericError
 
 
+class UploadScheduler:
+    """
+    Runs many transcription jobs on `workers` browser slots at once.
+
+    Every slot runs one attempt: a distinct job paired with a proxy that no other
+    slot is using. Pending jobs get a slot before any job gets a second one; once
+    jobs run out, idle slots hedge the jobs still in flight, up to `max_hedges`
+    concurrent attempts per job. The first attempt to succeed cancels the others.
+    Proxies are dropped from the pool on connection errors and counted on generic
+    errors, as in try_upload.
+    """
+
+    def __init__(self, jobs: list[VideoTranscriptJobDescriptor], proxy_pool: ProxyPool,
+                 headless_Mode=False, workers: int = 8, max_hedges: int = DEFAULT_MAX_HEDGES,
+                 result_store: ResultStore | None = None, max_rounds: int | None = None,
+                 driver_pool: DriverPool | None = None, ledger: JobLedger | LeaseQueue | None = None,
+                 max_attempts: int | None = None, upload_fn=try_upload):
+        """
+        :param max_rounds: how many times each job may go through every proxy of the pool
+                           (default: until the pool is empty)
+        :param driver_pool: browsers are leased from it instead of started for every attempt
+        :param ledger: records every attempt and completion of the jobs, which must be claimed from it
+                       (a JobLedger, or a LeaseQueue shared with other hosts)
+        :param max_attempts: unfinished jobs that used this many attempts in total are marked
+                             failed in the ledger instead of given back (default: never);
+                             a run also stops trying a job after this many attempts of its own
+        :param upload_fn: runs one attempt, with try_upload's signature and JobStatus result
+        """
+        self.ProxyPool = proxy_pool
+        self.HeadlessMode = headless_Mode
+        self.Workers = max(1, workers)
+        self.MaxHedges = max(1, max_hedges)
+        self.ResultStore = result_store
+        self.MaxRounds = max_rounds
+        self.DriverPool = driver_pool
+        self.Ledger = ledger
+        self.MaxAttempts = max_attempts
+        self.UploadFn = upload_fn
+        self._jobs = list(jobs)
+        self._pending = list(jobs)
+        self._attempts: dict[VideoTranscriptJobDescriptor, int] = {job: 0 for job in jobs}
+        self._tried: dict[VideoTranscriptJobDescriptor, set[str]] = {job: set() for job in jobs}
+        self._rounds: dict[VideoTranscriptJobDescriptor, int] = {job: 0 for job in jobs}
+        self._started: dict[VideoTranscriptJobDescriptor, int] = {job: 0 for job in jobs}
+        self._busy_proxies: set[str] = set()
+
+    def _next_attempt(self) -> tuple[VideoTranscriptJobDescriptor, dict] | None:
+        """
+        Picks the job with the fewest attempts in flight and, among the idle proxies it
+        has not tried yet, the one chosen by the pool's scoring.
+        """
+        for job in sorted(self._pending, key=lambda j: self._attempts[j]):
+            if self._attempts[job] >= self.MaxHedges:
+                break
+            if self._out_of_attempts(job):
+                continue
+            proxy = self.ProxyPool.Select(exclude=self._busy_proxies | self._tried[job])
+            if proxy:
+                return job, proxy
+        return None
+
+    def _out_of_attempts(self, job: VideoTranscriptJobDescriptor) -> bool:
+        return self.MaxAttempts is not None and self._started[job] >= self.MaxAttempts
+
+    def _start_new_round(self) -> bool:
+        """
+        Called when nothing is in flight and no attempt can start: every pending job has
+        tried every proxy left. Lets them go through the pool again, within max_rounds.
+        """
+        restarted = False
+        for job in list(self._pending):
+            self._rounds[job] += 1
+            if self._out_of_attempts(job) or (self.MaxRounds is not None and self._rounds[job] >= self.MaxRounds):
+                Logger.error(f"Upload failed for job {job}")
+                self._pending.remove(job)
+                continue
+            self._tried[job].clear()
+            restarted = True
+        return restarted
+
+    def _finish(self, job: VideoTranscriptJobDescriptor, proxy: dict, status: JobStatus, metrics: dict):
+        proxy_str = proxy_key(proxy)
+        self._attempts[job] -= 1
+        self._busy_proxies.discard(proxy_str)
+        if self.Ledger:
+            self.Ledger.RecordAttempt(job, proxy_str, metrics.get("Latency"), metrics["Seconds"],
+                                      None if status in (JobStatus.Success, JobStatus.Cancelled) else status.name)
+
+        if status == JobStatus.Success and job in self._pending:
+            Logger.info(f"Job {job} completed successfully with proxy {proxy_str}")
+            job.IsCompleted = True
+            job.Cancel.set()
+            self._pending.remove(job)
+            if self.ResultStore:
+                self.ResultStore.Store(job)
+            if self.Ledger:
+                self.Ledger.Complete(job, metrics.get("Duration"))
+        elif status == JobStatus.Cancelled and job in self._pending and not job.IsCompleted:
+            # Cancelled from outside (e.g. its lease was lost): no more attempts
+            Logger.warning(f"Job {job} was cancelled")
+            self._pending.remove(job)
+
+        if status == JobStatus.Success:
+            self.ProxyPool.RecordResult(proxy, True, metrics.get("Latency"), metrics.get("Duration"))
+        elif status == JobStatus.PageConnectionError:
+            self.ProxyPool.RecordResult(proxy, False)
+            self.ProxyPool.Remove(proxy)
+        elif status == JobStatus.GenericError:
+            self.ProxyPool.RecordResult(proxy, False, metrics.get("Latency"))
+
+    def _schedule(self, executor: ThreadPoolExecutor):
+        in_flight = {}
+        while self._pending or in_flight:
+            while len(in_flight) < self.Workers:
+                attempt = self._next_attempt()
+                if attempt is None:
+                    break
+                job, proxy = attempt
+                proxy_str = proxy_key(proxy)
+                self._attempts[job] += 1
+                self._started[job] += 1
+                self._tried[job].add(proxy_str)
+                self._busy_proxies.add(proxy_str)
+                Logger.info(f"Starting attempt {self._attempts[job]} for job {job} with proxy {proxy_str}")
+                metrics = {"Started": time.perf_counter()}
+                future = executor.submit(self.UploadFn, job, proxy, self.HeadlessMode, self.DriverPool, metrics)
+                in_flight[future] = (job, proxy, metrics)
+
+            if not in_flight:
+                if not len(self.ProxyPool):
+                    Logger.error("No working proxies left.")
+                    break
+                if not self._start_new_round():
+                    break
+                continue
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, proxy, metrics = in_flight.pop(future)
+                metrics["Seconds"] = time.perf_counter() - metrics["Started"]
+                self._finish(job, proxy, future.result(), metrics)
+
+    def Run(self) -> bool:
+        """
+        :return: true if every job completed successfully
+        """
+        Logger.info(f"Scheduling {len(self._pending)} transcription jobs on {self.Workers} slots "
+                    f"(up to {self.MaxHedges} attempts per job)")
+        try:
+            with ThreadPoolExecutor(max_workers=self.Workers) as executor:
+                try:
+                    self._schedule(executor)
+                except BaseException:
+                    # Stop the attempts in flight, or the executor would wait for them to finish
+                    for job in self._jobs:
+                        job.Cancel.set()
+                    raise
+        finally:
+            # Claims are given back even when interrupted, so a restart can take them at once
+            self.ProxyPool.Flush()
+            if self.Ledger:
+                for job in self._jobs:
+                    if not job.IsCompleted:
+                        self.Ledger.Release(job, self.MaxAttempts)
+
+        for job in self._pending:
+            Logger.error(f"Upload failed for job {job}")
+        return all(job.IsCompleted for job in self._jobs)
+
+
+def UploadJob(job: VideoTranscriptJobDescriptor, proxy_pool: ProxyPool,
+              headless_Mode=False, workers: int = 8, result_store: ResultStore | None = None,
+              driver_pool: DriverPool | None = None) -> bool:
+    """
+    Runs a single transcription job, trying every proxy of the pool once with up to
+    `workers` concurrent attempts.
+    The job is served from `result_store` when the same content was already transcribed,
+    and its result is added to the store on success.
+    :return: true if the job completed successfully
+    """
+    if result_store and result_store.Restore(job):
+        return True
+
+    Logger.info(f"Processing transcription job: {job}")
+    UploadScheduler([job], proxy_pool, headless_Mode, workers, max_hedges=workers,
+                    result_store=result_store, max_rounds=1, driver_pool=driver_pool).Run()
+    return job.IsCompleted
+
+
 def UploadVideoFolder(Input_folder=SPLITTED_VIDEO_FOLDER, output_folder=HTML_OUTPUT_FOLDER,
-                      headless_Mode=False, workers:int=8) -> bool:
+                      headless_Mode=False, workers:int=8, max_hedges: int = DEFAULT_MAX_HEDGES,
+                      tabs_per_driver: int = 1, ledger: JobLedger | None = None,
+                      max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> bool:
     """
+    Claims the folder's jobs from the job ledger in batches and uploads them.
+    Several processes can run it on the same folder at once.
     :param Input_folder:
     :param output_folder:
     :param headless_Mode:
-    :param workers:
-    :return: true if all jobs completed successfully
+    :param workers: browser slots shared by all jobs
+    :param max_hedges: concurrent attempts allowed on the same job
+    :param tabs_per_driver: concurrent jobs sharing one browser of the same proxy (see DriverPool)
+    :param ledger: defaults to the ledger at JOB_LEDGER_FILE
+    :param max_attempts: upload attempts after which an unfinished job is marked failed
+    :return: true once no job is pending or running; failed jobs are logged, not retried
     """
     MAX_AGE_SECONDS = 1800
     MAX_RETRIES = 3
-    proxy_failures = {}
 
-    proxy_list = getProxyList(PROXY_FILE, MAX_AGE_SECONDS)
-    video_jobs = GenerateJobsFromVideo(Input_folder, output_folder)
-    incomplete_jobs = [job for job in video_jobs if not os.path.isfile(job.GetHTMLOutputFilePath())]
+    ledger = ledger or JobLedger()
+    ledger.Sync(Input_folder, output_folder)
+    result_store = ResultStore()
+    proxy_pool = None
+
+    with DriverPool(headless_Mode, UPLOAD_URL, tabs_per_driver=tabs_per_driver, max_idle=workers) as driver_pool:
+        while True:
+            jobs = ledger.Claim(CLAIM_BATCH_PER_WORKER * workers, Input_folder)
+            if not jobs:
+                if ledger.Summary(Input_folder)[JobState.Running]:
+                    # Other processes still hold claims; theirs come back here if they give up
+                    time.sleep(CLAIM_POLL_SECONDS)
+                    continue
+                break
+
+            # Chunks whose content was already transcribed never reach the browser
+            restored = [job for job in jobs if result_store.Restore(job)]
+            for job in restored:
+                ledger.Complete(job)
+            jobs = [job for job in jobs if not job.IsCompleted]
+            if not jobs:
+                continue
 
-    if not incomplete_jobs:
+            if proxy_pool is None:
+                proxy_pool = ProxyPool(getProxyList(PROXY_FILE, MAX_AGE_SECONDS, PROXY_PROBE_URL),
+                                       PROXY_FILE, MAX_RETRIES)
+            UploadScheduler(jobs, proxy_pool, headless_Mode, workers, max_hedges, result_store,
+                            driver_pool=driver_pool, ledger=ledger, max_attempts=max_attempts).Run()
+            if not len(proxy_pool):
+                break
+
+    summary = ledger.Summary(Input_folder)
+    failed = ledger.FailedJobs(Input_folder)
+    if failed:
+        Logger.warning(f"{len(failed)} jobs failed:")
+        for job in failed:
+            Logger.warning(f"  - {job}")
+    if summary[JobState.Done] == sum(summary.values()):
         Logger.info("All transcription jobs completed successfully")
         return True
+    Logger.info(f"Transcription jobs: {summary[JobState.Done]} done, {summary[JobState.Pending]} pending, "
+                f"{summary[JobState.Running]} running, {summary[JobState.Failed]} failed")
+    # Failed jobs are final: only pending or running ones are worth another round
+    return not (summary[JobState.Pending] or summary[JobState.Running])
+
+
+def UploadWorker(input_folders: list[Path], output_folder: Path, queue_dir: Path,
+                 headless_Mode=False, workers: int = 8, max_hedges: int = DEFAULT_MAX_HEDGES,
+                 worker_id: str | None = None, lease_ttl_s: float = LEASE_TTL_SECONDS,
+                 heartbeat_s: float = LEASE_HEARTBEAT_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 proxy_pool: ProxyPool | None = None, result_store: ResultStore | None = None,
+                 upload_fn=try_upload) -> bool:
+    """
+    Upload worker for a tree shared by several hosts (see LeaseQueue). Workers on
+    every host claim chunk jobs from the same queue, upload them with their own
+    browsers and proxies, and write the HTML into the shared `output_folder`.
+    Jobs of a worker that stops heartbeating are reclaimed once their lease expires.
+    The tree is rescanned between batches, so chunks split meanwhile are picked up.
+    :param max_attempts: upload attempts, by all workers, after which a job is marked failed
+    :param proxy_pool: defaults to the fetched proxy list, loaded on the first upload
+    :param result_store: defaults to the store at RESULT_STORE_DIR
+    :param upload_fn: runs one attempt (see UploadScheduler)
+    :return: true once every job of the tree is done or failed, false if this worker ran out of proxies
+    """
+    MAX_AGE_SECONDS = 1800
+    MAX_RETRIES = 3
 
-    while proxy_list:
-        for job in incomplete_jobs:
-            if job.Lock.locked():
+    result_store = result_store or ResultStore()
+    with LeaseQueue(queue_dir, worker_id, lease_ttl_s, heartbeat_s) as queue, \
+            DriverPool(headless_Mode, UPLOAD_URL, max_idle=workers) as driver_pool:
+        Logger.info(f"Upload worker {queue.WorkerId} started on '{queue_dir}'")
+        while True:
+            jobs = [job for folder in input_folders for job in GenerateJobsFromVideo(folder, output_folder)]
+            claimed = queue.Claim(jobs, CLAIM_BATCH_PER_WORKER * workers)
+            if not claimed:
+                pending = queue.Pending(jobs)
+                if not pending:
+                    failed = queue.FailedJobs(jobs)
+                    if failed:
+                        Logger.warning(f"{len(failed)} jobs failed:")
+                        for job in failed:
+                            Logger.warning(f"  - {job}")
+                    Logger.info(f"All {len(jobs)} transcription jobs are done or failed")
+                    return True
+                # The rest is leased by other workers; theirs come back here if they stop
+                Logger.debug(f"{pending} jobs leased by other workers, waiting")
+                time.sleep(CLAIM_POLL_SECONDS)
+                continue
+
+            Logger.info(f"Claimed {len(claimed)} jobs")
+            for job in claimed:
+                if result_store.Restore(job):
+                    queue.Complete(job)
+            claimed = [job for job in claimed if not job.IsCompleted]
+            if not claimed:
                 continue
-            Logger.info(f"Processing transcription job: {job}")
-
-            with ThreadPoolExecutor(max_workers=workers) as executor:
-                proxyTried = 0
-                futures = {executor.submit(try_upload, job, proxy, headless_Mode): proxy for proxy in proxy_list}
-                proxy_to_try = len(proxy_list)
-                for future in as_completed(futures):
-                    proxyTried += 1
-                    proxy = futures[future]
-                    status = future.result()
-                    proxy_str = f"{proxy['ip']}:{proxy['port']}"
-
-                    Logger.info(f"Job progress, proxy tried: {proxyTried}/{proxy_to_try}")
-                    if status == JobStatus.Success:
-                        Logger.info(f"Job {job} completed successfully with proxy {proxy_str}")
-                        job.IsCompleted = True
-                        incomplete_jobs.remove(job)
-                        break
-                    elif status == JobStatus.PageConnectionError:
-                        proxy_list.remove(proxy)
-                        WriteJson(PROXY_FILE, proxy_list)
-                    elif status == JobStatus.GenericError:
-                        proxy_failures[proxy_str] = proxy_failures.get(proxy_str, 0) + 1
-                        if proxy_failures[proxy_str] >= MAX_RETRIES:
-                            proxy_list.remove(proxy)
-                            del proxy_failures[proxy_str]
-                            WriteJson(PROXY_FILE, proxy_list)
-                            Logger.warning(f"Removed proxy {proxy_str} after {MAX_RETRIES} failures")
-
-                if not job.IsCompleted:
-                    Logger.error(f"Upload failed for job {job}")
-
-        time.sleep(2)
-
-    return all(job.IsCompleted for job in video_jobs)
+
+            if proxy_pool is None:
+                proxy_pool = ProxyPool(getProxyList(PROXY_FILE, MAX_AGE_SECONDS, PROXY_PROBE_URL),
+                                       PROXY_FILE, MAX_RETRIES)
+            UploadScheduler(claimed, proxy_pool, headless_Mode, workers, max_hedges, result_store,
+                            driver_pool=driver_pool, ledger=queue, max_attempts=max_attempts,
+                            upload_fn=upload_fn).Run()
+            if not len(proxy_pool):
+                Logger.error("No working proxies left. Stopping this worker.")
+                return False
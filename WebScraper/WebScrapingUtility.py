@@ -1,14 +1,18 @@
+import threading
 from enum import Enum
 from selenium.common import TimeoutException
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 from Utility.Logger import Logger
 
+HARVEST_SLICE_SECONDS = 2
+
 
 class JobStatus(Enum):
     Success = 0
     PageConnectionError = 1
     GenericError = 2
+    Cancelled = 3
 
 
 class PageUnreachable(BaseException):
@@ -16,6 +20,11 @@ class PageUnreachable(BaseException):
     pass
 
 
+class JobCancelled(BaseException):
+    """Raised inside an attempt whose job was completed by another attempt."""
+    pass
+
+
 def find_element_if_present(driver, by, value, timeout=1):
     """
     Find an element within the given timeout.
@@ -72,3 +81,77 @@ def click_element_if_clickable(driver, element, timeout=5, threadName="noname"):
     except Exception as e:
         Logger.error(f"{threadName}: Error during click: {e}")
         return False
+
+
+# Runs in the page: scrolls the container (and its last item) into view in fast
+# steps until the item count has not changed for `stableMs`, resetting the wait on
+# every DOM mutation, then hands back the container's complete HTML. After `sliceMs`
+# it returns {finished: false} instead; calling it again resumes the same harvest.
+_HARVEST_SCRIPT = """
+const [container, itemSelector, stepMs, stableMs, timeoutMs, sliceMs, done] = arguments;
+const sliceStarted = Date.now();
+// The state lives on the container, so a harvest can span several calls
+let state = container.__harvest;
+if (!state) {
+    state = container.__harvest = {started: Date.now(), lastChange: Date.now(), count: -1};
+    state.observer = new MutationObserver(() => { state.lastChange = Date.now(); });
+    state.observer.observe(container, {childList: true, subtree: true});
+}
+const step = () => {
+    const items = container.querySelectorAll(itemSelector);
+    if (items.length !== state.count) {
+        state.count = items.length;
+        state.lastChange = Date.now();
+    }
+    if (items.length) items[items.length - 1].scrollIntoView({block: 'end'});
+    container.scrollTop = container.scrollHeight;
+    const now = Date.now();
+    const complete = now - state.lastChange >= stableMs;
+    if (complete || now - state.started >= timeoutMs) {
+        state.observer.disconnect();
+        delete container.__harvest;
+        done({finished: true, html: container.innerHTML, count: state.count, complete: complete});
+    } else if (now - sliceStarted >= sliceMs) {
+        done({finished: false, count: state.count});
+    } else {
+        setTimeout(step, stepMs);
+    }
+};
+step();
+"""
+
+
+def harvest_inner_html(driver, container, item_selector, timeout=60, step_ms=50, stable_ms=1000,
+                       threadName="noname", cancel: threading.Event | None = None,
+                       slice_s=HARVEST_SLICE_SECONDS):
+    """
+    Scrolls a lazily rendered container until all its items are loaded and returns its
+    innerHTML, in an in-page script instead of one round-trip per item.
+
+    The script returns every `slice_s` seconds and is resumed where it stopped, so
+    `cancel` is checked in between and no single WebDriver call blocks for long.
+
+    Args:
+        driver: Selenium WebDriver instance.
+        container: WebElement whose items are rendered on scroll.
+        item_selector: CSS selector of the items counted to detect the end.
+        timeout: Maximum time in seconds before returning what is rendered.
+        step_ms: Interval between scroll steps.
+        stable_ms: How long the item count and the DOM must stay unchanged.
+        cancel: Raises JobCancelled between slices once set.
+
+    Returns:
+        str: The container's innerHTML.
+    """
+    driver.set_script_timeout(slice_s + 10)
+    while True:
+        result = driver.execute_async_script(_HARVEST_SCRIPT, container, item_selector,
+                                             step_ms, stable_ms, int(timeout * 1000), int(slice_s * 1000))
+        if result["finished"]:
+            break
+        if cancel is not None and cancel.is_set():
+            raise JobCancelled
+    if not result["complete"]:
+        Logger.warning(f"{threadName}: Items still loading after {timeout}s, harvested {result['count']}.")
+    Logger.info(f"{threadName}: Harvested {result['count']} items.")
+    return result["html"]
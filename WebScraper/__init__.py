@@ -10,5 +10,11 @@ else:
 
 PROXY_DIR = BASE_DIR / "proxies"
 PROXY_FILE = PROXY_DIR/'proxy_list.json'
+PROXY_STATS_FILE = PROXY_DIR/'proxy_stats.json'
 
-PROXY_DIR.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+RESULT_STORE_DIR = BASE_DIR / "results"
+JOB_LEDGER_FILE = BASE_DIR / "jobs" / "job_ledger.sqlite3"
+
+PROXY_DIR.mkdir(parents=True, exist_ok=True)
+RESULT_STORE_DIR.mkdir(parents=True, exist_ok=True)
+JOB_LEDGER_FILE.parent.mkdir(parents=True, exist_ok=True)
@@ -1,19 +1,42 @@
 import argparse
+import os
+import threading
+import time
+from multiprocessing import freeze_support
+from pathlib import Path
 
-from DataProcessing import RAW_VIDEO_FOLDER, RAW_AUDIO_FOLDER, \
+from DataProcessing import DATA_PROC_BASE_DIR, RAW_VIDEO_FOLDER, RAW_AUDIO_FOLDER, AUDIO_EXTENSIONS, VIDEO_EXTENSIONS, \
     SPLITTED_AUDIO_FOLDER, HTML_OUTPUT_FOLDER, OUTPUT_TRANSCRIPT, ENHANCED_AUDIO_FOLDER, SPLITTED_VIDEO_FOLDER
-from DataProcessing.AudioEnhancer import EnhanceAudioFolder
-from DataProcessing.AudioExtractor import AudioFormat, VideoFolderToAudio
-from DataProcessing.HTMLToMDConverter import ExtractTextFromFolder
-from DataProcessing.MediaSplitter import SplitMediaInFolder
-from DataProcessing.VideoCreator import AudioFolderToVideo
-from DataProcessing.ffmpegUtil import VideoFormat
+from DataProcessing.AudioEnhancer import EnhanceAudioFolder, EnhanceProject
+from DataProcessing.AudioExtractor import AudioFormat, VideoFolderToAudio, ExtractAudioFile
+from DataProcessing.HTMLToMDConverter import ExtractTextFromFolder, TextExtractor
+from DataProcessing.NoiseProfile import NoiseReductionMode
+from DataProcessing.MediaSplitter import SplitMediaInFolder, split_media
+from DataProcessing.VideoCreator import AudioFolderToVideo, CreateVideoFromAudio
+from DataProcessing.ffmpegUtil import VideoFormat, DEFAULT_MAX_FFMPEG_PROCESSES, set_max_ffmpeg_processes, flush_probe_cache
 from Utility.Logger import LogLevel, Logger
-from WebScraper.VzardAIUploader import UploadVideoFolder
+from Utility.StreamingPipeline import PipelineStage, StreamingPipeline
+from WebScraper import PROXY_FILE
+from WebScraper.DriverPool import DriverPool
+from WebScraper.ProxyUtil import ProxyPool, getProxyList
+from WebScraper.ResultStore import ResultStore
+from WebScraper.VideoTranscriptJobDescriptor import GenerateJobsFromProject, VideoTranscriptJobDescriptor
+from WebScraper.VzardAIUploader import UploadVideoFolder, UploadJob, UploadWorker, UPLOAD_URL, PROXY_PROBE_URL, \
+    DEFAULT_MAX_HEDGES
 
 # --- Settings ---
 HEADLESS_MODE = True
 DEFAULT_WORKERS = 8
+STREAMING_UPLOAD_ROUNDS = 5
+UPLOAD_RETRY_PAUSE_SECONDS = 30
+ENHANCE_SETTINGS = dict(
+    lowcut=100,
+    highcut=6000,
+    compress_threshold_db=-30,
+    compress_ratio=4,
+    gain_db=8,
+    noise_mode=NoiseReductionMode.NONSTATIONARY,
+)
 
 
 def main():
@@ -23,8 +46,9 @@ def main():
     )
     parser.add_argument(
         "-p", "--pipeline",
-        choices=["audio", "video", "help"],
-        help="Choose which pipeline to run: 'audio', 'video', or 'help' to show usage"
+        choices=["audio", "video", "local", "worker", "help"],
+        help="Choose which pipeline to run: 'audio', 'video', 'local' (offline Whisper), "
+             "'worker' (upload chunks of a tree shared by several hosts), or 'help' to show usage"
     )
     parser.add_argument(
         "-s", "--split",
@@ -32,12 +56,79 @@ def main():
         default=15,
         help="Split length in minutes for audio/video chunks"
     )
+    parser.add_argument(
+        "--silence-tolerance",
+        type=float,
+        default=0,
+        help="Move each chunk boundary to the nearest silence within this many seconds (0 keeps the fixed grid)"
+    )
     parser.add_argument(
         "-w", "--workers",
         type=int,
         default=DEFAULT_WORKERS,
         help="Number of parallel workers"
     )
+    parser.add_argument(
+        "--max-hedges",
+        type=int,
+        default=DEFAULT_MAX_HEDGES,
+        help="Uploads: attempts racing on the same chunk with different proxies once no new chunk is waiting"
+    )
+    parser.add_argument(
+        "--split-workers",
+        type=int,
+        default=None,
+        help="Number of files split concurrently by the audio and video pipelines (defaults to --workers)"
+    )
+    parser.add_argument(
+        "--max-ffmpeg",
+        type=int,
+        default=DEFAULT_MAX_FFMPEG_PROCESSES,
+        help="Cap on ffmpeg processes running at the same time, shared by all stages"
+    )
+    parser.add_argument(
+        "--parallel-enhance",
+        action="store_true",
+        help="Audio pipeline: enhance the chunks of a project on --workers processes, each holding a whole "
+             "chunk in memory (by default chunks are enhanced one after another in bounded-memory blocks)"
+    )
+    parser.add_argument(
+        "--noise-mode",
+        choices=[mode.value for mode in NoiseReductionMode],
+        default=NoiseReductionMode.NONSTATIONARY.value,
+        help="Audio pipeline denoiser: 'nonstationary' tracks the noise per chunk, 'stationary' gates it "
+             "with one cached noise profile per project (faster, for steady background noise)"
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Overlap the pipeline stages: chunks are uploaded as soon as they are split"
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="small",
+        help="Whisper model size used by the local pipeline (tiny, base, small, medium, large)"
+    )
+    parser.add_argument(
+        "--transcribe-workers",
+        type=int,
+        default=None,
+        help="Whisper worker processes of the local pipeline, each loading the model once "
+             "(defaults to one per 4 cores)"
+    )
+    parser.add_argument(
+        "--shared-dir",
+        type=Path,
+        default=DATA_PROC_BASE_DIR,
+        help="Worker pipeline: data folder shared by all hosts (holds the split chunks, 3-HTML and the job queue)"
+    )
+    parser.add_argument(
+        "--worker-id",
+        type=str,
+        default=None,
+        help="Worker pipeline: name of this worker in the job leases (defaults to host:pid)"
+    )
     parser.add_argument(
         "-l", "--log-level",
         type=str,
@@ -53,7 +144,11 @@ def main():
     Logger.setup(level=level)
 
     split_minutes = args.split
+    silence_tolerance = args.silence_tolerance
     workers = args.workers
+    split_workers = args.split_workers or workers
+    set_max_ffmpeg_processes(args.max_ffmpeg)
+    ENHANCE_SETTINGS["noise_mode"] = NoiseReductionMode(args.noise_mode)
 
     if args.pipeline == "help":
         parser.print_help()
@@ -63,57 +158,81 @@ def main():
         Logger.GetConsole().print("\nSelect a pipeline to run:")
         Logger.GetConsole().print("1) Audio Pipeline (Video → Audio → Transcript)")
         Logger.GetConsole().print("2) Video Pipeline (Audio → Video → Transcript)")
-        Logger.GetConsole().print("3) Help (Show usage)")
-        Logger.GetConsole().print("4) Exit")
+        Logger.GetConsole().print("3) Local Pipeline (Audio/Video → Whisper transcript, offline)")
+        Logger.GetConsole().print("4) Upload Worker (uploads the chunks of a tree shared by several hosts)")
+        Logger.GetConsole().print("5) Help (Show usage)")
+        Logger.GetConsole().print("6) Exit")
 
-        choice = input("Enter choice [1/2/3/4]: ").strip()
+        choice = input("Enter choice [1/2/3/4/5/6]: ").strip()
         if choice == "1":
             args.pipeline = "audio"
         elif choice == "2":
             args.pipeline = "video"
         elif choice == "3":
-            parser.print_help()
+            args.pipeline = "local"
         elif choice == "4":
+            args.pipeline = "worker"
+        elif choice == "5":
+            parser.print_help()
+        elif choice == "6":
             Logger.GetConsole().print("Exiting.")
             return
         else:
             Logger.GetConsole().print("Invalid choice. Try again.")
 
-    if args.pipeline == "audio":
+    if args.pipeline == "audio" and args.streaming:
+        Logger.info("Starting streaming Audio Pipeline...\n")
+        StreamingAudioPipeline(split_minutes, workers, silence_tolerance, split_workers, args.max_hedges)
+    elif args.pipeline == "audio":
         Logger.info("Starting Audio Pipeline...\n")
-        AudioPipeline(split_minutes, workers)
+        AudioPipeline(split_minutes, workers, silence_tolerance, split_workers, args.parallel_enhance,
+                      args.max_hedges)
+    elif args.pipeline == "video" and args.streaming:
+        Logger.info("Starting streaming Video Pipeline...\n")
+        StreamingVideoPipeline(split_minutes, workers, silence_tolerance, split_workers, args.max_hedges)
     elif args.pipeline == "video":
         Logger.info("Starting Video Pipeline...\n")
-        VideoPipeline(split_minutes, workers)
+        VideoPipeline(split_minutes, workers, silence_tolerance, split_workers, args.max_hedges)
+    elif args.pipeline == "local":
+        Logger.info("Starting Local Pipeline...\n")
+        LocalPipeline(split_minutes, silence_tolerance, args.model, args.transcribe_workers)
+    elif args.pipeline == "worker":
+        Logger.info("Starting Upload Worker...\n")
+        WorkerPipeline(args.shared_dir, workers, args.worker_id, args.max_hedges)
 
 
 # --- Pipeline functions ---
-def AudioPipeline(split_minutes: int, workers: int):
+def _UploadUntilSettled(input_folder: Path, workers: int, max_hedges: int):
+    """
+    Runs upload rounds until every job of the folder is done or failed. A round ends
+    early with jobs still pending only when its proxies ran out, so the next one
+    starts with a fresh proxy list after a pause. Jobs that keep failing end up failed
+    at the ledger's attempt cap, which ends the rounds.
+    """
+    while not UploadVideoFolder(input_folder, HTML_OUTPUT_FOLDER, HEADLESS_MODE, workers, max_hedges):
+        Logger.warning(f"Jobs still pending, next upload round in {UPLOAD_RETRY_PAUSE_SECONDS} s")
+        time.sleep(UPLOAD_RETRY_PAUSE_SECONDS)
+
+
+def AudioPipeline(split_minutes: int, workers: int, silence_tolerance: float = 0,
+                  split_workers: int | None = None, parallel_enhance: bool = False,
+                  max_hedges: int = DEFAULT_MAX_HEDGES):
     Logger.info("Converting videos to audio...")
-    VideoFolderToAudio(RAW_VIDEO_FOLDER, RAW_AUDIO_FOLDER, AudioFormat.WAV, overwrite=False)
+    VideoFolderToAudio(RAW_VIDEO_FOLDER, RAW_AUDIO_FOLDER, AudioFormat.WAV, overwrite=False, workers=workers)
     Logger.info("Video-to-audio conversion complete.")
 
     Logger.info(f"Splitting audio files into {split_minutes}-minute chunks...")
-    SplitMediaInFolder(RAW_AUDIO_FOLDER, SPLITTED_AUDIO_FOLDER, 60 * split_minutes)
+    SplitMediaInFolder(RAW_AUDIO_FOLDER, SPLITTED_AUDIO_FOLDER, 60 * split_minutes,
+                       silence_tolerance_s=silence_tolerance, workers=split_workers or workers)
     Logger.info("Audio splitting complete.")
 
     Logger.info("Enhancing audio files (filtering, compression, gain)...")
-    EnhanceAudioFolder(
-        SPLITTED_AUDIO_FOLDER,
-        ENHANCED_AUDIO_FOLDER,
-        AudioFormat.WAV,
-        lowcut=100,
-        highcut=6000,
-        compress_threshold_db=-30,
-        compress_ratio=4,
-        gain_db=8,
-    )
+    EnhanceAudioFolder(SPLITTED_AUDIO_FOLDER, ENHANCED_AUDIO_FOLDER, AudioFormat.WAV,
+                       workers=workers if parallel_enhance else 1, **ENHANCE_SETTINGS)
     Logger.info("Audio enhancement complete.")
 
     Logger.info("Uploading audio chunks for transcription...")
-    jobToDo = True
-    while jobToDo:
-        jobToDo = not UploadVideoFolder(SPLITTED_AUDIO_FOLDER, HTML_OUTPUT_FOLDER, HEADLESS_MODE, workers)
+    _UploadUntilSettled(SPLITTED_AUDIO_FOLDER, workers, max_hedges)
     Logger.info("Upload complete.")
 
     Logger.info("Extracting transcript from uploaded results...")
@@ -121,19 +240,19 @@ def AudioPipeline(split_minutes: int, workers: int):
     Logger.info("Transcript extraction complete.")
 
 # --- Video functions ---
-def VideoPipeline(split_minutes: int, workers: int):
+def VideoPipeline(split_minutes: int, workers: int, silence_tolerance: float = 0,
+                  split_workers: int | None = None, max_hedges: int = DEFAULT_MAX_HEDGES):
     Logger.info("Converting audio to video...")
     AudioFolderToVideo(RAW_AUDIO_FOLDER, RAW_VIDEO_FOLDER, VideoFormat.MP4, overwrite=False)
     Logger.info("Audio-to-video conversion complete.")
 
     Logger.info(f"Splitting videos into {split_minutes}-minute chunks...")
-    SplitMediaInFolder(RAW_VIDEO_FOLDER, SPLITTED_VIDEO_FOLDER, 60 * split_minutes)
+    SplitMediaInFolder(RAW_VIDEO_FOLDER, SPLITTED_VIDEO_FOLDER, 60 * split_minutes,
+                       silence_tolerance_s=silence_tolerance, workers=split_workers or workers)
     Logger.info("Video splitting complete.")
 
     Logger.info("Uploading video chunks for transcription...")
-    jobToDo = True
-    while jobToDo:
-        jobToDo = not UploadVideoFolder(SPLITTED_VIDEO_FOLDER, HTML_OUTPUT_FOLDER, HEADLESS_MODE, workers)
+    _UploadUntilSettled(SPLITTED_VIDEO_FOLDER, workers, max_hedges)
     Logger.info("Upload complete.")
 
     Logger.info("Extracting transcript from uploaded results...")
@@ -141,5 +260,191 @@ def VideoPipeline(split_minutes: int, workers: int):
     Logger.info("Transcript extraction complete.")
 
 
+# --- Local functions ---
+def LocalPipeline(split_minutes: int, silence_tolerance: float = 0, model_size: str = "small",
+                  transcribe_workers: int | None = None):
+    # Whisper (and torch) are only needed by this pipeline
+    from DataProcessing.AudioToText import TranscribeMediaFolder
+
+    # Raw media are decoded window by window straight into the workers' memory:
+    # no extracted audio or split chunks are written to disk.
+    Logger.info(f"Transcribing raw media locally with Whisper in {split_minutes}-minute windows...")
+    TranscribeMediaFolder([RAW_AUDIO_FOLDER, RAW_VIDEO_FOLDER], OUTPUT_TRANSCRIPT, 60 * split_minutes,
+                          silence_tolerance_s=silence_tolerance, model_size=model_size, workers=transcribe_workers,
+                          metadata_dirs=[SPLITTED_AUDIO_FOLDER, SPLITTED_VIDEO_FOLDER])
+    flush_probe_cache()
+    Logger.info("Local transcription complete.")
+
+
+# --- Worker functions ---
+def WorkerPipeline(shared_dir: Path, workers: int, worker_id: str | None = None,
+                   max_hedges: int = DEFAULT_MAX_HEDGES):
+    """
+    Uploads chunks of a data folder shared by several hosts (e.g. over NFS), together
+    with the workers started on the other hosts. Chunks are split by a regular
+    pipeline run; every worker writes its HTML into the shared 3-HTML folder.
+    """
+    shared_dir = Path(shared_dir)
+    input_folders = [shared_dir / SPLITTED_AUDIO_FOLDER.name, shared_dir / SPLITTED_VIDEO_FOLDER.name]
+    output_folder = shared_dir / HTML_OUTPUT_FOLDER.name
+    for folder in input_folders + [output_folder]:
+        folder.mkdir(parents=True, exist_ok=True)
+
+    done = UploadWorker(input_folders, output_folder, shared_dir / ".upload-queue",
+                        HEADLESS_MODE, workers, max_hedges, worker_id=worker_id)
+    Logger.info("Upload worker finished." if done else "Upload worker stopped with jobs left.")
+
+
+# --- Streaming functions ---
+def _RunStreamingPipeline(sources: list[Path], prepare, split_out_dir: Path,
+                          split_minutes: int, workers: int, silence_tolerance: float,
+                          split_workers: int | None, enhance: bool, max_hedges: int = DEFAULT_MAX_HEDGES):
+    """
+    Runs prepare -> split -> upload -> assemble as concurrent stages linked by bounded
+    queues. A chunk is uploaded as soon as its file is split and a project's transcript
+    is written as soon as the HTML of its last chunk exists. The bounded upload queue
+    stalls splitting when uploads fall behind, so split chunks on disk stay bounded.
+    Each upload runs up to `max_hedges` concurrent attempts; the upload stage runs
+    workers // max_hedges of them, so at most `workers` browsers are open as in batch mode.
+    """
+    split_workers = split_workers or workers
+    max_hedges = max(1, min(max_hedges, workers))
+    upload_workers = max(1, workers // max_hedges)
+    proxy_pool = ProxyPool(getProxyList(PROXY_FILE, probe_url=PROXY_PROBE_URL), PROXY_FILE)
+    result_store = ResultStore()
+    driver_pool = DriverPool(HEADLESS_MODE, UPLOAD_URL, max_idle=workers)
+    pending_chunks: dict[str, set[str]] = {}
+    upload_rounds: dict[str, int] = {}
+    pending_lock = threading.Lock()
+    proxy_lock = threading.Lock()
+
+    def prepare_stage(media_path: Path, emit):
+        prepared = prepare(media_path)
+        if prepared:
+            emit(prepared)
+
+    def split_stage(media_path: Path, emit):
+        project_dir = split_out_dir / media_path.stem
+        if not project_dir.is_dir():
+            split_media(media_path, split_out_dir, 60 * split_minutes, silence_tolerance_s=silence_tolerance)
+        else:
+            Logger.info(f"Output '{project_dir}' already exists. Skipping split.")
+
+        jobs = GenerateJobsFromProject(project_dir, HTML_OUTPUT_FOLDER)
+        with pending_lock:
+            pending_chunks[project_dir.name] = {job.VideoPath.stem for job in jobs}
+
+        if enhance:
+            emit(project_dir, to="enhance")
+        for job in jobs:
+            if os.path.isfile(job.GetHTMLOutputFilePath()) or result_store.Restore(job):
+                emit(job, to="assemble")
+            else:
+                emit(job)
+
+    def enhance_stage(project_dir: Path, emit):
+        EnhanceProject(project_dir, ENHANCED_AUDIO_FOLDER, AudioFormat.WAV, **ENHANCE_SETTINGS)
+
+    def upload_stage(job: VideoTranscriptJobDescriptor, emit):
+        if UploadJob(job, proxy_pool, HEADLESS_MODE, workers=max_hedges, result_store=result_store,
+                     driver_pool=driver_pool):
+            emit(job)
+            return
+
+        # Like the batch pipeline, try again later, with a fresh proxy list once the pool is used up
+        with pending_lock:
+            rounds = upload_rounds[job.JobId] = upload_rounds.get(job.JobId, 0) + 1
+        if rounds >= STREAMING_UPLOAD_ROUNDS:
+            raise RuntimeError(f"Upload failed {rounds} times")
+        with proxy_lock:
+            if not len(proxy_pool):
+                proxy_pool.Flush()
+                proxy_pool.Refresh(getProxyList(PROXY_FILE, probe_url=PROXY_PROBE_URL))
+        Logger.warning(f"Upload failed for job {job}, queuing it again ({rounds}/{STREAMING_UPLOAD_ROUNDS})")
+        upload_st.requeue(job)
+
+    def assemble_stage(job: VideoTranscriptJobDescriptor, emit):
+        if not os.path.isfile(job.GetHTMLOutputFilePath()):
+            return
+        project_name = job.VideoProjectFolder.name
+        with pending_lock:
+            remaining = pending_chunks[project_name]
+            remaining.discard(job.VideoPath.stem)
+            project_done = not remaining
+        if project_done:
+            TextExtractor(HTML_OUTPUT_FOLDER / project_name, OUTPUT_TRANSCRIPT / f"{project_name}.md")
+
+    pipeline = StreamingPipeline()
+    prepare_st = pipeline.add(PipelineStage("prepare", prepare_stage, workers=split_workers, queue_size=split_workers))
+    split_st = pipeline.add(PipelineStage("split", split_stage, workers=split_workers, queue_size=split_workers))
+    enhance_st = pipeline.add(PipelineStage("enhance", enhance_stage, workers=1)) if enhance else None
+    upload_st = pipeline.add(PipelineStage("upload", upload_stage, workers=upload_workers, queue_size=2 * workers))
+    assemble_st = pipeline.add(PipelineStage("assemble", assemble_stage, workers=1))
+
+    pipeline.feed(prepare_st, sources)
+    pipeline.connect(prepare_st, split_st)
+    pipeline.connect(split_st, upload_st)
+    pipeline.connect(split_st, assemble_st, default=False)
+    if enhance_st:
+        pipeline.connect(split_st, enhance_st, default=False)
+    pipeline.connect(upload_st, assemble_st)
+
+    try:
+        failures = pipeline.run()
+    finally:
+        driver_pool.Shutdown()
+    flush_probe_cache()
+
+    for stage_name, failed in failures.items():
+        Logger.warning(f"{len(failed)} items failed in stage '{stage_name}':")
+        for item, error in failed:
+            Logger.warning(f"  - {item}: {error}")
+
+    incomplete = [name for name, remaining in pending_chunks.items() if remaining]
+    if incomplete:
+        Logger.warning(f"{len(incomplete)} projects still have chunks without a transcript:")
+        for name in incomplete:
+            Logger.warning(f"  - {name} ({len(pending_chunks[name])} chunks)")
+    else:
+        Logger.info("All transcripts assembled.")
+
+
+def StreamingAudioPipeline(split_minutes: int, workers: int, silence_tolerance: float = 0,
+                           split_workers: int | None = None, max_hedges: int = DEFAULT_MAX_HEDGES):
+    audio_files = [f for f in RAW_AUDIO_FOLDER.iterdir() if f.is_file() and f.suffix.lower() in AUDIO_EXTENSIONS]
+    audio_stems = {f.stem for f in audio_files}
+    video_files = [f for f in RAW_VIDEO_FOLDER.iterdir()
+                   if f.is_file() and f.suffix.lower() in VIDEO_EXTENSIONS and f.stem not in audio_stems]
+
+    def prepare(media_path: Path) -> Path | None:
+        if media_path.suffix.lower() in AUDIO_EXTENSIONS:
+            return media_path
+        return ExtractAudioFile(media_path, RAW_AUDIO_FOLDER, AudioFormat.WAV)
+
+    _RunStreamingPipeline(audio_files + video_files, prepare, SPLITTED_AUDIO_FOLDER,
+                          split_minutes, workers, silence_tolerance, split_workers, enhance=True,
+                          max_hedges=max_hedges)
+
+
+def StreamingVideoPipeline(split_minutes: int, workers: int, silence_tolerance: float = 0,
+                           split_workers: int | None = None, max_hedges: int = DEFAULT_MAX_HEDGES):
+    video_files = [f for f in RAW_VIDEO_FOLDER.iterdir() if f.is_file() and f.suffix.lower() in VIDEO_EXTENSIONS]
+    video_stems = {f.stem for f in video_files}
+    audio_files = [f for f in RAW_AUDIO_FOLDER.iterdir()
+                   if f.is_file() and f.suffix.lower() in AUDIO_EXTENSIONS and f.stem not in video_stems]
+
+    def prepare(media_path: Path) -> Path:
+        if media_path.suffix.lower() in VIDEO_EXTENSIONS:
+            return media_path
+        video_path = RAW_VIDEO_FOLDER / f"{media_path.stem}.{VideoFormat.MP4.value}"
+        CreateVideoFromAudio(str(media_path), str(video_path), video_format=VideoFormat.MP4)
+        return video_path
+
+    _RunStreamingPipeline(video_files + audio_files, prepare, SPLITTED_VIDEO_FOLDER,
+                          split_minutes, workers, silence_tolerance, split_workers, enhance=False,
+                          max_hedges=max_hedges)
+
+
 if __name__ == '__main__':
+    freeze_support()
     main()